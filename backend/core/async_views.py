@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.urls import path
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from . import views
+
+class AsyncReadOnlyView(View):
+    """
+    Read-only list/detail for an existing viewset on the async ORM (ASGI only).
+
+    Authentication, permissions, filters and ordering are the viewset's own and run in one
+    sync_to_async call (they may touch the session or validate ids); the page itself is read
+    with aiterator()/afirst() and ?count=1 adds an acount(), so a worker awaiting a slow
+    client or the database does not hold a thread. Responses match the WSGI endpoints.
+    """
+    viewset = None
+
+    @classonlymethod
+    def for_viewset(cls, viewset):
+        return cls.as_view(viewset=viewset)
+
+    def prepare(self, request, action, kwargs):
+        view = self.viewset(action=action, action_map={"get": action}, args=(), kwargs=kwargs, format_kwarg=None)
+        request = view.initialize_request(request)
+        view.request, view.headers = request, view.default_response_headers
+        try:
+            view.initial(request)
+            return view, view.filter_queryset(view.get_queryset()), None
+        except Exception as exc:
+            return view, None, self.finalize(view, view.handle_exception(exc))
+
+    @staticmethod
+    def finalize(view, response):
+        return view.finalize_response(view.request, response).render()
+
+    async def get(self, request, pk=None):
+        action = "list" if pk is None else "retrieve"
+        view, queryset, error = await sync_to_async(self.prepare)(request, action, {} if pk is None else {"pk": pk})
+        if error is not None:
+            return error
+        try:
+            if pk is None:
+                response = await self.list(view, queryset)
+            else:
+                response = await self.retrieve(view, queryset, pk)
+        except (APIException, Http404) as exc:
+            response = view.handle_exception(exc)
+        return self.finalize(view, response)
+
+    async def list(self, view, queryset):
+        paginator = view.paginator
+        page = await paginator.apaginate_queryset(queryset, view.request, view=view)
+        response = paginator.get_paginated_response(view.get_serializer(page, many=True).data)
+        if view.request.query_params.get("count") in ("1", "true"):
+            response.data["count"] = await queryset.acount()
+        return response
+
+    async def retrieve(self, view, queryset, pk):
+        obj = await queryset.filter(pk=pk).afirst()
+        if obj is None:
+            raise Http404
+        view.check_object_permissions(view.request, obj)
+        return Response(view.get_serializer(obj).data)
+
+urlpatterns = [
+    path("products/", AsyncReadOnlyView.for_viewset(views.ProductViewSet), name="async-product-list"),
+    path("products/<int:pk>/", AsyncReadOnlyView.for_viewset(views.ProductViewSet), name="async-product-detail"),
+    path("offers/", AsyncReadOnlyView.for_viewset(views.OfferViewSet), name="async-offer-list"),
+    path("offers/<int:pk>/", AsyncReadOnlyView.for_viewset(views.OfferViewSet), name="async-offer-detail"),
+    path("calendar/", AsyncReadOnlyView.for_viewset(views.CalendarEventViewSet), name="async-calendar-list"),
+    path("calendar/<int:pk>/", AsyncReadOnlyView.for_viewset(views.CalendarEventViewSet), name="async-calendar-detail"),
+]
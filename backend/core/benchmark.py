@@ -0,0 +1,284 @@
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from . import models, seeding
+
+REPEAT = 20
+WARMUP = 2
+THRESHOLD = 0.2  # 20% slower p50, or any extra query, counts as a regression
+
+# query strings for GET list actions that need one; filled from the sample context
+ACTION_PARAMS = {
+    "product-autocomplete": lambda ctx: {"q": "Лос"},
+    "offer-best": lambda ctx: {"orders": ",".join(map(str, ctx["order_ids"])), "n": 3},
+    "calendar-feed": lambda ctx: {"restaurant": ctx["restaurant_id"]},
+    "product-prices": lambda ctx: {"products": ",".join(map(str, ctx["product_ids"])),
+                                   "at": (date.today() - timedelta(days=90)).isoformat()},
+}
+# extra list variants worth tracking on their own
+VARIANTS = {
+    "product-list": [{"search": "лосось"}, {"ordering": "price_per_unit"}, {"available": "true"}],
+}
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+def sample_context():
+    resto = models.RestaurantProfile.objects.filter(user__username__startswith=seeding.PREFIX).order_by("id").first() \
+        or models.RestaurantProfile.objects.order_by("id").first()
+    return {
+        "user": resto.user if resto else None,
+        "restaurant_id": resto.id if resto else 0,
+        "order_ids": list(models.Order.objects.filter(restaurant=resto).order_by("-id").values_list("id", flat=True)[:20]),
+        "product_ids": list(models.Product.objects.order_by("id").values_list("id", flat=True)[:100]),
+    }
+
+def build_view(viewset, user, params=None):
+    """A list view of `viewset` that has run authentication, as for a GET by `user`."""
+    request = APIRequestFactory().get("/", params or {})
+    if user:
+        force_authenticate(request, user)
+    view = viewset(action_map={"get": "list"}, format_kwarg=None, kwargs={}, args=())
+    view.request = view.initialize_request(request)
+    view.initial(view.request)
+    return view
+
+def visible_pks(viewset, user):
+    """Primary keys `user` can fetch from the viewset (tenant-scoped viewsets only show the caller's rows)."""
+    return build_view(viewset, user).get_queryset().order_by("pk").values_list("pk", flat=True)
+
+def endpoints(ctx):
+    """(name, path, params) for every GET route the API router exposes: list, detail and GET list actions."""
+    from restockhub.urls import router
+    cases = []
+    for prefix, viewset, basename in router.registry:
+        base = f"/api/{prefix}/"
+        cases.append((f"{basename}-list", base, {}))
+        cases += [(f"{basename}-list?{'&'.join(f'{k}={v}' for k, v in params.items())}", base, params)
+                  for params in VARIANTS.get(f"{basename}-list", [])]
+        pk = visible_pks(viewset, ctx["user"]).first()
+        if pk is not None and hasattr(viewset, "retrieve"):
+            cases.append((f"{basename}-detail", f"{base}{pk}/", {}))
+        for extra in viewset.get_extra_actions():
+            if extra.detail or "get" not in extra.mapping:
+                continue
+            name = f"{basename}-{extra.url_name}"
+            params = ACTION_PARAMS[name](ctx) if name in ACTION_PARAMS else {}
+            cases.append((name, f"{base}{extra.url_path}/", params))
+    return cases
+
+def measure(client, path, params, repeat=REPEAT, warmup=WARMUP, cold=False):
+    timings, sql_times, queries, status, size = [], [], 0, None, 0
+    for i in range(warmup + repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(path, params)
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        timings.append(elapsed * 1000)
+        sql_times.append(sum(float(q["time"]) for q in captured.captured_queries) * 1000)
+        queries, status, size = len(captured.captured_queries), response.status_code, len(body)
+    return {
+        "status": status, "queries": queries, "bytes": size,
+        "p50_ms": round(percentile(timings, 50), 3), "p90_ms": round(percentile(timings, 90), 3),
+        "p99_ms": round(percentile(timings, 99), 3), "mean_ms": round(statistics.mean(timings), 3),
+        "sql_ms": round(statistics.mean(sql_times), 3),
+    }
+
+def run(repeat=REPEAT, warmup=WARMUP, cold=False, only=None, log=print):
+    ctx = sample_context()
+    client = Client()
+    if ctx["user"]:
+        client.force_login(ctx["user"])
+    results = {}
+    for name, path, params in endpoints(ctx):
+        if only and not any(o in name for o in only):
+            continue
+        results[name] = dict(path=path, params=params, **measure(client, path, params, repeat, warmup, cold))
+        r = results[name]
+        log(f"{name:48} {r['status']}  p50 {r['p50_ms']:9.2f}ms  p99 {r['p99_ms']:9.2f}ms  {r['queries']:3} queries")
+    return {
+        "meta": {
+            "vendor": connection.vendor, "python": platform.python_version(), "repeat": repeat, "cold_cache": cold,
+            "rows": {m.__name__: m.objects.count() for m in (models.Product, models.Order, models.OrderItem,
+                                                           models.Offer, models.CalendarEvent)},
+        },
+        "endpoints": results,
+    }
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """Endpoints that got slower than `threshold` at p50 or issue more queries than in `baseline`."""
+    regressions = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        if now["queries"] > before["queries"]:
+            regressions.append(f"{name}: {before['queries']} -> {now['queries']} queries")
+        if before["p50_ms"] and now["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {before['p50_ms']:.2f}ms -> {now['p50_ms']:.2f}ms")
+    return regressions
+
+# ---------- serializers ----------
+SERIALIZE_LIMIT = 500
+
+def list_instances(viewset, user, params=None, limit=SERIALIZE_LIMIT):
+    """(instances, serializer context) as the viewset's list would fetch them, evaluated up front."""
+    view = build_view(viewset, user, params)
+    instances = list(view.filter_queryset(view.get_queryset())[:limit])
+    return instances, view.get_serializer_class(), view.get_serializer_context()
+
+def time_serialize(serializer_class, instances, context, repeat):
+    timings, data = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = serializer_class(instances, many=True, context=context).data
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, data
+
+def serializers(repeat=REPEAT, limit=SERIALIZE_LIMIT, only=None, params=None, log=print):
+    """
+    DRF's ListSerializer against core.sparse.FastListSerializer on the same prefetched rows of
+    every list route, so only serialization time is compared; the outputs must be identical.
+    """
+    from restockhub.urls import router
+    user = sample_context()["user"]
+    results = {}
+    for prefix, viewset, basename in router.registry:
+        name = f"{basename}-list"
+        if only and not any(o in name for o in only):
+            continue
+        instances, serializer_class, context = list_instances(viewset, user, params, limit)
+        with override_settings(FAST_LIST_SERIALIZER=False):
+            drf, expected = time_serialize(serializer_class, instances, context, repeat)
+        fast, data = time_serialize(serializer_class, instances, context, repeat)
+        r = results[name] = {
+            "rows": len(instances), "identical": data == expected,
+            "drf_p50_ms": round(percentile(drf, 50), 3), "fast_p50_ms": round(percentile(fast, 50), 3),
+        }
+        r["speedup"] = round(r["drf_p50_ms"] / r["fast_p50_ms"], 2) if r["fast_p50_ms"] else None
+        log(f"{name:28} {r['rows']:5} rows  drf {r['drf_p50_ms']:9.2f}ms  fast {r['fast_p50_ms']:9.2f}ms  "
+            f"x{r['speedup']}  {'identical' if r['identical'] else 'OUTPUT DIFFERS'}")
+    return results
+
+# ---------- SQLite concurrency ----------
+CATALOG_PAGE = 50
+ITEMS_PER_ORDER = 3
+
+def mixed_load(workers=8, seconds=5.0, write_share=0.2, seed=0):
+    """
+    `workers` threads, each on its own connection to the default database, run for `seconds`:
+    with probability `write_share` an order write (product prices read, Order and its items
+    inserted, in one transaction, as the order endpoint does), otherwise a catalog page read.
+    Failed operations ("database is locked") are counted, not retried.
+    """
+    restaurant_id = models.RestaurantProfile.objects.order_by("id").values_list("id", flat=True).first()
+    product_ids = list(models.Product.objects.order_by("id").values_list("id", flat=True))
+    categories = list(models.Product.objects.order_by().values_list("category", flat=True).distinct())
+    if restaurant_id is None or len(product_ids) < ITEMS_PER_ORDER:
+        raise ValueError("No restaurant or products; run seed_demo first")
+    from .views import ProductViewSet
+    stats = {kind: {"ok": [], "errors": 0} for kind in ("read", "write")}
+    errors, lock = {}, threading.Lock()
+    start = threading.Barrier(workers)
+
+    def write(rng):
+        ids = rng.sample(product_ids, ITEMS_PER_ORDER)
+        with transaction.atomic():
+            prices = dict(models.Product.objects.filter(id__in=ids).values_list("id", "price_per_unit"))
+            order = models.Order.objects.create(restaurant_id=restaurant_id, delivery_date=date.today() + timedelta(days=2))
+            models.OrderItem.objects.bulk_create([models.OrderItem(order=order, product_id=pk, quantity=1,
+                                                                   unit_price_snapshot=prices[pk]) for pk in ids])
+
+    def read(rng):
+        list(ProductViewSet.queryset.filter(category=rng.choice(categories)).order_by("name")[:CATALOG_PAGE])
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        local = {kind: {"ok": [], "errors": 0} for kind in stats}
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        try:
+            while time.perf_counter() < deadline:
+                kind = "write" if rng.random() < write_share else "read"
+                began = time.perf_counter()
+                try:
+                    (write if kind == "write" else read)(rng)
+                    local[kind]["ok"].append((time.perf_counter() - began) * 1000)
+                except OperationalError as e:
+                    local[kind]["errors"] += 1
+                    with lock:
+                        errors[str(e)] = errors.get(str(e), 0) + 1
+        finally:
+            connection.close()
+        with lock:
+            for kind, values in local.items():
+                stats[kind]["ok"] += values["ok"]
+                stats[kind]["errors"] += values["errors"]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    with connection.cursor() as cursor:
+        pragmas = {}
+        for name in ("journal_mode", "synchronous", "busy_timeout"):
+            pragmas[name] = cursor.execute(f"PRAGMA {name}").fetchone()[0]
+    result = {"workers": workers, "seconds": seconds, "write_share": write_share, "pragmas": pragmas,
+              "transaction_mode": getattr(connection, "transaction_mode", None), "errors": errors}
+    for kind, values in stats.items():
+        ok = values["ok"]
+        result[kind] = {"ok": len(ok), "errors": values["errors"], "per_second": round(len(ok) / seconds, 1),
+                        "p50_ms": round(percentile(ok, 50), 2) if ok else None,
+                        "p95_ms": round(percentile(ok, 95), 2) if ok else None}
+    result["per_second"] = round(result["read"]["per_second"] + result["write"]["per_second"], 1)
+    return result
+
+def sqlite_profiles(profiles=("basic", "production"), workers=8, seconds=5.0, write_share=0.2, log=print):
+    """
+    mixed_load under each settings.SQLITE_PROFILES entry, each in a fresh `manage.py bench_sqlite
+    --profile-run` process (the profile is applied when connections are created) on its own copy
+    of the default database, so the runs do not affect each other or the real data.
+    """
+    if connection.vendor != "sqlite":
+        raise ValueError("The default database is not SQLite")
+    connection.ensure_connection()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in profiles:
+            path, output = os.path.join(tmp, f"{profile}.sqlite3"), os.path.join(tmp, f"{profile}.json")
+            with closing(sqlite3.connect(path)) as copy:
+                connection.connection.backup(copy)
+                copy.execute("PRAGMA journal_mode=DELETE")  # the basic profile keeps the rollback journal
+            env = {**os.environ, "DB_BACKEND": "sqlite", "SQLITE_PROFILE": profile, "SQLITE_PATH": path,
+                   "SQLITE_REPLICA_PATH": ""}
+            subprocess.run([sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_sqlite", "--profile-run",
+                            "--workers", str(workers), "--seconds", str(seconds), "--write-share", str(write_share),
+                            "--output", output], env=env, check=True)
+            with open(output, encoding="utf-8") as f:
+                r = results[profile] = json.load(f)
+            log(f"{profile:11} {r['per_second']:8.1f} ops/s  reads {r['read']['per_second']:7.1f}/s "
+                f"(p95 {r['read']['p95_ms']}ms, {r['read']['errors']} failed)  "
+                f"writes {r['write']['per_second']:6.1f}/s (p95 {r['write']['p95_ms']}ms, {r['write']['errors']} failed)  "
+                f"journal={r['pragmas']['journal_mode']}")
+    return results
@@ -0,0 +1,71 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+from . import routing
+
+VERSION_KEY = "catalog:version"
+MODIFIED_KEY = "catalog:last_modified"
+
+def catalog_state():
+    """(version, last_modified) of the product catalog, both kept in the cache."""
+    state = cache.get_many([VERSION_KEY, MODIFIED_KEY])
+    if VERSION_KEY not in state:
+        # seeded from the clock so versions stay unique across cache flushes
+        cache.add(VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        cache.add(MODIFIED_KEY, time.time(), timeout=None)
+        state = cache.get_many([VERSION_KEY, MODIFIED_KEY])
+    return state[VERSION_KEY], state.get(MODIFIED_KEY) or time.time()
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        catalog_state()
+    cache.set(MODIFIED_KEY, time.time(), timeout=None)
+
+def bump_catalog_version():
+    # now, so this transaction's own reads miss the cache, and again on commit so a
+    # response cached by a concurrent reader in between is not served afterwards
+    _bump()
+    transaction.on_commit(_bump)
+
+def cached_list(view, request, *args, **kwargs):
+    """
+    ETag / Last-Modified conditional GET plus a server-side response cache for a catalog list.
+    A matching client gets 304 before any query runs; otherwise the serialized page is
+    cached under the catalog version, so any bump invalidates every cached variant at once.
+    """
+    version, modified = catalog_state()
+    variant = "|".join([
+        request.get_full_path(), request.accepted_renderer.format or "",
+        # availability is computed against today's date
+        str(timezone.now().date()),
+        # anything else the view renders per viewer (e.g. the display currency)
+        view.cache_variant(request) if hasattr(view, "cache_variant") else "",
+    ])
+    digest = hashlib.sha1(variant.encode("utf-8")).hexdigest()[:20]
+    etag = f'"catalog-{version}-{digest}"'
+    last_modified = int(modified)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is None:
+        key = f"catalog:response:{version}:{digest}"
+        data = cache.get(key)
+        if data is None:
+            # filled from the primary: a lagging replica would store an old page under the new version
+            routing.use_primary()
+            data = view.list_uncached(request, *args, **kwargs).data
+            cache.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+        response = Response(data)
+    else:
+        response = Response(status=not_modified.status_code)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from . import models
+
+class CapacityExceeded(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_code = "capacity_exceeded"
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__({"detail": "Not enough capacity for the delivery date.", "shortages": shortages})
+
+class _Short(Exception):
+    pass
+
+def _deltas(before, after):
+    """{(product_id, delivery_date): quantity to take (positive) or give back (negative)}."""
+    deltas = defaultdict(Decimal)
+    for sign, lines in ((-1, before), (1, after)):
+        for product_id, delivery_date, quantity in lines:
+            deltas[(product_id, delivery_date)] += sign * Decimal(quantity)
+    return {key: delta for key, delta in deltas.items() if delta}
+
+def _rows(keys):
+    q = Q()
+    for product_id, delivery_date in keys:
+        q |= Q(product_id=product_id, delivery_date=delivery_date)
+    return models.ProductCapacity.objects.filter(q)
+
+def adjust(before=(), after=()):
+    """
+    Move reservations from the `before` lines to the `after` lines, each line being
+    (product_id, delivery_date, quantity): reserve(lines) is adjust((), lines), release is
+    adjust(lines, ()). The ledger rows involved are read (locked where supported) and change in
+    one conditional UPDATE (`remaining = remaining - delta WHERE remaining >= delta`), so two
+    buyers can never both take the last units; if any row is short nothing changes and
+    CapacityExceeded is raised. Keys without a ledger row are unlimited. Returns the keys of
+    `after` that have a row: what was taken and is to be recorded as reserved by the caller.
+    """
+    deltas = _deltas(before, after)
+    wanted = {(product_id, delivery_date) for product_id, delivery_date, _ in after}
+    if not deltas and not wanted:
+        return set()
+    try:
+        with transaction.atomic():
+            rows = _rows(set(deltas) | wanted)
+            if connection.features.has_select_for_update:
+                # lock in a fixed order so concurrent batches cannot deadlock (SQLite's BEGIN
+                # IMMEDIATE already holds the write lock)
+                rows = rows.select_for_update().order_by("product_id", "delivery_date")
+            managed = set(rows.values_list("product_id", "delivery_date"))
+            deltas = {key: d for key, d in deltas.items() if key in managed}
+            if deltas:
+                delta = Case(*[When(product_id=p, delivery_date=d, then=Value(v)) for (p, d), v in deltas.items()],
+                             output_field=DecimalField(max_digits=12, decimal_places=2))
+                if _rows(deltas).filter(remaining__gte=delta).update(remaining=F("remaining") - delta) < len(deltas):
+                    raise _Short
+    except _Short:
+        shortages = [{"product": row.product_id, "delivery_date": row.delivery_date,
+                      "requested": deltas[(row.product_id, row.delivery_date)], "remaining": row.remaining}
+                     for row in _rows(deltas).order_by("product_id", "delivery_date")
+                     if row.remaining < deltas[(row.product_id, row.delivery_date)]]
+        raise CapacityExceeded(shortages)
+    return managed & wanted
+
+def reserve(lines):
+    return adjust((), lines)
+
+def release(lines):
+    adjust(lines, ())
+
+def reserve_batches(batches):
+    """
+    Reserve several independent line sets at once, e.g. one per order of a bulk request: the
+    ledger rows are read (locked where the database supports it), each set is taken in turn
+    or reported short without affecting the others, and the accepted total is written in one
+    conditional UPDATE. Returns each set's shortages ([] when reserved) and the keys that have
+    a ledger row, i.e. were taken from. Must run inside the caller's transaction, which makes
+    the read and the write one unit.
+    """
+    per_set = [_deltas((), lines) for lines in batches]
+    keys = set().union(*per_set)
+    if not keys:
+        return [[] for _ in per_set], set()
+    rows = _rows(keys).order_by("product_id", "delivery_date")
+    if connection.features.has_select_for_update:
+        rows = rows.select_for_update()
+    balance = {(row.product_id, row.delivery_date): row.remaining for row in rows}
+    results, taken = [], defaultdict(Decimal)
+    for deltas in per_set:
+        managed = {key: delta for key, delta in deltas.items() if key in balance}
+        short = [{"product": p, "delivery_date": d, "requested": delta, "remaining": balance[(p, d)]}
+                 for (p, d), delta in sorted(managed.items()) if balance[(p, d)] < delta]
+        if not short:
+            for key, delta in managed.items():
+                balance[key] -= delta
+                taken[key] += delta
+        results.append(short)
+    taken = {key: delta for key, delta in taken.items() if delta}
+    if taken:
+        delta = Case(*[When(product_id=p, delivery_date=d, then=Value(v)) for (p, d), v in taken.items()],
+                     output_field=DecimalField(max_digits=12, decimal_places=2))
+        if _rows(taken).filter(remaining__gte=delta).update(remaining=F("remaining") - delta) < len(taken):
+            # rows were locked or read in this transaction, so only a caller running in autocommit gets here
+            raise OperationalError("capacity ledger changed during a batch reservation; retry")
+    return results, set(balance)
+
+def set_capacity(product_id, delivery_date, total):
+    """Create or resize a ledger row; shrinking below what is already reserved raises CapacityExceeded."""
+    total = Decimal(total)
+    rows = models.ProductCapacity.objects.filter(product_id=product_id, delivery_date=delivery_date)
+    with transaction.atomic():
+        # reserved = total - remaining must still fit: remaining + (new total - old total) >= 0
+        if rows.filter(remaining__gte=F("total") - total).update(remaining=F("remaining") + total - F("total"), total=total):
+            return rows.get()
+        row = rows.first()
+        if row is None:
+            return models.ProductCapacity.objects.create(product_id=product_id, delivery_date=delivery_date,
+                                                         total=total, remaining=total)
+    # the new total is what is left after the reservations already made
+    raise CapacityExceeded([{"product": product_id, "delivery_date": delivery_date, "requested": row.total - row.remaining,
+                             "remaining": total}])
+
+# ---------- what an order / preorder holds ----------
+def locked(model, pk):
+    """
+    Re-read a row inside the caller's transaction, locked until it commits (SELECT ... FOR UPDATE
+    where supported; SQLite's BEGIN IMMEDIATE already holds the write lock), or None once deleted.
+    What an order / preorder held is taken from this row, never from an instance loaded before
+    the transaction: two concurrent cancels would otherwise both release the same quantity.
+    """
+    queryset = model.objects.filter(pk=pk)
+    if connection.features.has_select_for_update and connection.in_atomic_block:
+        queryset = queryset.select_for_update()
+    return queryset.first()
+
+# Each order item / preorder records in reserved_quantity what it actually took from the ledger;
+# only that is ever given back, so a line placed before its ledger row existed releases nothing.
+def order_snapshot(order):
+    """The stored order's items (product_id, quantity, reserved_quantity), delivery date and status, read before a change."""
+    items = list(models.OrderItem.objects.filter(order_id=order.pk).values_list("product_id", "quantity", "reserved_quantity"))
+    return items, order.delivery_date, order.status
+
+def _wanted(items, delivery_date, status):
+    return [] if status == "cancelled" else [(product_id, delivery_date, quantity) for product_id, quantity, *_ in items]
+
+def order_lines(order, items):
+    """Ledger lines an order asks for: one per item on its delivery date, none once cancelled."""
+    return _wanted(items, order.delivery_date, order.status)
+
+def move_order(order, snapshot):
+    """
+    After a status / delivery date change give back what the items held and take what the
+    order asks for now. Nothing moves when that is unchanged, so an unrelated edit does not
+    start charging an order that was placed before its ledger row existed.
+    """
+    items, delivery_date, status = snapshot
+    after = order_lines(order, items)
+    if after == _wanted(items, delivery_date, status):
+        return
+    taken = {product_id for product_id, _ in adjust([(p, delivery_date, r) for p, _, r in items if r], after)}
+    if any((quantity if product_id in taken else 0) != reserved for product_id, quantity, reserved in items):
+        models.OrderItem.objects.filter(order_id=order.pk).update(reserved_quantity=Case(
+            When(product_id__in=taken, then=F("quantity")), default=Value(Decimal(0))))
+
+def release_order(order):
+    items, delivery_date, _ = order_snapshot(order)
+    release([(product_id, delivery_date, reserved) for product_id, _, reserved in items if reserved])
+
+def preorder_lines(preorder):
+    return [] if preorder.status == "cancelled" else [(preorder.product_id, preorder.delivery_date, preorder.quantity)]
+
+def preorder_held(preorder):
+    return [(preorder.product_id, preorder.delivery_date, preorder.reserved_quantity)] if preorder.reserved_quantity else []
+
+def move_preorder(preorder, snapshot):
+    """Like move_order; `snapshot` is (preorder_held, preorder_lines) of the stored row."""
+    held, before = snapshot
+    after = preorder_lines(preorder)
+    if after == before:
+        return
+    taken = adjust(held, after)
+    reserved = preorder.quantity if (preorder.product_id, preorder.delivery_date) in taken else Decimal(0)
+    if reserved != preorder.reserved_quantity:
+        models.PreOrder.objects.filter(pk=preorder.pk).update(reserved_quantity=reserved)
+        preorder.reserved_quantity = reserved
+
+# ---------- stress test ----------
+def stress(keys, workers=16, attempts=20, quantity=1, retries=100):
+    """
+    `workers` threads, each on its own connection, start together and try `attempts`
+    reservations of `quantity` on every (product_id, delivery_date) in `keys` at once.
+    Lock conflicts are retried. With no oversell every row ends with remaining >= 0 and
+    total - remaining == accepted * quantity, i.e. multi-row reservations were all-or-nothing.
+    """
+    counts, lock = {"accepted": 0, "rejected": 0, "retries": 0, "failed": 0}, threading.Lock()
+    lines = [(product_id, delivery_date, quantity) for product_id, delivery_date in keys]
+    start = threading.Barrier(workers)
+
+    def count(outcome):
+        with lock:
+            counts[outcome] += 1
+
+    def worker():
+        start.wait()
+        try:
+            for _ in range(attempts):
+                for _ in range(retries):
+                    try:
+                        reserve(lines)
+                        count("accepted")
+                    except CapacityExceeded:
+                        count("rejected")
+                    except OperationalError:  # "database is locked" on SQLite, lock/serialization errors on Postgres
+                        count("retries")
+                        time.sleep(0.001)
+                        continue
+                    break
+                else:
+                    count("failed")
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    rows = list(_rows(keys).order_by("product_id", "delivery_date").values("product_id", "delivery_date", "total", "remaining"))
+    counts["rows"] = rows
+    counts["oversold"] = len(rows) != len(keys) or any(
+        row["remaining"] < 0 or row["total"] - row["remaining"] != counts["accepted"] * Decimal(quantity) for row in rows)
+    return counts
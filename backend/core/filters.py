@@ -0,0 +1,66 @@
+import django_filters
+from django.utils import timezone
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from . import models
+
+class AliasedOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that maps public names to the indexed columns behind them via view.ordering_aliases."""
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        aliases = getattr(view, "ordering_aliases", {})
+        if not ordering or not aliases:
+            return ordering
+        return [("-" if f.startswith("-") else "") + aliases.get(f.lstrip("-"), f.lstrip("-")) for f in ordering]
+
+class DateRangeCSVFilter(django_filters.BaseRangeFilter, django_filters.DateFilter):
+    pass
+
+class ProductFilter(django_filters.FilterSet):
+    # availability runs as SQL predicates on available_from / available_to
+    available = django_filters.BooleanFilter(method="filter_available")
+    available_on = django_filters.DateFilter(method="filter_available_on")
+    available_between = DateRangeCSVFilter(method="filter_available_between")
+
+    class Meta:
+        model = models.Product
+        fields = ["category","supplier__verified","supplier__is_farmer"]
+
+    def filter_available(self, queryset, name, value):
+        today = timezone.now().date()
+        if value: return queryset.available_on(today)
+        return queryset.exclude(models.available_q(today))
+
+    def filter_available_on(self, queryset, name, value):
+        return queryset.available_on(value)
+
+    def filter_available_between(self, queryset, name, value):
+        if len(value) != 2 or value[0] > value[1]:
+            raise ValidationError({name: ["Expected two dates: start,end."]})
+        return queryset.available_between(*value)
+
+class CalendarEventFilter(django_filters.FilterSet):
+    # ranges run on the (restaurant|supplier, date, id) indexes
+    date_after = django_filters.DateFilter(field_name="date", lookup_expr="gte")
+    date_before = django_filters.DateFilter(field_name="date", lookup_expr="lte")
+
+    class Meta:
+        model = models.CalendarEvent
+        fields = ["restaurant","supplier","event_type","status","date"]
+
+class SpendFilter(django_filters.FilterSet):
+    # month ranges run on the (restaurant, month, category) unique index
+    month_after = django_filters.DateFilter(field_name="month", lookup_expr="gte")
+    month_before = django_filters.DateFilter(field_name="month", lookup_expr="lte")
+
+    class Meta:
+        model = models.RestaurantSpend
+        fields = ["restaurant","category","month"]
+
+class SalesFilter(django_filters.FilterSet):
+    week_after = django_filters.DateFilter(field_name="week", lookup_expr="gte")
+    week_before = django_filters.DateFilter(field_name="week", lookup_expr="lte")
+
+    class Meta:
+        model = models.SupplierSales
+        fields = ["supplier","product","week"]
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Round
+from rest_framework.exceptions import ValidationError
+from . import models
+
+logger = logging.getLogger("core.fx")
+
+BASE = "EUR"
+CURRENCIES = [c for c, _ in models.Product.CURRENCY_CHOICES]
+CENTS = Decimal("0.01")
+# price_eur keeps 4 decimals; it is rounded before it is stored, in Python and in SQL alike (half
+# away from zero), so the value a keyset cursor reads back is exactly the one it is compared with
+EUR_PLACES = 4
+
+# ---------- rates (in-process cache) ----------
+_lock = threading.Lock()
+_cache = {"rates": None, "loaded_at": 0.0}
+
+def cache_seconds():
+    return getattr(settings, "FX_CACHE_SECONDS", 60)
+
+def rates():
+    """{currency: rate_to_eur}, read from FxRate at most once per FX_CACHE_SECONDS per process."""
+    cached = _cache["rates"]
+    if cached is not None and time.monotonic() - _cache["loaded_at"] < cache_seconds():
+        return cached
+    loaded = {BASE: Decimal(1), **dict(models.FxRate.objects.values_list("currency", "rate_to_eur"))}
+    with _lock:
+        _cache.update(rates=loaded, loaded_at=time.monotonic())
+    return loaded
+
+def invalidate():
+    # this process only; other workers pick new rates up within FX_CACHE_SECONDS
+    with _lock:
+        _cache.update(rates=None, loaded_at=0.0)
+
+def rate(currency, table=None):
+    table = table if table is not None else rates()
+    if currency not in table:
+        logger.warning("no FxRate for %s, treating it as 1 %s", currency, BASE)
+        return Decimal(1)
+    return table[currency]
+
+# ---------- conversion ----------
+def to_eur(amount, currency, table=None):
+    amount = amount if currency == BASE else amount * rate(currency, table)
+    return Decimal(amount).quantize(Decimal(1).scaleb(-EUR_PLACES), rounding=ROUND_HALF_UP)
+
+def from_eur(amount_eur, currency, table=None):
+    amount = amount_eur if currency == BASE else amount_eur / rate(currency, table)
+    return Decimal(amount).quantize(CENTS)
+
+def price_eur_expression(table=None):
+    """SQL for Product.price_eur from price_per_unit and currency, rates inlined as literals."""
+    table = table if table is not None else rates()
+    output = DecimalField(max_digits=16, decimal_places=EUR_PLACES)
+    return Round(Case(*[When(currency=c, then=F("price_per_unit") * Value(rate(c, table)))
+                        for c in CURRENCIES if c != BASE],
+                      default=F("price_per_unit"), output_field=output), EUR_PLACES, output_field=output)
+
+def refresh_prices(product_ids=None):
+    """Recompute price_eur in one UPDATE (all products, or `product_ids`); for bulk writes and rate changes."""
+    queryset = models.Product.objects.all()
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=list(product_ids))
+    return queryset.update(price_eur=price_eur_expression())
+
+def set_price_eur(product):
+    product.price_eur = to_eur(Decimal(product.price_per_unit), product.currency)
+
+# ---------- per request ----------
+def request_currency(request):
+    """?currency=, else the restaurant's preferred_currency, else EUR; resolved once per request."""
+    request = getattr(request, "_request", request)
+    if not hasattr(request, "_fx_currency"):
+        currency = request.GET.get("currency")
+        if currency is None:
+            profile = getattr(request.user, "restaurant_profile", None) if request.user.is_authenticated else None
+            currency = profile.preferred_currency if profile else BASE
+        elif currency not in CURRENCIES:
+            raise ValidationError({"currency": [f"Must be one of: {', '.join(CURRENCIES)}."]})
+        request._fx_currency = currency
+    return request._fx_currency
@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.utils import timezone
+
+CRLF = "\r\n"
+
+def escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold(line):
+    # RFC 5545 3.1: lines longer than 75 octets continue on lines starting with a space
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + CRLF
+    parts, start = [], 0
+    while start < len(raw):
+        end = min(start + (75 if not parts else 74), len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(raw[start:end].decode("utf-8"))
+        start = end
+    return CRLF.join(parts[:1] + [" " + p for p in parts[1:]]) + CRLF
+
+def calendar_header(name):
+    return "".join(fold(l) for l in [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//RestockHub//Calendar//EN", "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{escape(name)}",
+    ])
+
+def calendar_footer():
+    return fold("END:VCALENDAR")
+
+def event(uid, day, summary, description="", status="CONFIRMED", stamp=None):
+    stamp = (stamp or timezone.now()).strftime("%Y%m%dT%H%M%SZ")
+    return "".join(fold(l) for l in [
+        "BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{stamp}",
+        f"DTSTART;VALUE=DATE:{day:%Y%m%d}", f"DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}",
+        f"SUMMARY:{escape(summary)}", f"DESCRIPTION:{escape(description)}", f"STATUS:{status}",
+        "END:VEVENT",
+    ])
@@ -0,0 +1,145 @@
+import codecs
+import csv
+import zipfile
+from datetime import datetime
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+from . import caching, fx, matching, models, prices, rollups, search, waitlist
+
+BATCH_SIZE = 1000
+UPDATABLE = ["category", "price_per_unit", "currency", "available_from", "available_to"]
+
+class PriceListError(ValueError):
+    pass
+
+class PriceListRowSerializer(drf_serializers.Serializer):
+    name = drf_serializers.CharField(max_length=255)
+    unit = drf_serializers.CharField(max_length=50, required=False, default="kg")
+    category = drf_serializers.CharField(max_length=100, required=False)
+    price_per_unit = drf_serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    currency = drf_serializers.ChoiceField(choices=models.Product.CURRENCY_CHOICES, required=False)
+    available_from = drf_serializers.DateField(required=False)
+    available_to = drf_serializers.DateField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # spreadsheets: "price" alias, blank cells mean "not given"
+        data = {k.strip().lower(): v.date() if isinstance(v, datetime) else v
+                for k, v in data.items() if k and v not in (None, "")}
+        if "price" in data and "price_per_unit" not in data: data["price_per_unit"] = data.pop("price")
+        return super().to_internal_value(data)
+
+# ---------- parsing (streamed, row by row) ----------
+def read_csv(fileobj):
+    # binary file or upload; decoded incrementally line by line
+    try:
+        yield from csv.DictReader(codecs.iterdecode(fileobj, "utf-8-sig"))
+    except UnicodeDecodeError:
+        raise PriceListError("The CSV file is not UTF-8 encoded; save it as \"CSV UTF-8\" and upload again.")
+    except csv.Error as e:
+        raise PriceListError(f"The CSV file cannot be read: {e}")
+
+def read_xlsx(fileobj):
+    try:
+        import openpyxl
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise PriceListError("XLSX price lists need openpyxl (pip install openpyxl); upload CSV instead.")
+    try:
+        sheet = openpyxl.load_workbook(fileobj, read_only=True, data_only=True).active
+    # not a zip / not a workbook / a zip without the workbook parts
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError, ValueError) as e:
+        raise PriceListError(f"The XLSX file cannot be read: {e}")
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(h or "").strip() for h in next(rows, [])]
+    for values in rows:
+        yield dict(zip(header, values))
+
+def read_rows(fileobj, filename):
+    return read_xlsx(fileobj) if filename.lower().endswith((".xlsx", ".xlsm")) else read_csv(fileobj)
+
+def batches(rows, size):
+    batch = []
+    for line, row in enumerate(rows, start=2):  # line 1 is the header
+        batch.append((line, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# ---------- applying ----------
+def _apply_batch(supplier, batch, report):
+    """Apply one batch of parsed rows; returns the ids of products created or changed."""
+    valid = {}
+    for line, row in batch:
+        s = PriceListRowSerializer(data=row)
+        if s.is_valid():
+            data = s.validated_data
+            valid[(data["name"], data["unit"])] = (line, data)  # last line wins within a batch
+        else:
+            report["errors"].append({"line": line, "errors": s.errors})
+    if not valid:
+        return []
+
+    existing = {}
+    for p in models.Product.objects.filter(supplier=supplier, name__in={k[0] for k in valid}).order_by("-id"):
+        existing[(p.name, p.unit)] = p  # lowest id wins if the catalog already has duplicates
+
+    to_create, to_update, repriced = [], [], []
+    for key, (line, data) in valid.items():
+        product = existing.get(key)
+        if product is None:
+            to_create.append(models.Product(
+                supplier=supplier, name=data["name"], unit=data["unit"], category=data.get("category", ""),
+                price_per_unit=data["price_per_unit"], currency=data.get("currency", "EUR"),
+                available_from=data.get("available_from") or timezone.now().date(),
+                available_to=data.get("available_to")))
+            continue
+        changes = {f: [getattr(product, f), data[f]] for f in UPDATABLE if f in data and getattr(product, f) != data[f]}
+        if changes:
+            for f, (_, new) in changes.items(): setattr(product, f, new)
+            to_update.append(product)
+            if changes.keys() & set(prices.PRICE_FIELDS): repriced.append(product)
+            report["updated"].append({"id": product.id, "name": product.name, "unit": product.unit, "changes": changes})
+        else:
+            report["unchanged"] += 1
+
+    for product in to_create + to_update:
+        fx.set_price_eur(product)  # bulk writes skip the pre_save signal
+        matching.set_category_key(product)
+    if to_create:
+        models.Product.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        report["created"] += [{"id": p.id, "name": p.name, "unit": p.unit} for p in to_create]
+    if to_update:
+        # existing OrderItem.unit_price_snapshot rows keep the price they were ordered at;
+        # orders placed after the import snapshot the new price
+        models.Product.objects.bulk_update(to_update, UPDATABLE + ["price_eur", "category_key"], batch_size=BATCH_SIZE)
+        # a new category moves the products' past lines in the analytics rollups
+        rollups.products_saved(to_update)
+    # price history: the opening price of new products and real changes only, one bulk insert per batch
+    prices.record(to_create + repriced)
+    # bulk writes skip model signals, so do their work once per batch
+    touched = [p.id for p in to_create] + [p.id for p in to_update]
+    if touched:
+        search.index_products(touched)
+        waitlist.schedule(touched)
+    return touched
+
+def import_price_list(supplier, rows, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Upsert a supplier's price list, matching products on (supplier, name, unit).
+    Returns a diff report: created / updated (with old and new values) / unchanged / errors.
+    """
+    report = {"created": [], "updated": [], "unchanged": 0, "errors": []}
+    touched = False
+    with transaction.atomic():
+        for batch in batches(rows, batch_size):
+            touched = bool(_apply_batch(supplier, batch, report)) or touched
+        if dry_run:
+            transaction.set_rollback(True)
+        elif touched:
+            caching.bump_catalog_version()
+    report["summary"] = {"created": len(report["created"]), "updated": len(report["updated"]),
+                         "unchanged": report["unchanged"], "errors": len(report["errors"]), "dry_run": dry_run}
+    return report
@@ -0,0 +1,192 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger("core.instrumentation")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+WORST_QUERIES = 3
+
+def slow_ms():
+    return getattr(settings, "REQUEST_SLOW_MS", 500)
+
+# ---------- per-request SQL accounting ----------
+class QueryRecorder:
+    """
+    connection.execute_wrapper hook: counts queries and sums their time, keeping only
+    the few slowest statements. Unlike CaptureQueriesContext it stores no SQL per query,
+    so it is cheap enough to run on every request.
+    """
+    def __init__(self, keep=WORST_QUERIES):
+        self.count, self.seconds, self.keep, self.worst = 0, 0.0, keep, []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.worst) < self.keep:
+                heapq.heappush(self.worst, (elapsed, self.count, sql))
+            elif elapsed > self.worst[0][0]:
+                heapq.heapreplace(self.worst, (elapsed, self.count, sql))
+
+    def worst_queries(self):
+        return [{"ms": round(s * 1000, 2), "sql": sql[:500]} for s, _, sql in sorted(self.worst, reverse=True)]
+
+# the current request's recorder; context variables follow a request into sync_to_async threads,
+# so queries the async ORM runs on a worker thread are still attributed to the right request
+_recorder = ContextVar("instrumentation_recorder", default=None)
+
+def _dispatch(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+def install(connection):
+    """Hook a database connection once (connection_created signal); idle cost is one context lookup per query."""
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch)
+
+# ---------- metrics ----------
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets, self.counts, self.sum, self.count = buckets, [0] * (len(buckets) + 1), 0.0, 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+class Registry:
+    """Per-process metrics, keyed by (view, method); each worker process reports its own."""
+    HISTOGRAMS = (
+        ("restockhub_request_duration_seconds", "Request wall time", DURATION_BUCKETS),
+        ("restockhub_request_sql_seconds", "Time spent in SQL per request", DURATION_BUCKETS),
+        ("restockhub_request_queries", "SQL queries per request", QUERY_BUCKETS),
+        ("restockhub_response_size_bytes", "Response body size (non-streaming responses)", SIZE_BUCKETS),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (metric, view, method) -> Histogram
+        self.responses = {}   # (view, method, status) -> count
+
+    def observe(self, view, method, status, duration, sql_seconds, queries, size):
+        with self.lock:
+            for (name, _, buckets), value in zip(self.HISTOGRAMS, (duration, sql_seconds, queries, size)):
+                if value is None:
+                    continue
+                key = (name, view, method)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(buckets)
+                self.histograms[key].observe(value)
+            key = (view, method, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, help_text, _ in self.HISTOGRAMS:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (metric, view, method), histogram in sorted(self.histograms.items()):
+                    if metric == name:
+                        lines += histogram.lines(name, f'view="{view}",method="{method}"')
+            lines += ["# HELP restockhub_responses_total Responses by status code", "# TYPE restockhub_responses_total counter"]
+            lines += [f'restockhub_responses_total{{view="{v}",method="{m}",status="{s}"}} {n}'
+                      for (v, m, s), n in sorted(self.responses.items())]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.responses.clear()
+
+registry = Registry()
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return (match.view_name or match.route or "unknown").replace('"', "")
+
+# ---------- middleware ----------
+class InstrumentationMiddleware:
+    """
+    Records wall time, SQL query count and time, and payload size for every request:
+    - `Server-Timing: app;dur=..., db;dur=...;desc="N queries"` on the response
+    - a warning on the "core.instrumentation" logger, with the slowest queries, past REQUEST_SLOW_MS
+    - per-view histograms for the /metrics endpoint
+    Sync and async capable, so async views are not pushed onto a thread by this middleware.
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path == "/metrics":
+            return self.get_response(request)
+        recorder, start = QueryRecorder(), time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.record(request, response, recorder, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if request.path == "/metrics":
+            return await self.get_response(request)
+        recorder, start = QueryRecorder(), time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.record(request, response, recorder, time.perf_counter() - start)
+
+    def record(self, request, response, recorder, duration):
+        size = None if response.streaming else len(response.content)
+        response["Server-Timing"] = (f"app;dur={duration * 1000:.1f}, "
+                                     f'db;dur={recorder.seconds * 1000:.1f};desc="{recorder.count} queries"')
+        view = view_label(request)
+        registry.observe(view, request.method, response.status_code, duration, recorder.seconds, recorder.count, size)
+        if duration * 1000 >= slow_ms():
+            logger.warning("slow request %s %s (%s) %.0fms, %d queries in %.0fms, %s bytes; worst: %s",
+                           request.method, request.get_full_path(), view, duration * 1000, recorder.count,
+                           recorder.seconds * 1000, size, recorder.worst_queries())
+        return response
+
+def metrics(request):
+    """
+    Prometheus text exposition, for `Authorization: Bearer <METRICS_TOKEN>`; without a token
+    configured only under DEBUG, since per-view traffic and latencies are not public.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if (request.headers.get("Authorization") != f"Bearer {token}") if token else not settings.DEBUG:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,66 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+DURATION = 10.0
+CONCURRENCY = 100
+READ_CHUNK = 1024
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))] if ordered else 0.0
+
+async def fetch(url, headers=(), slow_read_ms=0):
+    """
+    One GET on its own connection (Connection: close), read to EOF. With slow_read_ms the body is
+    read one READ_CHUNK at a time with a pause in between, like a phone on poor Wi-Fi, so the
+    server has to keep the response open for the whole transfer.
+    """
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    lines = [f"GET {target} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close", "Accept: application/json",
+             *headers, "", ""]
+    writer.write("\r\n".join(lines).encode("latin-1"))
+    await writer.drain()
+    status_line = await reader.readline()
+    size = len(status_line)
+    while chunk := await reader.read(READ_CHUNK):
+        size += len(chunk)
+        if slow_read_ms:
+            await asyncio.sleep(slow_read_ms / 1000)
+    writer.close()
+    return int(status_line.split()[1]), size
+
+async def run_target(url, concurrency=CONCURRENCY, duration=DURATION, headers=(), slow_read_ms=0):
+    """`concurrency` clients issuing requests back to back for `duration` seconds."""
+    latencies, errors, deadline = [], {}, time.monotonic() + duration
+
+    async def client():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status, _ = await fetch(url, headers, slow_read_ms)
+            except (OSError, asyncio.IncompleteReadError, IndexError, ValueError) as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                await asyncio.sleep(0.05)
+                continue
+            if status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    return {
+        "url": url, "concurrency": concurrency, "seconds": round(elapsed, 2), "ok": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1), "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 1), "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+    }
+
+def run(targets, **options):
+    """{name: url} -> {name: result}; targets run one after another so they do not compete."""
+    return {name: asyncio.run(run_target(url, **options)) for name, url in targets.items()}
@@ -0,0 +1,43 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from core import benchmark
+
+class Command(BaseCommand):
+    help = "Time every GET route of the API router (latency percentiles, SQL query counts); seed with seed_demo --scale first"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=benchmark.REPEAT)
+        parser.add_argument("--warmup", type=int, default=benchmark.WARMUP)
+        parser.add_argument("--cold", action="store_true", help="Clear the cache before every request")
+        parser.add_argument("--only", action="append", help="Only endpoints whose name contains this (repeatable)")
+        parser.add_argument("--output", help="Write the JSON results to this file")
+        parser.add_argument("--compare", help="Baseline JSON from an earlier run; exit 1 on regressions")
+        parser.add_argument("--serializers", action="store_true",
+                            help="Compare DRF and fast list serialization on the same rows instead of timing routes")
+        parser.add_argument("--fields", help="With --serializers: a ?fields= list to serialize, e.g. id,name")
+        parser.add_argument("--threshold", type=float, default=benchmark.THRESHOLD, help="Allowed p50 slowdown (0.2 = 20%%)")
+
+    def handle(self, *args, **options):
+        if options["serializers"]:
+            params = {"fields": options["fields"]} if options["fields"] else None
+            results = benchmark.serializers(repeat=options["repeat"], only=options["only"], params=params,
+                                            log=self.stdout.write)
+            if options["output"]:
+                with open(options["output"], "w", encoding="utf-8") as out:
+                    json.dump(results, out, ensure_ascii=False, indent=2)
+            if not all(r["identical"] for r in results.values()):
+                raise CommandError("Fast list serialization output differs from DRF")
+            return
+        results = benchmark.run(repeat=options["repeat"], warmup=options["warmup"], cold=options["cold"],
+                                only=options["only"], log=self.stdout.write)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as out:
+                json.dump(results, out, ensure_ascii=False, indent=2)
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as f:
+                regressions = benchmark.compare(json.load(f), results, options["threshold"])
+            for line in regressions:
+                self.stdout.write(self.style.WARNING(line))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['compare']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
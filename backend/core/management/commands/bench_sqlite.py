@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from core import benchmark
+
+class Command(BaseCommand):
+    help = ("Mixed order writes and catalog reads from parallel threads on copies of the SQLite database, "
+            "once per SQLITE_PROFILES entry (basic = Django defaults, production = WAL + IMMEDIATE + pragmas)")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each profile's run")
+        parser.add_argument("--write-share", type=float, default=0.2, help="Share of operations that write an order")
+        parser.add_argument("--profile", action="append", help="Profile to run (repeatable); default basic and production")
+        parser.add_argument("--output", help="Write the JSON results to this file")
+        parser.add_argument("--profile-run", action="store_true",
+                            help="Internal: run the load once on the configured database and write --output")
+
+    def handle(self, *args, **options):
+        load = {"workers": options["workers"], "seconds": options["seconds"], "write_share": options["write_share"]}
+        try:
+            if options["profile_run"]:
+                results = benchmark.mixed_load(**load)
+            else:
+                results = benchmark.sqlite_profiles(options["profile"] or ("basic", "production"),
+                                                    log=self.stdout.write, **load)
+        except ValueError as e:
+            raise CommandError(e)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as out:
+                json.dump(results, out, ensure_ascii=False, indent=2)
+        if not options["profile_run"] and {"basic", "production"} <= results.keys():
+            before, after = results["basic"]["per_second"], results["production"]["per_second"]
+            self.stdout.write(self.style.SUCCESS(f"production vs basic: x{round(after / before, 2) if before else 'inf'} "
+                                                 f"throughput, {results['production']['read']['errors'] + results['production']['write']['errors']} "
+                                                 f"failed vs {results['basic']['read']['errors'] + results['basic']['write']['errors']}"))
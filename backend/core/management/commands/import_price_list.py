@@ -0,0 +1,35 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from core import imports, models
+
+class Command(BaseCommand):
+    help = "Import a supplier price list (CSV or XLSX), upserting products by supplier + name + unit"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--supplier", type=int, required=True, help="SupplierProfile id")
+        parser.add_argument("--batch-size", type=int, default=imports.BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing")
+        parser.add_argument("--report", help="Write the full JSON diff report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            supplier = models.SupplierProfile.objects.get(pk=options["supplier"])
+        except models.SupplierProfile.DoesNotExist:
+            raise CommandError(f"Supplier {options['supplier']} does not exist")
+        try:
+            with open(options["path"], "rb") as f:
+                report = imports.import_price_list(supplier, imports.read_rows(f, options["path"]),
+                                                   batch_size=options["batch_size"], dry_run=options["dry_run"])
+        except imports.PriceListError as e:
+            raise CommandError(str(e))
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as out:
+                json.dump(report, out, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2)
+        for error in report["errors"][:20]:
+            self.stdout.write(self.style.WARNING(f"line {error['line']}: {error['errors']}"))
+        s = report["summary"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Dry run: ' if s['dry_run'] else ''}{s['created']} created, {s['updated']} updated, "
+            f"{s['unchanged']} unchanged, {s['errors']} errors"))
@@ -0,0 +1,33 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from core import loadtest
+
+class Command(BaseCommand):
+    help = ("Concurrent-connection load test against running servers, e.g. WSGI vs ASGI:\n"
+            "  gunicorn restockhub.wsgi -w 1 --threads 8 -b :8000 & uvicorn restockhub.asgi:application --port 8001 &\n"
+            "  manage.py load_test --target wsgi=http://127.0.0.1:8000/api/products/ "
+            "--target asgi=http://127.0.0.1:8001/api/async/products/ --concurrency 200 --slow-read-ms 50")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True, help="name=url (repeatable)")
+        parser.add_argument("--concurrency", type=int, default=loadtest.CONCURRENCY)
+        parser.add_argument("--duration", type=float, default=loadtest.DURATION, help="Seconds per target")
+        parser.add_argument("--slow-read-ms", type=int, default=0, help="Pause between 1 KB body reads (slow clients)")
+        parser.add_argument("--header", action="append", default=[], help="Extra request header, e.g. 'Cookie: sessionid=...'")
+        parser.add_argument("--output", help="Write the JSON results to this file")
+
+    def handle(self, *args, **options):
+        targets = {}
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url.startswith("http://"):
+                raise CommandError(f"Expected name=http://host:port/path, got {target!r}")
+            targets[name] = url
+        results = loadtest.run(targets, concurrency=options["concurrency"], duration=options["duration"],
+                               headers=options["header"], slow_read_ms=options["slow_read_ms"])
+        for name, r in results.items():
+            self.stdout.write(f"{name:10} {r['rps']:8.1f} req/s  p50 {r['p50_ms']:8.1f}ms  p99 {r['p99_ms']:8.1f}ms  "
+                              f"{r['ok']} ok  errors {r['errors'] or '-'}")
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as out:
+                json.dump(results, out, indent=2)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+from core import waitlist
+
+class Command(BaseCommand):
+    help = "Notify restaurants whose waitlisted products are now available"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--product", type=int, action="append", dest="products",
+                            help="Only these product ids (repeatable); default: every product with pending entries")
+        parser.add_argument("--batch-size", type=int, default=waitlist.BATCH_SIZE)
+        parser.add_argument("--sender", help="Dotted path of a sender class, overrides WAITLIST_NOTIFICATION_SENDER")
+
+    def handle(self, *args, **options):
+        sender = import_string(options["sender"])() if options["sender"] else None
+        if options["products"]:
+            marked = waitlist.notify(options["products"], sender=sender, batch_size=options["batch_size"])
+        else:
+            marked = waitlist.notify_all(sender=sender, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Notified {marked} waitlist entries"))
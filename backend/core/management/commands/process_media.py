@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from core import media, models
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/WebP derivatives for ProductMedia that are pending or failed (or --all)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenerate every image, not only pending/failed ones")
+
+    def handle(self, *args, **options):
+        queryset = models.ProductMedia.objects.order_by("id")
+        if not options["all"]:
+            queryset = queryset.exclude(processing_status="ready")
+        done = {"ready": 0, "failed": 0}
+        for media_id in queryset.values_list("id", flat=True).iterator():
+            status = media.process(media_id)
+            if status: done[status] += 1
+        self.stdout.write(self.style.SUCCESS(f"{done['ready']} processed, {done['failed']} failed"))
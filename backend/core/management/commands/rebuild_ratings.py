@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import ratings
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized user rating counters from Review"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = ratings.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Ratings rebuilt for {users} users"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core import rollups
+
+class Command(BaseCommand):
+    help = "Rebuild the spend / sales analytics rollups from OrderItem, one chunk of restaurants or suppliers per transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=rollups.CHUNK_SIZE, help="Owners per transaction")
+
+    def handle(self, *args, **options):
+        counts = rollups.rebuild(chunk_size=options["chunk_size"], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"Rollups rebuilt: {counts['spend']} spend rows, {counts['sales']} sales rows"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core import search
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index (after bulk loads that bypass signals)"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Product search index rebuilt"))
@@ -1,14 +1,22 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from core import models
+from core import models, seeding
 from datetime import date, timedelta
 
 User = get_user_model()
 
 class Command(BaseCommand):
-    help = "Seed demo data for RestockHub"
+    help = "Seed demo data for RestockHub (--scale N for a deterministic bulk data set)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, help="Bulk mode: %s rows per unit" % ", ".join(
+            f"{v} {k}" for k, v in seeding.PER_SCALE.items()))
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for --scale (same seed, same data)")
+        parser.add_argument("--reset", action="store_true", help="Delete a previous --scale data set first")
 
     def handle(self, *args, **options):
+        if options["scale"]:
+            return self.handle_scale(options)
         restaurant_u, _ = User.objects.get_or_create(username="demo_restaurant", defaults={"email": "resto@example.com"})
         restaurant_u.set_password("demo12345"); restaurant_u.is_restaurant=True; restaurant_u.save()
 
@@ -56,3 +64,12 @@ class Command(BaseCommand):
         models.ProductWaitlist.objects.get_or_create(product=p3,restaurant=resto,desired_quantity=12)
 
         self.stdout.write(self.style.SUCCESS("Seed completed. Users: demo_restaurant/demo12345, demo_supplier/demo12345, demo_farmer/demo12345"))
+
+    def handle_scale(self, options):
+        if options["reset"]:
+            seeding.reset()
+        elif seeding.bench_exists():
+            raise CommandError("A --scale data set already exists; pass --reset to replace it.")
+        counts = seeding.seed(options["scale"], seed=options["seed"], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f"Scale seed completed ({', '.join(f'{v} {k}' for k, v in counts.items())}). Users: bench_r0/bench12345"))
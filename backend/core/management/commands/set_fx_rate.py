@@ -0,0 +1,26 @@
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core import fx, models
+
+class Command(BaseCommand):
+    help = "Set FX rates as CURRENCY=RATE_TO_EUR pairs (e.g. USD=0.92 RUB=0.0105); product prices are re-converted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("rates", nargs="+")
+
+    def handle(self, *args, **options):
+        parsed = {}
+        for pair in options["rates"]:
+            currency, _, value = pair.partition("=")
+            currency = currency.upper()
+            if currency not in fx.CURRENCIES or currency == fx.BASE:
+                raise CommandError(f"Unknown currency in {pair!r}; expected one of {', '.join(fx.CURRENCIES[1:])}")
+            try:
+                parsed[currency] = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f"Invalid rate in {pair!r}")
+        with transaction.atomic():
+            for currency, rate in parsed.items():
+                models.FxRate.objects.update_or_create(currency=currency, defaults={"rate_to_eur": rate})
+        self.stdout.write(self.style.SUCCESS(", ".join(f"{c} = {r} EUR" for c, r in parsed.items())))
@@ -0,0 +1,40 @@
+import json
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core import capacity, models
+
+class Command(BaseCommand):
+    help = ("Parallel reservations against throwaway capacity ledger rows on the configured database "
+            "(SQLite or Postgres); fails if anything was oversold")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=20, help="Reservations per worker")
+        parser.add_argument("--capacity", type=int, default=100, help="Units per ledger row")
+        parser.add_argument("--rows", type=int, default=2, help="Ledger rows each reservation draws from")
+        parser.add_argument("--output", help="Write the JSON result to this file")
+
+    def handle(self, *args, **options):
+        product = models.Product.objects.order_by("id").first()
+        if product is None:
+            raise CommandError("No products; run seed_demo first")
+        # far-future dates so real reservations are never touched
+        keys = [(product.id, date.today() + timedelta(days=3650 + i)) for i in range(options["rows"])]
+        for product_id, day in keys:
+            models.ProductCapacity.objects.filter(product_id=product_id, delivery_date=day).delete()
+            capacity.set_capacity(product_id, day, options["capacity"])
+        try:
+            result = capacity.stress(keys, workers=options["workers"], attempts=options["attempts"])
+        finally:
+            models.ProductCapacity.objects.filter(product_id=product.id, delivery_date__in=[d for _, d in keys]).delete()
+        self.stdout.write(f"{connection.vendor}: {options['workers']} workers x {options['attempts']} attempts on "
+                          f"{options['rows']} rows of {options['capacity']}: {result['accepted']} accepted, "
+                          f"{result['rejected']} rejected, {result['retries']} lock retries, {result['failed']} failed "
+                          f"in {result['seconds']}s")
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as out:
+                json.dump(result, out, default=str, indent=2)
+        if result["oversold"]:
+            raise CommandError(f"Oversold: {result['rows']}")
+        self.stdout.write(self.style.SUCCESS("No oversell"))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core import routing
+
+class Command(BaseCommand):
+    help = "Copy the SQLite primary into the SQLite replica files (local stand-in for replication)"
+
+    def handle(self, *args, **options):
+        aliases = [alias for alias in settings.DATABASE_REPLICAS if connections[alias].vendor == "sqlite"]
+        if connections["default"].vendor != "sqlite" or not aliases:
+            raise CommandError("Needs DB_BACKEND=sqlite and SQLITE_REPLICA_PATH")
+        for alias in aliases:
+            routing.copy_sqlite("default", alias)
+            self.stdout.write(self.style.SUCCESS(f"{alias}: {connections.settings[alias]['NAME']}"))
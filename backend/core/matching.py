@@ -0,0 +1,62 @@
+import re
+from django.db.models import Case, Count, Exists, IntegerField, OuterRef, Subquery, Value, When
+from . import models, search
+
+# SupplierProfile.categories is free text: "рыба, морепродукты" / "Fish; Seafood"
+SEPARATOR_RE = re.compile(r"[,;\n]+")
+CANDIDATES = 20
+BATCH_SIZE = 1000
+
+def category_key(text):
+    """Case-, whitespace- and ё-insensitive form shared by supplier categories and Product.category_key."""
+    return " ".join(search.normalize(text or "").casefold().split())[:100]
+
+def parse(text):
+    return sorted({key for key in map(category_key, SEPARATOR_RE.split(text or "")) if key})
+
+# ---------- keeping the relation current ----------
+def set_category_key(product):
+    product.category_key = category_key(product.category)
+
+def sync_supplier(supplier):
+    """Bring the supplier's SupplierCategory rows in line with its categories text."""
+    wanted = set(parse(supplier.categories))
+    have = set(models.SupplierCategory.objects.filter(supplier=supplier).values_list("name", flat=True))
+    if have - wanted:
+        models.SupplierCategory.objects.filter(supplier=supplier, name__in=have - wanted).delete()
+    models.SupplierCategory.objects.bulk_create(
+        [models.SupplierCategory(supplier=supplier, name=name) for name in sorted(wanted - have)])
+
+def rebuild():
+    """Recompute every Product.category_key and SupplierCategory row, e.g. after bulk writes that skip signals."""
+    for category in models.Product.objects.values_list("category", flat=True).distinct():
+        models.Product.objects.filter(category=category).update(category_key=category_key(category))
+    models.SupplierCategory.objects.all().delete()
+    rows = (models.SupplierCategory(supplier_id=pk, name=name)
+            for pk, text in models.SupplierProfile.objects.values_list("id", "categories").iterator()
+            for name in parse(text))
+    models.SupplierCategory.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+# ---------- matching ----------
+def candidates(order, country=None, limit=CANDIDATES):
+    """
+    Suppliers carrying at least one of the order's product categories, best first, in one query:
+    most categories covered, then verified, then in `country`, then by stored rating.
+    Suppliers that already made an offer on the order are left out. Each supplier has
+    `matched` and `needed` (category counts) and `rank` set.
+    """
+    order_id = getattr(order, "pk", order)
+    wanted = models.OrderItem.objects.filter(order_id=order_id).values("product__category_key")
+    needed = models.OrderItem.objects.filter(order_id=order_id).values("order_id") \
+        .annotate(n=Count("product__category_key", distinct=True)).values("n")
+    offered = models.Offer.objects.filter(order_id=order_id, supplier=OuterRef("pk"))
+    local = Case(When(country=country, then=Value(1)), default=Value(0), output_field=IntegerField()) \
+        if country else Value(0, output_field=IntegerField())
+    queryset = models.SupplierProfile.objects.filter(category_links__name__in=wanted) \
+        .annotate(matched=Count("category_links"), needed=Subquery(needed), local=local) \
+        .exclude(Exists(offered)).select_related("user") \
+        .order_by("-matched", "-verified", "-local", "-user__rating_avg", "-user__rating_count", "id")[:limit]
+    suppliers = list(queryset)
+    for rank, supplier in enumerate(suppliers, 1):
+        supplier.rank = rank
+    return suppliers
@@ -0,0 +1,161 @@
+import logging
+import mimetypes
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from . import caching, models
+
+logger = logging.getLogger("core.media")
+
+# longest side in pixels; originals smaller than a size are not upscaled
+SIZES = {"thumb": 160, "small": 480, "large": 1280}
+FORMATS = {"webp": ("WEBP", {"quality": 80, "method": 4}), "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True})}
+RANGE_CHUNK = 64 * 1024
+# only catalog media is public; certificates/ and reviews/ uploads are never served from /media/
+PUBLIC_PREFIXES = ("products/",)
+
+# ---------- derivatives ----------
+def derivative_path(media, size, ext):
+    return f"products/derived/{media.pk}/{size}.{ext}"
+
+def render(image, size, fmt):
+    from PIL import Image
+    copy = image.copy()
+    copy.thumbnail((SIZES[size], SIZES[size]), Image.LANCZOS)
+    name, options = FORMATS[fmt]
+    out = BytesIO()
+    copy.save(out, name, **options)
+    return copy.width, copy.height, out.getvalue()
+
+def process(media_id):
+    """Write every size x format derivative of one ProductMedia image and record them in `variants`."""
+    from PIL import Image, ImageOps
+    media = models.ProductMedia.objects.filter(pk=media_id).first()
+    if media is None:
+        return None
+    variants = {}
+    try:
+        if media.image:
+            with media.image.open("rb") as f, Image.open(f) as original:
+                image = ImageOps.exif_transpose(original).convert("RGB")  # phone photos carry EXIF rotation
+            for size in SIZES:
+                for fmt in FORMATS:
+                    width, height, data = render(image, size, fmt)
+                    path = derivative_path(media, size, fmt)
+                    default_storage.delete(path)
+                    variants.setdefault(size, {"width": width, "height": height})[fmt] = default_storage.save(path, ContentFile(data))
+        status = "ready"
+    except Exception:
+        logger.exception("media %s: derivative generation failed", media_id)
+        status = "failed"
+    # update(): no post_save, so this does not schedule itself again
+    models.ProductMedia.objects.filter(pk=media_id).update(variants=variants, processing_status=status)
+    caching.bump_catalog_version()
+    return status
+
+# ---------- off the request path ----------
+_executor = None
+_executor_lock = threading.Lock()
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, "MEDIA_WORKERS", 2), thread_name_prefix="media")
+        return _executor
+
+def _process_in_worker(media_id):
+    close_old_connections()
+    try:
+        return process(media_id)
+    finally:
+        close_old_connections()
+
+def schedule(media_id):
+    """Process after the upload commits: in the thread pool, or inline with MEDIA_PROCESSING = "inline"."""
+    if getattr(settings, "MEDIA_PROCESSING", "thread") == "inline":
+        transaction.on_commit(lambda: process(media_id))
+    else:
+        transaction.on_commit(lambda: executor().submit(_process_in_worker, media_id))
+
+def url_set(media, build_url=None):
+    """{"original": url, "thumb": {"width", "height", "webp", "jpeg"}, ...} from the stored paths, no file access."""
+    build_url = build_url or (lambda url: url)
+    urls = {"original": build_url(media.image.url) if media.image else None}
+    for size, variant in (media.variants or {}).items():
+        urls[size] = {k: build_url(default_storage.url(v)) if k in FORMATS else v for k, v in variant.items()}
+    return urls
+
+# ---------- serving with HTTP Range ----------
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None for no/unsupported range, ValueError if unsatisfiable."""
+    match = RANGE_RE.match(header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":  # suffix: the last N bytes
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(RANGE_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def _inline(content_type):
+    # raster images and video render in place; anything else (HTML, SVG, PDF...) is downloaded,
+    # so an uploaded file can never run as a page on the API origin
+    return content_type.startswith(("image/", "video/")) and content_type != "image/svg+xml"
+
+def serve(request, path):
+    """Public catalog media (PUBLIC_PREFIXES) with Accept-Ranges / 206 Partial Content, so video players can seek."""
+    if not settings.MEDIA_SERVE:
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except ValueError:
+        raise Http404
+    relative = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    if not relative.startswith(PUBLIC_PREFIXES) or not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    try:
+        byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(full_path, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    response["Accept-Ranges"] = "bytes"
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["X-Content-Type-Options"] = "nosniff"
+    if not _inline(content_type):
+        response["Content-Disposition"] = f'attachment; filename="{os.path.basename(full_path)}"'
+    return response
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_product_fts USING fts5("
+    "name, category, supplier_name, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO core_product_fts(rowid, name, category, supplier_name) "
+    "SELECT p.id, replace(replace(p.name,'ё','е'),'Ё','Е'), replace(replace(p.category,'ё','е'),'Ё','Е'), "
+    "replace(replace(s.company_name,'ё','е'),'Ё','Е') "
+    "FROM core_product p JOIN core_supplierprofile s ON s.id = p.supplier_id",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS core_product_fts"]
+
+POSTGRES_FORWARD = [
+    "CREATE TABLE core_product_search ("
+    "product_id bigint PRIMARY KEY REFERENCES core_product(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX core_product_search_gin ON core_product_search USING gin(document)",
+    "INSERT INTO core_product_search(product_id, document) "
+    "SELECT p.id, setweight(to_tsvector('russian', translate(p.name, 'Ёё', 'Ее')), 'A') || "
+    "setweight(to_tsvector('russian', translate(p.category, 'Ёё', 'Ее')), 'B') || "
+    "setweight(to_tsvector('russian', translate(s.company_name, 'Ёё', 'Ее')), 'C') "
+    "FROM core_product p JOIN core_supplierprofile s ON s.id = p.supplier_id",
+]
+POSTGRES_BACKWARD = ["DROP TABLE IF EXISTS core_product_search"]
+
+def run(statements):
+    def apply(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return apply
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
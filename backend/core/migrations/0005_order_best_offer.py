@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_best_offer(apps, schema_editor):
+    Order = apps.get_model("core", "Order")
+    Offer = apps.get_model("core", "Offer")
+    best = Offer.objects.filter(order=OuterRef("pk")).order_by("price", "delivery_eta", "id").values("id")[:1]
+    Order.objects.update(best_offer=Subquery(best))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_product_availability_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='best_offer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.offer'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['order', 'price', 'delivery_eta', 'id'], name='offer_order_rank_idx'),
+        ),
+        migrations.RunPython(backfill_best_offer, migrations.RunPython.noop),
+    ]
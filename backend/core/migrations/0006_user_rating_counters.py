@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_ratings(apps, schema_editor):
+    CustomUser = apps.get_model("core", "CustomUser")
+    Review = apps.get_model("core", "Review")
+    reviews = Review.objects.filter(target=OuterRef("pk")).order_by().values("target")
+    CustomUser.objects.update(
+        rating_count=Coalesce(Subquery(reviews.annotate(c=Count("id")).values("c")), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(s=Sum("rating")).values("s")), 0),
+    )
+    CustomUser.objects.update(rating_avg=Case(
+        When(rating_count=0, then=Value(0.0)),
+        default=Cast(F("rating_sum"), FloatField()) / Cast(F("rating_count"), FloatField()),
+        output_field=FloatField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0005_order_best_offer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['rating_avg', 'id'], name='user_rating_id_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
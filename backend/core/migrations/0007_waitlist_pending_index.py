@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_user_rating_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productwaitlist',
+            index=models.Index(fields=['product', 'notified'], name='waitlist_product_pending_idx'),
+        ),
+    ]
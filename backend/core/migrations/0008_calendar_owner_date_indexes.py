@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_waitlist_pending_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['restaurant', 'date', 'id'], name='calendar_restaurant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['supplier', 'date', 'id'], name='calendar_supplier_date_idx'),
+        ),
+    ]
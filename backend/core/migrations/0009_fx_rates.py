@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Round
+
+# starting rates so cross-currency sorting works out of the box; update them with `manage.py set_fx_rate`
+INITIAL_RATES = {"USD": Decimal("0.92"), "RUB": Decimal("0.0105")}
+
+
+def seed_rates(apps, schema_editor):
+    FxRate = apps.get_model("core", "FxRate")
+    Product = apps.get_model("core", "Product")
+    for currency, rate in INITIAL_RATES.items():
+        FxRate.objects.get_or_create(currency=currency, defaults={"rate_to_eur": rate})
+    output = DecimalField(max_digits=16, decimal_places=4)
+    Product.objects.update(price_eur=Round(Case(
+        *[When(currency=c, then=F("price_per_unit") * Value(r)) for c, r in INITIAL_RATES.items()],
+        default=F("price_per_unit"), output_field=output), 4, output_field=output))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_calendar_owner_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('EUR', 'EUR'), ('USD', 'USD'), ('RUB', 'RUB')], max_length=3, unique=True)),
+                ('rate_to_eur', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_eur',
+            field=models.DecimalField(decimal_places=4, default=0, editable=False, max_digits=16),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price_eur', 'id'], name='product_price_eur_id_idx'),
+        ),
+        migrations.RunPython(seed_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_fx_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productmedia',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'pending'), ('ready', 'ready'), ('failed', 'failed')], default='pending', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='productmedia',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:04
+
+import re
+import django.db.models.deletion
+from django.db import migrations, models
+
+# same normalization as core.matching.category_key at the time of writing
+def category_key(text):
+    return " ".join((text or "").replace("ё", "е").replace("Ё", "Е").casefold().split())[:100]
+
+def populate(apps, schema_editor):
+    Product = apps.get_model("core", "Product")
+    SupplierProfile = apps.get_model("core", "SupplierProfile")
+    SupplierCategory = apps.get_model("core", "SupplierCategory")
+    for category in Product.objects.values_list("category", flat=True).distinct():
+        Product.objects.filter(category=category).update(category_key=category_key(category))
+    rows = []
+    for pk, text in SupplierProfile.objects.values_list("id", "categories").iterator():
+        names = {category_key(part) for part in re.split(r"[,;\n]+", text or "")} - {""}
+        rows += [SupplierCategory(supplier_id=pk, name=name) for name in sorted(names)]
+    SupplierCategory.objects.bulk_create(rows, batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_media_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='category_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='SupplierCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_links', to='core.supplierprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('name', 'supplier'), name='supplier_category_name_uniq')],
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
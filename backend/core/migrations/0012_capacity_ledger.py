@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_supplier_categories'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_date', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('remaining', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capacity', to='core.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'delivery_date'), name='capacity_product_date_uniq'), models.CheckConstraint(condition=models.Q(('remaining__gte', 0)), name='capacity_remaining_gte_0')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_capacity_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoritepartner',
+            index=models.Index(fields=['restaurant', 'created_at', 'id'], name='favorite_resto_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['supplier', 'created_at', 'id'], name='offer_supplier_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'created_at', 'id'], name='order_resto_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['restaurant', 'created_at', 'id'], name='preorder_resto_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['supplier', 'created_at', 'id'], name='preorder_supplier_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productwaitlist',
+            index=models.Index(fields=['restaurant', 'created_at', 'id'], name='waitlist_resto_created_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncWeek
+
+
+def backfill_rollups(apps, schema_editor):
+    # the tables start from the orders already placed; cancelling or deleting one of those
+    # later subtracts from these cells (same aggregation as core.rollups.rebuild)
+    OrderItem = apps.get_model("core", "OrderItem")
+    money = DecimalField(max_digits=20, decimal_places=4)
+    amount = ExpressionWrapper(F("quantity") * F("unit_price_snapshot"), output_field=money)
+    # in this order: the amount expressions read the item's quantity, not the quantity aggregate
+    measures = {"amount": Sum(amount),
+                "delivered_amount": Sum(Case(When(order__status="delivered", then=amount), default=Value(0), output_field=money)),
+                "quantity": Sum("quantity"), "lines": Count("id")}
+    for name, keys in (("RestaurantSpend", {"restaurant_id": F("order__restaurant_id"), "month": TruncMonth("order__delivery_date"),
+                                            "category": F("product__category_key")}),
+                       ("SupplierSales", {"supplier_id": F("product__supplier_id"), "week": TruncWeek("order__delivery_date"),
+                                          "product_id": F("product_id")})):
+        model = apps.get_model("core", name)
+        aliases = {f"key_{i}": expr for i, expr in enumerate(keys.values())}  # product_id is also an OrderItem field
+        rows = OrderItem.objects.exclude(order__status="cancelled").values(**aliases).order_by().annotate(**measures)
+        model.objects.bulk_create((model(**dict(zip(keys, (row[a] for a in aliases))), **{m: row[m] for m in measures})
+                                   for row in rows.iterator(chunk_size=2000)), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_tenant_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantSpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('delivered_amount', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('lines', models.IntegerField(default=0)),
+                ('month', models.DateField()),
+                ('category', models.CharField(max_length=100)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spend', to='core.restaurantprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'month', 'category'), name='spend_resto_month_category_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('delivered_amount', models.DecimalField(decimal_places=4, default=0, max_digits=18)),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('lines', models.IntegerField(default=0)),
+                ('week', models.DateField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.product')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales', to='core.supplierprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('supplier', 'week', 'product'), name='sales_supplier_week_product_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
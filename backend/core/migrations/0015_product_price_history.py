@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def seed_history(apps, schema_editor):
+    # every existing product starts its history at its current price, from when it was created
+    Product = apps.get_model("core", "Product")
+    ProductPrice = apps.get_model("core", "ProductPrice")
+    rows = Product.objects.values_list("id", "price_per_unit", "currency", "created_at").order_by("id").iterator(chunk_size=2000)
+    ProductPrice.objects.bulk_create((ProductPrice(product_id=pk, price_per_unit=price, currency=currency, effective_from=created)
+                                      for pk, price, currency, created in rows), batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price_per_unit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(choices=[('EUR', 'EUR'), ('USD', 'USD'), ('RUB', 'RUB')], default='EUR', max_length=3)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='core.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'effective_from'], name='price_product_effective_idx')],
+            },
+        ),
+        migrations.RunPython(seed_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_calendar_feed_token'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='productcapacity',
+            constraint=models.CheckConstraint(condition=models.Q(('remaining__lte', models.F('total'))), name='capacity_remaining_lte_total'),
+        ),
+    ]
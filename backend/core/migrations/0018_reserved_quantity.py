@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+def backfill_reserved(apps, schema_editor):
+    # the ledger only knows how much of each row is reserved (total - remaining), not by whom:
+    # attribute it to the row's live lines newest first (a line older than its row took nothing),
+    # never more than that, so releasing a line can never push remaining above total
+    ProductCapacity = apps.get_model("core", "ProductCapacity")
+    OrderItem = apps.get_model("core", "OrderItem")
+    PreOrder = apps.get_model("core", "PreOrder")
+    items, preorders = [], []
+    for row in ProductCapacity.objects.exclude(remaining=models.F("total")).iterator(chunk_size=2000):
+        left = row.total - row.remaining
+        lines = [(item.order.created_at, item) for item in OrderItem.objects.select_related("order").filter(
+            product_id=row.product_id, order__delivery_date=row.delivery_date).exclude(order__status="cancelled")]
+        lines += [(p.created_at, p) for p in PreOrder.objects.filter(
+            product_id=row.product_id, delivery_date=row.delivery_date).exclude(status="cancelled")]
+        for _, line in sorted(lines, key=lambda entry: entry[0], reverse=True):
+            if line.quantity <= left:
+                line.reserved_quantity, left = line.quantity, left - line.quantity
+                (items if isinstance(line, OrderItem) else preorders).append(line)
+    OrderItem.objects.bulk_update(items, ["reserved_quantity"], batch_size=1000)
+    PreOrder.objects.bulk_update(preorders, ["reserved_quantity"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_capacity_remaining_lte_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='reserved_quantity',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='preorder',
+            name='reserved_quantity',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_reserved, migrations.RunPython.noop),
+    ]
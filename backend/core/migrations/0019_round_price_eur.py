@@ -0,0 +1,19 @@
+from django.db import migrations
+from django.db.models import DecimalField, F
+from django.db.models.functions import Round
+
+
+def round_price_eur(apps, schema_editor):
+    # rows converted before price_eur was rounded can hold more decimals than the column declares
+    Product = apps.get_model("core", "Product")
+    Product.objects.update(price_eur=Round(F("price_eur"), 4, output_field=DecimalField(max_digits=16, decimal_places=4)))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_reserved_quantity'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_price_eur, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from decimal import Decimal
+from django.db import connection, models
+from django.db.models import (BooleanField, Case, Count, DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery,
+                              Sum, Value, When, Window)
+from django.db.models.functions import Cast, Coalesce, RowNumber
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -9,6 +13,14 @@ class CustomUser(AbstractUser):
     is_admin = models.BooleanField(default=False)
     kyc = models.BooleanField(default=False)
     attestation = models.BooleanField(default=False)
+    # review aggregates, maintained incrementally by core.ratings
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    # secret part of the user's iCalendar feed URL (calendar apps cannot log in); rotated by POST /api/calendar/feed-token/
+    calendar_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["rating_avg","id"], name="user_rating_id_idx")]
     def __str__(self): return self.username
 
 class RestaurantProfile(models.Model):
@@ -28,16 +40,49 @@ class SupplierProfile(models.Model):
     country = models.CharField(max_length=64, blank=True, default="")
     def __str__(self): return self.company_name
 
+class SupplierCategory(models.Model):
+    """SupplierProfile.categories split and normalized (core.matching.category_key), one row per category."""
+    supplier = models.ForeignKey(SupplierProfile, on_delete=models.CASCADE, related_name="category_links")
+    name = models.CharField(max_length=100)
+    class Meta:
+        # leads with name: "which suppliers carry these categories" is an index range scan
+        constraints = [models.UniqueConstraint(fields=["name","supplier"], name="supplier_category_name_uniq")]
+    def __str__(self): return self.name
+
 class FarmerProfile(SupplierProfile):
     farm_name = models.CharField(max_length=255, blank=True, default="")
     organic_certified = models.BooleanField(default=False)
     certificate_file = models.FileField(upload_to='certificates/', blank=True, null=True)
 
 # ---------- Products & Media ----------
+def available_q(start, end=None, prefix=""):
+    """Products available on `start`, or at any point in [start, end] when `end` is given.
+    `prefix` targets a related product, e.g. "product__"."""
+    end = end or start
+    return (Q(**{f"{prefix}available_from__lte": end}) &
+            (Q(**{f"{prefix}available_to__isnull": True}) | Q(**{f"{prefix}available_to__gte": start})))
+
+class ProductQuerySet(models.QuerySet):
+    def available_on(self, day):
+        return self.filter(available_q(day))
+    def available_between(self, start, end):
+        return self.filter(available_q(start, end))
+    def with_availability(self, day=None):
+        # SQL counterpart of Product.is_available, read by ProductSerializer
+        day = day or timezone.now().date()
+        return self.annotate(available_now=Case(When(available_q(day), then=Value(True)),
+                                                default=Value(False), output_field=BooleanField()))
+    def with_price_in(self, currency, rate_to_eur=1):
+        # `price`: price_eur expressed in `currency` (rate_to_eur from core.fx), rounded in SQL
+        price = F("price_eur") if currency == "EUR" else F("price_eur") / Value(Decimal(rate_to_eur))
+        return self.annotate(price=Cast(price, DecimalField(max_digits=14, decimal_places=2)))
+
 class Product(models.Model):
     CURRENCY_CHOICES = [("EUR","EUR"),("USD","USD"),("RUB","RUB")]
     name = models.CharField(max_length=255)
     category = models.CharField(max_length=100)
+    # normalized category, matched against SupplierCategory.name (core.matching)
+    category_key = models.CharField(max_length=100, blank=True, default="", editable=False)
     unit = models.CharField(max_length=50, default="kg")
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES, default="EUR")
@@ -46,6 +91,18 @@ class Product(models.Model):
     supplier = models.ForeignKey(SupplierProfile, on_delete=models.CASCADE, related_name="products")
     verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # price_per_unit converted at the current FxRate; kept by core.fx, used to sort across currencies
+    price_eur = models.DecimalField(max_digits=16, decimal_places=4, default=0, editable=False)
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at","id"], name="product_created_id_idx"),
+            models.Index(fields=["price_per_unit","id"], name="product_price_id_idx"),
+            models.Index(fields=["available_from","id"], name="product_avail_from_id_idx"),
+            models.Index(fields=["available_from","available_to"], name="product_avail_window_idx"),
+            models.Index(fields=["price_eur","id"], name="product_price_eur_id_idx"),
+        ]
 
     @property
     def is_available(self):
@@ -61,11 +118,45 @@ class Product(models.Model):
     def __str__(self): return f"{self.name} ({self.category})"
 
 class ProductMedia(models.Model):
+    STATUS_CHOICES = [("pending","pending"),("ready","ready"),("failed","failed")]
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="media")
     image = models.ImageField(upload_to='products/images/', null=True, blank=True)
     video = models.FileField(upload_to='products/videos/', null=True, blank=True)
+    # resized / WebP derivatives of `image`, written by core.media: {"thumb": {"width": 160, "webp": path, "jpeg": path}, ...}
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    processing_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending", editable=False)
+
+# ---------- Price history (core.prices) ----------
+class ProductPrice(models.Model):
+    # append-only: one row per real change of price_per_unit / currency, in effect until the next row
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="price_history")
+    price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, choices=Product.CURRENCY_CHOICES, default="EUR")
+    effective_from = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["product","effective_from"], name="price_product_effective_idx")]
+
+# ---------- FX ----------
+class FxRate(models.Model):
+    # value of one unit of `currency` in EUR (EUR itself is always 1); read through core.fx.rates()
+    currency = models.CharField(max_length=3, choices=Product.CURRENCY_CHOICES, unique=True)
+    rate_to_eur = models.DecimalField(max_digits=18, decimal_places=8)
+    updated_at = models.DateTimeField(auto_now=True)
+    def __str__(self): return f"{self.currency} = {self.rate_to_eur} EUR"
 
 # ---------- Orders & Offers ----------
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        # totals are aggregated in SQL over the items join, not summed in Python
+        money = DecimalField(max_digits=20, decimal_places=4)
+        line_total = ExpressionWrapper(F("items__quantity") * F("items__unit_price_snapshot"), output_field=money)
+        return self.annotate(
+            total=Coalesce(Sum(line_total), Value(0), output_field=money),
+            line_count=Count("items"),
+            total_quantity=Coalesce(Sum("items__quantity"), Value(0), output_field=money),
+        )
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ("pending","Pending"),("accepted","Accepted"),
@@ -76,12 +167,36 @@ class Order(models.Model):
     delivery_date = models.DateField()
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
+    # denormalized winner, kept current by core.offers.refresh_best_offers
+    best_offer = models.ForeignKey("Offer", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    objects = OrderQuerySet.as_manager()
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at","id"], name="order_created_id_idx"),
+            # a tenant's newest-first page (core.tenancy), straight from the index
+            models.Index(fields=["restaurant","created_at","id"], name="order_resto_created_idx"),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     unit_price_snapshot = models.DecimalField(max_digits=10, decimal_places=2)
+    # what this line took from the capacity ledger (core.capacity); 0 when its key had no ledger row
+    reserved_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+
+OFFER_RANKING = ("price", "delivery_eta", "id")
+
+class OfferQuerySet(models.QuerySet):
+    def best_per_order(self, n=1):
+        """Top `n` offers of every order in the queryset, annotated with `rank` (1 = best)."""
+        if connection.features.supports_over_clause:
+            ranked = self.annotate(rank=Window(RowNumber(), partition_by=F("order_id"),
+                                               order_by=[F(f).asc() for f in OFFER_RANKING]))
+            return ranked.filter(rank__lte=n).order_by("order_id", "rank")
+        # no window functions: correlated top-n subquery, ranked in Python by the caller's ordering
+        top = Offer.objects.filter(order=OuterRef("order")).order_by(*OFFER_RANKING).values("id")[:n]
+        return self.filter(id__in=Subquery(top)).order_by("order_id", *OFFER_RANKING)
 
 class Offer(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="offers")
@@ -89,7 +204,33 @@ class Offer(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     delivery_eta = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
-    class Meta: ordering = ["price","delivery_eta"]
+    objects = OfferQuerySet.as_manager()
+    class Meta:
+        ordering = ["price","delivery_eta"]
+        indexes = [
+            models.Index(fields=["order","price","delivery_eta","id"], name="offer_order_rank_idx"),
+            models.Index(fields=["created_at","id"], name="offer_created_id_idx"),
+            models.Index(fields=["supplier","created_at","id"], name="offer_supplier_created_idx"),
+            models.Index(fields=["price","id"], name="offer_price_id_idx"),
+            models.Index(fields=["delivery_eta","id"], name="offer_eta_id_idx"),
+        ]
+
+# ---------- Capacity ledger (core.capacity) ----------
+class ProductCapacity(models.Model):
+    """What a supplier can deliver of a product on one date; products without a row are not limited."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="capacity")
+    delivery_date = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    # decremented by conditional UPDATEs only, never read-modify-write
+    remaining = models.DecimalField(max_digits=12, decimal_places=2)
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product","delivery_date"], name="capacity_product_date_uniq"),
+            # last line of defence against oversell: the database rejects a negative balance
+            models.CheckConstraint(condition=Q(remaining__gte=0), name="capacity_remaining_gte_0"),
+            # ...and releasing more than was reserved
+            models.CheckConstraint(condition=Q(remaining__lte=F("total")), name="capacity_remaining_lte_total"),
+        ]
 
 # ---------- PreOrders (reserved-only in MVP) ----------
 class PreOrder(models.Model):
@@ -99,7 +240,14 @@ class PreOrder(models.Model):
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     delivery_date = models.DateField()
     status = models.CharField(max_length=50, default="reserved")
+    reserved_quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)  # see OrderItem
     created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at","id"], name="preorder_created_id_idx"),
+            models.Index(fields=["restaurant","created_at","id"], name="preorder_resto_created_idx"),
+            models.Index(fields=["supplier","created_at","id"], name="preorder_supplier_created_idx"),
+        ]
 
 # ---------- Calendar (both sides) ----------
 class CalendarEvent(models.Model):
@@ -111,6 +259,12 @@ class CalendarEvent(models.Model):
     preorder = models.ForeignKey(PreOrder, on_delete=models.CASCADE, null=True, blank=True)
     event_type = models.CharField(max_length=50, choices=EVENT_CHOICES)
     status = models.CharField(max_length=50, default="scheduled")
+    class Meta:
+        indexes = [
+            models.Index(fields=["date","id"], name="calendar_date_id_idx"),
+            models.Index(fields=["restaurant","date","id"], name="calendar_restaurant_date_idx"),
+            models.Index(fields=["supplier","date","id"], name="calendar_supplier_date_idx"),
+        ]
 
 # ---------- Reviews (both sides) ----------
 class Review(models.Model):
@@ -120,12 +274,19 @@ class Review(models.Model):
     comment = models.TextField(blank=True, default="")
     image = models.ImageField(upload_to="reviews/", null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [models.Index(fields=["created_at","id"], name="review_created_id_idx")]
 
 # ---------- Favorites (partners) ----------
 class FavoritePartner(models.Model):
     restaurant = models.ForeignKey(RestaurantProfile, on_delete=models.CASCADE, related_name="favorites")
     partner_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="favored_by")
     created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at","id"], name="favorite_created_id_idx"),
+            models.Index(fields=["restaurant","created_at","id"], name="favorite_resto_created_idx"),
+        ]
 
 # ---------- Waitlist ----------
 class ProductWaitlist(models.Model):
@@ -134,6 +295,38 @@ class ProductWaitlist(models.Model):
     desired_quantity = models.DecimalField(max_digits=10, decimal_places=2)
     notified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at","id"], name="waitlist_created_id_idx"),
+            models.Index(fields=["restaurant","created_at","id"], name="waitlist_resto_created_idx"),
+            models.Index(fields=["product","notified"], name="waitlist_product_pending_idx"),
+        ]
+
+# ---------- Analytics rollups (core.rollups) ----------
+class RollupMeasures(models.Model):
+    # sums over the order lines of non-cancelled orders; delivered_amount only counts delivered orders
+    amount = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    delivered_amount = models.DecimalField(max_digits=18, decimal_places=4, default=0)
+    quantity = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    lines = models.IntegerField(default=0)
+    class Meta:
+        abstract = True
+
+class RestaurantSpend(RollupMeasures):
+    """Spend per restaurant, product category (Product.category_key) and delivery month."""
+    restaurant = models.ForeignKey(RestaurantProfile, on_delete=models.CASCADE, related_name="spend")
+    month = models.DateField()  # first day of the month
+    category = models.CharField(max_length=100)
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["restaurant","month","category"], name="spend_resto_month_category_uniq")]
+
+class SupplierSales(RollupMeasures):
+    """Revenue per supplier, product and delivery week."""
+    supplier = models.ForeignKey(SupplierProfile, on_delete=models.CASCADE, related_name="sales")
+    week = models.DateField()  # the Monday
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["supplier","week","product"], name="sales_supplier_week_product_uniq")]
 
 # ---------- Subscriptions (Phase 2 ready) ----------
 class SubscriptionPlan(models.Model):
@@ -0,0 +1,25 @@
+from django.db.models import OuterRef, Subquery
+from . import models
+
+def refresh_best_offers(order_ids=None):
+    """Recompute Order.best_offer for the given orders (all when None) in one UPDATE."""
+    best = models.Offer.objects.filter(order=OuterRef("pk")).order_by(*models.OFFER_RANKING).values("id")[:1]
+    orders = models.Order.objects.all()
+    if order_ids is not None:
+        orders = orders.filter(pk__in=list(order_ids))
+    return orders.update(best_offer=Subquery(best))
+
+def best_offers(order_ids, n=1, restaurant_id=None):
+    """
+    {order_id: [offer, ...]} with the best `n` offers per order, fetched in one query; with
+    `restaurant_id` only that restaurant's orders get offers, the others stay empty.
+    """
+    grouped = {order_id: [] for order_id in order_ids}
+    queryset = models.Offer.objects.filter(order_id__in=order_ids)
+    if restaurant_id is not None:
+        queryset = queryset.filter(order__restaurant_id=restaurant_id)
+    for offer in queryset.best_per_order(n):
+        rows = grouped[offer.order_id]
+        if not hasattr(offer, "rank"): offer.rank = len(rows) + 1
+        rows.append(offer)
+    return grouped
@@ -0,0 +1,82 @@
+from django.db import transaction
+from . import capacity, models, rollups, serializers
+
+BULK_BATCH_SIZE = 500
+
+def create_orders_in_bulk(payloads, restaurant_id=None):
+    """
+    Validate and create many orders at once; returns one result dict per payload. With
+    `restaurant_id` (the caller's profile) orders for any other restaurant are rejected.
+    """
+    results, valid = [], []
+    for index, payload in enumerate(payloads):
+        s = serializers.BulkOrderSerializer(data=payload)
+        if s.is_valid():
+            valid.append((index, s.validated_data))
+            results.append(None)
+        else:
+            results.append({"index": index, "status": "error", "errors": s.errors})
+
+    # every product / restaurant reference is resolved in a single query each
+    product_ids = {item["product"] for _, data in valid for item in data["items"]}
+    restaurant_ids = {data["restaurant"] for _, data in valid}
+    products = models.Product.objects.only("id", "supplier_id", "price_per_unit", "category_key").in_bulk(product_ids)
+    if restaurant_id is None:
+        known_restaurants = set(models.RestaurantProfile.objects.filter(id__in=restaurant_ids).values_list("id", flat=True))
+    else:
+        known_restaurants = {restaurant_id}  # the caller's own profile, already read
+
+    accepted = []
+    for index, data in valid:
+        errors = {}
+        if restaurant_id is not None and data["restaurant"] != restaurant_id:
+            errors["restaurant"] = ["You can only order for your own restaurant."]
+        elif data["restaurant"] not in known_restaurants:
+            errors["restaurant"] = [f"Invalid pk \"{data['restaurant']}\" - object does not exist."]
+        missing = sorted({i["product"] for i in data["items"]} - products.keys())
+        if missing:
+            errors["items"] = [f"Invalid product pk(s): {', '.join(map(str, missing))}."]
+        if errors:
+            results[index] = {"index": index, "status": "error", "errors": errors}
+        else:
+            accepted.append((index, data))
+
+    if accepted:
+        with transaction.atomic():
+            # capacity for every order in one ledger read and one UPDATE; a short order fails alone
+            shortages, managed = capacity.reserve_batches([
+                [] if data["status"] == "cancelled" else
+                [(i["product"], data["delivery_date"], i["quantity"]) for i in data["items"]]
+                for _, data in accepted])
+            for (index, _), short in zip(accepted, shortages):
+                if short:
+                    results[index] = {"index": index, "status": "error", "errors": {"items": [
+                        f"Not enough capacity for product {s['product']} on {s['delivery_date']}: "
+                        f"{s['remaining']} left, {s['requested']} requested." for s in short]}}
+            accepted = [entry for entry, short in zip(accepted, shortages) if not short]
+            orders = models.Order.objects.bulk_create([
+                models.Order(restaurant_id=d["restaurant"], delivery_date=d["delivery_date"], status=d["status"])
+                for _, d in accepted
+            ], batch_size=BULK_BATCH_SIZE)
+            items, events, lines = [], [], []
+            for order, (_, data) in zip(orders, accepted):
+                suppliers, order_items = [], []
+                for item in data["items"]:
+                    product = products[item["product"]]
+                    price = item.get("unit_price_snapshot", product.price_per_unit)
+                    taken = order.status != "cancelled" and (product.id, order.delivery_date) in managed
+                    items.append(models.OrderItem(order=order, product_id=product.id, quantity=item["quantity"],
+                                                  reserved_quantity=item["quantity"] if taken else 0, unit_price_snapshot=price))
+                    order_items.append((product.id, product.supplier_id, product.category_key, item["quantity"], price))
+                    if product.supplier_id not in suppliers: suppliers.append(product.supplier_id)
+                lines += rollups.order_lines(order, order_items)
+                # one calendar entry per supplier involved, so both sides see the delivery
+                events += [models.CalendarEvent(date=order.delivery_date, restaurant_id=order.restaurant_id,
+                                                supplier_id=supplier_id, order=order, event_type="order")
+                           for supplier_id in suppliers]
+            models.OrderItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+            models.CalendarEvent.objects.bulk_create(events, batch_size=BULK_BATCH_SIZE)
+            rollups.apply((), lines)  # the analytics rollups of every order in one pass
+        for order, (index, data) in zip(orders, accepted):
+            results[index] = {"index": index, "status": "created", "id": order.id, "line_count": len(data["items"])}
+    return results
@@ -0,0 +1,127 @@
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the full ordering tuple (e.g. created_at, id).
+
+    DRF's CursorPagination only filters on the first ordering field and falls back
+    to an offset for ties; here the cursor carries every ordering value, so each
+    page is a single indexed range query and deep pages cost the same as page one.
+    """
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not any(f.lstrip("-") in ("id", "pk") for f in ordering):
+            # unique tie-breaker, same direction as the leading field
+            ordering += ("-id" if ordering[0].startswith("-") else "id",)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        return None if queryset is None else self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # async ORM counterpart for the ASGI read path (core.async_views)
+        queryset = self._page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([obj async for obj in queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor.reverse)
+        self.position = self.cursor.position if self.cursor else None
+
+        ordering = [self._flip(f) for f in self.ordering] if self.reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self._after(ordering, self._load_position(self.position)))
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        reverse, position = self.reverse, self.position
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            value = instance[field.lstrip("-")] if isinstance(instance, dict) else getattr(instance, field.lstrip("-"))
+            values.append(None if value is None else str(value))
+        return json.dumps(values)
+
+    def _load_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else "-" + field
+
+    @staticmethod
+    def _after(ordering, values):
+        # (f1, f2, ...) > (v1, v2, ...) in the given directions, expanded for the ORM;
+        # the leading bound keeps it a range scan on the (f1, ..., id) index
+        fields = [(f.lstrip("-"), "lt" if f.startswith("-") else "gt") for f in ordering]
+        lead, lead_op = fields[0]
+        condition, equal = Q(), Q()
+        for (name, op), value in zip(fields, values):
+            condition |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+        return Q(**{f"{lead}__{lead_op}e": values[0]}) & condition
+
+class CalendarPagination(KeysetPagination):
+    ordering = ("date", "id")
+
+class CapacityPagination(KeysetPagination):
+    ordering = ("delivery_date", "id")
+
+class SpendPagination(KeysetPagination):
+    ordering = ("-month", "-id")
+
+class SalesPagination(KeysetPagination):
+    ordering = ("-week", "-id")
@@ -0,0 +1,84 @@
+from datetime import datetime, time, timedelta
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from . import models
+
+# ProductPrice is append-only: a row is written only when price_per_unit or currency really changes,
+# so the row in effect at a moment is the product's latest one with effective_from <= that moment.
+BATCH_SIZE = 1000
+LOOKUP_CHUNK = 500  # product ids per lookup query, well under SQLite's parameter limit
+PRICE_FIELDS = ("price_per_unit", "currency")
+
+def _loaded(product):
+    # from __dict__ only: touching a deferred field would cost a query per loaded instance
+    values = product.__dict__
+    return tuple(values[f] for f in PRICE_FIELDS) if all(f in values for f in PRICE_FIELDS) else None
+
+def snapshot(product):
+    product._price_snapshot = _loaded(product) if product.pk else None
+
+# ---------- recording ----------
+def record(products, at=None):
+    """Append one history row per product at its current price; callers pass only products whose price changed."""
+    at = at or timezone.now()
+    return models.ProductPrice.objects.bulk_create(
+        [models.ProductPrice(product_id=p.pk, price_per_unit=p.price_per_unit, currency=p.currency, effective_from=at)
+         for p in products], batch_size=BATCH_SIZE)
+
+def latest(product_id):
+    return models.ProductPrice.objects.filter(product_id=product_id).order_by("-effective_from", "-id") \
+        .values_list(*PRICE_FIELDS).first()
+
+def product_saved(product, created):
+    new = _loaded(product)
+    if new is None:
+        return  # price not loaded, so this save did not write it either
+    old = getattr(product, "_price_snapshot", None)
+    # without a snapshot (instance built by hand) the stored history tells whether it changed
+    if created or new != (old if old is not None else latest(product.pk)):
+        record([product])
+    product._price_snapshot = new
+
+# ---------- point-in-time lookup ----------
+def _until(at):
+    """Filter for rows in effect at `at`: a datetime, or a date meaning the end of that day."""
+    if isinstance(at, datetime):
+        return {"effective_from__lte": at}
+    next_day = timezone.make_aware(datetime.combine(at + timedelta(days=1), time.min))
+    return {"effective_from__lt": next_day}
+
+def prices_at(product_ids, at):
+    """
+    {product_id: ProductPrice in effect at `at`} for many products at once; products without a
+    price by then are left out. Each chunk of ids is one query in which every product is a
+    single backwards seek on the (product, effective_from) index.
+    """
+    in_effect = models.ProductPrice.objects.filter(product_id=OuterRef("pk"), **_until(at)) \
+        .order_by("-effective_from", "-id").values("id")[:1]
+    ids, result = list(dict.fromkeys(product_ids)), {}
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        rows = models.Product.objects.filter(id__in=ids[start:start + LOOKUP_CHUNK]) \
+            .annotate(price_id=Subquery(in_effect)).values("price_id")
+        result.update((row.product_id, row) for row in models.ProductPrice.objects.filter(id__in=rows))
+    return result
+
+# ---------- history / sparkline ----------
+def history(product_id, since, until):
+    """The price in effect at the start of `since` followed by every change up to the end of `until` (dates)."""
+    start = timezone.make_aware(datetime.combine(since, time.min))
+    rows = models.ProductPrice.objects.filter(product_id=product_id).order_by("effective_from", "id")
+    opening = rows.filter(effective_from__lt=start).order_by("-effective_from", "-id")[:1]
+    return list(opening) + list(rows.filter(effective_from__gte=start, **_until(until)))
+
+def sparkline(rows, since, until, points):
+    """`points` evenly spaced samples of the price over [since, until] from history() rows, None before the first."""
+    span = max((until - since).days, 0)
+    days = sorted({since + timedelta(days=round(i * span / max(points - 1, 1))) for i in range(points)})
+    values, i, row = [], 0, None
+    for day in days:
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+        while i < len(rows) and rows[i].effective_from < end:
+            row, i = rows[i], i + 1
+        # decimals as strings, like every other price in the API
+        values.append({"date": day, "price_per_unit": row and str(row.price_per_unit), "currency": row and row.currency})
+    return values
@@ -0,0 +1,44 @@
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from . import models
+
+def apply_delta(user_id, count, total):
+    """Shift a user's review counters by (count, total) in one atomic UPDATE."""
+    if not user_id or not (count or total):
+        return
+    new_count, new_sum = F("rating_count") + count, F("rating_sum") + total
+    models.CustomUser.objects.filter(pk=user_id).update(
+        rating_count=new_count,
+        rating_sum=new_sum,
+        # SET expressions read the pre-update row, so the average is computed from the new totals here
+        rating_avg=Case(When(rating_count=-count, then=Value(0.0)),
+                        default=Cast(new_sum, FloatField()) / Cast(new_count, FloatField()),
+                        output_field=FloatField()),
+    )
+
+def review_saved(review, created):
+    old_target, old_rating = getattr(review, "_rating_snapshot", (None, None))
+    if created or old_target is None:
+        apply_delta(review.target_id, 1, review.rating)
+    elif old_target != review.target_id:
+        apply_delta(old_target, -1, -old_rating)
+        apply_delta(review.target_id, 1, review.rating)
+    else:
+        apply_delta(review.target_id, 0, review.rating - old_rating)
+
+def review_deleted(review):
+    old_target, old_rating = getattr(review, "_rating_snapshot", (None, None))
+    if old_target is None: old_target, old_rating = review.target_id, review.rating
+    apply_delta(old_target, -1, -old_rating)
+
+def rebuild():
+    """Recompute every user's counters from Review with two set-based UPDATEs."""
+    reviews = models.Review.objects.filter(target=OuterRef("pk")).order_by().values("target")
+    count = Coalesce(Subquery(reviews.annotate(c=Count("id")).values("c")), 0)
+    total = Coalesce(Subquery(reviews.annotate(s=Sum("rating")).values("s")), 0)
+    users = models.CustomUser.objects.update(rating_count=count, rating_sum=total)
+    models.CustomUser.objects.update(rating_avg=Case(
+        When(rating_count=0, then=Value(0.0)),
+        default=Cast(F("rating_sum"), FloatField()) / Cast(F("rating_count"), FloatField()),
+        output_field=FloatField()))
+    return users
@@ -0,0 +1,210 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncWeek
+from . import capacity, models
+
+# RestaurantSpend / SupplierSales: one row per (owner, period, category | product), shifted by deltas
+MEASURES = ("amount", "delivered_amount", "quantity", "lines")
+SPEND_KEY = ("restaurant_id", "month", "category")
+SALES_KEY = ("supplier_id", "week", "product_id")
+CHUNK_SIZE = 200  # restaurants / suppliers rebuilt per transaction
+
+def month_of(day):
+    return day.replace(day=1)
+
+def week_of(day):
+    return day - timedelta(days=day.weekday())
+
+# ---------- what an order contributes ----------
+def order_lines(order, items=None):
+    """
+    (spend key, sales key, measures) for each line of `order`, none once cancelled. `items` are
+    (product_id, supplier_id, category_key, quantity, unit_price) tuples; read from the database
+    when not given.
+    """
+    if order.status == "cancelled":
+        return []
+    if items is None:
+        items = models.OrderItem.objects.filter(order_id=order.pk).values_list(
+            "product_id", "product__supplier_id", "product__category_key", "quantity", "unit_price_snapshot")
+    delivered = order.status == "delivered"
+    month, week = month_of(order.delivery_date), week_of(order.delivery_date)
+    lines = []
+    for product_id, supplier_id, category, quantity, price in items:
+        amount = Decimal(quantity) * Decimal(price)
+        lines.append(((order.restaurant_id, month, category), (supplier_id, week, product_id),
+                      (amount, amount if delivered else Decimal(0), Decimal(quantity), 1)))
+    return lines
+
+# ---------- applying deltas ----------
+def _match(key_fields, key):
+    return Q(**dict(zip(key_fields, key)))
+
+def _bump(model, key_fields, deltas):
+    """Add per-key measure deltas: missing rows are inserted as zeros, then one UPDATE shifts every row."""
+    deltas = {key: d for key, d in deltas.items() if any(d)}
+    if not deltas:
+        return
+    model.objects.bulk_create([model(**dict(zip(key_fields, key))) for key in deltas], ignore_conflicts=True)
+    rows = model.objects.filter(reduce(or_, (_match(key_fields, key) for key in deltas)))
+    rows.update(**{name: F(name) + Case(*[When(_match(key_fields, key), then=Value(d[i])) for key, d in deltas.items()],
+                                        default=Value(0), output_field=model._meta.get_field(name))
+                   for i, name in enumerate(MEASURES)})
+    if any(d[3] < 0 for d in deltas.values()):
+        rows.filter(lines__lte=0).delete()  # nothing left in that cell
+
+def apply(before=(), after=()):
+    """Move the rollups from the `before` lines to the `after` lines (see order_lines), atomically."""
+    spend, sales = defaultdict(lambda: [0, 0, 0, 0]), defaultdict(lambda: [0, 0, 0, 0])
+    for sign, lines in ((-1, before), (1, after)):
+        for spend_key, sales_key, measures in lines:
+            for deltas, key in ((spend, spend_key), (sales, sales_key)):
+                for i, value in enumerate(measures):
+                    deltas[key][i] += sign * value
+    if spend or sales:
+        # no savepoint: a failed rollup write has to fail the order write it belongs to
+        with transaction.atomic(savepoint=False):
+            _bump(models.RestaurantSpend, SPEND_KEY, spend)
+            _bump(models.SupplierSales, SALES_KEY, sales)
+
+# ---------- signal handlers ----------
+HEADER_FIELDS = ("restaurant_id", "delivery_date", "status")
+ITEM_FIELDS = ("product_id", "quantity", "unit_price_snapshot")
+
+def _loaded(instance, fields):
+    # from __dict__ only: touching a deferred field would cost a query per loaded instance
+    values = instance.__dict__
+    return tuple(values[f] for f in fields) if instance.pk and all(f in values for f in fields) else None
+
+def snapshot_order(order):
+    order._rollup_header = _loaded(order, HEADER_FIELDS)
+
+def snapshot_item(item):
+    item._rollup_snapshot = _loaded(item, ITEM_FIELDS)
+
+def header(order):
+    return tuple(getattr(order, f) for f in HEADER_FIELDS)
+
+def order_saving(order):
+    """
+    Take the header the rollups were built from out of the stored row, re-read under its lock
+    (capacity.locked), not from the instance's load-time snapshot: two concurrent transitions of
+    the same order would otherwise both move its lines away from the state neither of them saw.
+    """
+    if not order._state.adding and order.pk:
+        current = capacity.locked(models.Order, order.pk)
+        order._rollup_header = header(current) if current is not None else None
+
+def order_saved(order, created):
+    """Re-attribute the order's lines when its restaurant, delivery date or status changed."""
+    old = getattr(order, "_rollup_header", None)
+    if created or old is None or old == header(order):
+        return
+    items = list(models.OrderItem.objects.filter(order_id=order.pk).values_list(
+        "product_id", "product__supplier_id", "product__category_key", "quantity", "unit_price_snapshot"))
+    before = models.Order(pk=order.pk, restaurant_id=old[0], delivery_date=old[1], status=old[2])
+    apply(order_lines(before, items), order_lines(order, items))
+    order._rollup_header = header(order)
+
+def order_deleted(order):
+    current = capacity.locked(models.Order, order.pk)  # None: a concurrent delete already subtracted it
+    if current is not None:
+        apply(order_lines(current), ())  # items still exist until the cascade runs
+
+def _item_lines(item, product_id, quantity, price):
+    product = item.product if item.product_id == product_id else \
+        models.Product.objects.only("supplier_id", "category_key").get(pk=product_id)
+    return order_lines(item.order, [(product_id, product.supplier_id, product.category_key, quantity, price)])
+
+def item_saved(item, created):
+    old = getattr(item, "_rollup_snapshot", None)
+    before = [] if created or old is None else _item_lines(item, *old)
+    apply(before, _item_lines(item, item.product_id, item.quantity, item.unit_price_snapshot))
+    snapshot_item(item)
+
+def item_deleted(item):
+    old = getattr(item, "_rollup_snapshot", None) or tuple(getattr(item, f) for f in ITEM_FIELDS)
+    apply(_item_lines(item, *old), ())
+
+PRODUCT_FIELDS = ("supplier_id", "category_key")
+
+def snapshot_product(product):
+    product._rollup_snapshot = _loaded(product, PRODUCT_FIELDS)
+
+def move_products(moves):
+    """
+    Re-attribute every past line of the products in `moves`, {product_id: ((old supplier_id,
+    old category_key), (new supplier_id, new category_key))}: one aggregate over their items,
+    one apply().
+    """
+    moves = {pk: (old, new) for pk, (old, new) in moves.items() if old != new}
+    if not moves:
+        return
+    rows = _aggregate(models.OrderItem.objects.filter(product_id__in=list(moves)), ("product_id", "restaurant_id", "day"),
+                      [F("product_id"), F("order__restaurant_id"), F("order__delivery_date")])
+    before, after = [], []
+    for row in rows:
+        for (supplier_id, category), lines in zip(moves[row["product_id"]], (before, after)):
+            lines.append(((row["restaurant_id"], month_of(row["day"]), category),
+                          (supplier_id, week_of(row["day"]), row["product_id"]), tuple(row[m] for m in MEASURES)))
+    apply(before, after)
+
+def products_saved(products):
+    """Move the lines of existing products whose supplier or category changed; also for bulk_update, which skips signals."""
+    moves = {}
+    for product in products:
+        old, new = getattr(product, "_rollup_snapshot", None), _loaded(product, PRODUCT_FIELDS)
+        if old is not None and new is not None:
+            moves[product.pk] = (old, new)
+        product._rollup_snapshot = new
+    move_products(moves)
+
+def product_saved(product, created):
+    if created:
+        snapshot_product(product)
+    else:
+        products_saved([product])
+
+# ---------- rebuild ----------
+def _aggregate(items, key_fields, key_exprs):
+    money = DecimalField(max_digits=20, decimal_places=4)
+    amount = ExpressionWrapper(F("quantity") * F("unit_price_snapshot"), output_field=money)
+    aliases = [f"key_{i}" for i in range(len(key_exprs))]  # a key may share its name with an OrderItem field
+    rows = items.exclude(order__status="cancelled").values(**dict(zip(aliases, key_exprs))).order_by().annotate(
+        amount=Sum(amount), delivered_amount=Sum(Case(When(order__status="delivered", then=amount),
+                                                      default=Value(0), output_field=money)),
+        quantity=Sum("quantity"), lines=Count("id"))
+    for row in rows:
+        yield {**{field: row[alias] for field, alias in zip(key_fields, aliases)}, **{m: row[m] for m in MEASURES}}
+
+def _rebuild(model, key_fields, key_exprs, owners, item_owner, chunk_size, log):
+    owner_ids = list(owners.order_by("pk").values_list("pk", flat=True))
+    rows = 0
+    for start in range(0, len(owner_ids), chunk_size):
+        chunk = owner_ids[start:start + chunk_size]
+        items = models.OrderItem.objects.filter(**{f"{item_owner}__in": chunk})
+        with transaction.atomic():
+            model.objects.filter(**{f"{key_fields[0]}__in": chunk}).delete()
+            rows += len(model.objects.bulk_create([model(**row) for row in _aggregate(items, key_fields, key_exprs)],
+                                                  batch_size=1000))
+        log(f"{model.__name__}: {min(start + chunk_size, len(owner_ids))}/{len(owner_ids)} owners, {rows} rows")
+    return rows
+
+def rebuild(chunk_size=CHUNK_SIZE, log=lambda *a: None):
+    """
+    Recompute both rollups from OrderItem, e.g. after bulk writes that skip signals. Each chunk
+    of restaurants / suppliers is deleted and refilled in its own transaction, so the tables are
+    never empty as a whole and no transaction holds more than one chunk.
+    """
+    spend = _rebuild(models.RestaurantSpend, SPEND_KEY,
+                     [F("order__restaurant_id"), TruncMonth("order__delivery_date"), F("product__category_key")],
+                     models.RestaurantProfile.objects, "order__restaurant_id", chunk_size, log)
+    sales = _rebuild(models.SupplierSales, SALES_KEY,
+                     [F("product__supplier_id"), TruncWeek("order__delivery_date"), F("product_id")],
+                     models.SupplierProfile.objects, "product__supplier_id", chunk_size, log)
+    return {"spend": spend, "sales": sales}
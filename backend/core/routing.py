@@ -0,0 +1,153 @@
+import logging
+import os
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger("core.routing")
+
+STICKY_COOKIE = "rh_primary"
+
+def replicas():
+    return [alias for alias in getattr(settings, "DATABASE_REPLICAS", []) if alias in connections.settings]
+
+def sticky_seconds():
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+# ---------- replica health ----------
+_down_until = {}  # alias -> monotonic time before which the replica is not tried again
+
+def healthy(alias):
+    """Connect (or reuse the open connection) once; a failing replica is skipped for REPLICA_RETRY_SECONDS."""
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    connection = connections[alias]
+    try:
+        # sqlite would silently create an empty database for a missing file
+        if connection.vendor == "sqlite" and not os.path.exists(connection.settings_dict["NAME"]):
+            raise FileNotFoundError(connection.settings_dict["NAME"])
+        connection.ensure_connection()
+    except Exception as e:
+        _down_until[alias] = time.monotonic() + getattr(settings, "REPLICA_RETRY_SECONDS", 30)
+        logger.warning("replica %s unavailable, reading from %s: %s", alias, DEFAULT_DB_ALIAS, e)
+        return False
+    return True
+
+def pick_replica():
+    candidates = [alias for alias in replicas() if healthy(alias)]
+    return random.choice(candidates) if candidates else None
+
+# ---------- per-request state ----------
+class RequestState:
+    def __init__(self):
+        self.replica_ok, self.alias, self.wrote = False, None, False
+
+_state = ContextVar("db_routing_state", default=None)
+
+def sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+def is_sticky(request):
+    """A recent write by this client: read from the primary so it sees its own changes."""
+    if request.COOKIES.get(STICKY_COOKIE):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_authenticated and cache.get(sticky_key(user.pk)))
+
+def use_primary():
+    """Send the rest of this request's reads to the primary, e.g. before filling a cache shared by every client."""
+    state = _state.get()
+    if state is not None:
+        state.replica_ok = False
+
+class ReplicaReadMixin:
+    """Viewset side: safe requests may read from a replica once authentication has run."""
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = _state.get()
+        if state is not None and request.method in SAFE_METHODS and replicas() and not is_sticky(request):
+            state.replica_ok = True
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens the routing state for each request and, after a request that wrote to the primary,
+    keeps the client on the primary for REPLICA_STICKY_SECONDS: a cookie for any client plus a
+    cache key for the user (shared across workers with CACHE_BACKEND=file).
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = RequestState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    def finish(self, request, response, state):
+        if state.wrote and replicas():
+            seconds = sticky_seconds()
+            response.set_cookie(STICKY_COOKIE, "1", max_age=seconds, httponly=True, samesite="Lax")
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                cache.set(sticky_key(user.pk), 1, seconds)
+        return response
+
+# ---------- router ----------
+class ReplicaRouter:
+    """
+    Reads go to a replica only inside a safe request of a core viewset (ReplicaReadMixin) and
+    only until that request writes; one healthy replica is picked per request. Everything
+    else, including migrations, uses the primary.
+    """
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_ok or state.wrote:
+            return None
+        if state.alias is None:
+            state.alias = pick_replica() or DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label != "sessions":
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # every alias holds the same data
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
+
+# ---------- local stand-in ----------
+def copy_sqlite(source=DEFAULT_DB_ALIAS, target="replica"):
+    """Refresh a SQLite replica file from the primary with the online backup API (no replication locally)."""
+    source_conn = connections[source]
+    source_conn.ensure_connection()
+    with sqlite3.connect(connections.settings[target]["NAME"]) as dest:
+        source_conn.connection.backup(dest)
+    connections[target].close()  # reopen on the fresh copy
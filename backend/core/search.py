@@ -0,0 +1,124 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from . import caching, filters as core_filters, models
+
+# Side tables (created in migration 0003), keyed by product id:
+#   sqlite:   FTS5 virtual table, unicode61 tokenizer (case folding for Cyrillic)
+#   postgres: tsvector column with a GIN index
+SQLITE_TABLE = "core_product_fts"
+POSTGRES_TABLE = "core_product_search"
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def pg_config():
+    return getattr(settings, "SEARCH_PG_CONFIG", "russian")
+
+def normalize(text):
+    # "ё" is a separate letter to the tokenizers but users type "е" for both
+    return text.replace("ё", "е").replace("Ё", "Е")
+
+def terms(query):
+    return WORD_RE.findall(normalize(query or "").lower())
+
+def vendor():
+    return connection.vendor
+
+# ---------- index maintenance ----------
+def _sqlite_reindex(where, params):
+    with connection.cursor() as c:
+        c.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN (SELECT p.id FROM core_product p WHERE {where})", params)
+        c.execute(f"""
+            INSERT INTO {SQLITE_TABLE}(rowid, name, category, supplier_name)
+            SELECT p.id, replace(replace(p.name,'ё','е'),'Ё','Е'), replace(replace(p.category,'ё','е'),'Ё','Е'),
+                   replace(replace(s.company_name,'ё','е'),'Ё','Е')
+            FROM core_product p JOIN core_supplierprofile s ON s.id = p.supplier_id
+            WHERE {where}""", params)
+
+def _postgres_reindex(where, params):
+    cfg = pg_config()
+    with connection.cursor() as c:
+        c.execute(f"""
+            INSERT INTO {POSTGRES_TABLE}(product_id, document)
+            SELECT p.id,
+                   setweight(to_tsvector(%s::regconfig, translate(p.name, 'Ёё', 'Ее')), 'A') ||
+                   setweight(to_tsvector(%s::regconfig, translate(p.category, 'Ёё', 'Ее')), 'B') ||
+                   setweight(to_tsvector(%s::regconfig, translate(s.company_name, 'Ёё', 'Ее')), 'C')
+            FROM core_product p JOIN core_supplierprofile s ON s.id = p.supplier_id
+            WHERE {where}
+            ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document""", [cfg, cfg, cfg, *params])
+
+def _reindex(where, params):
+    if vendor() == "sqlite": _sqlite_reindex(where, params)
+    elif vendor() == "postgresql": _postgres_reindex(where, params)
+
+def index_products(product_ids):
+    ids = list(product_ids)
+    if ids: _reindex(f"p.id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+def index_supplier(supplier_id):
+    _reindex("p.supplier_id = %s", [supplier_id])
+
+def rebuild_index():
+    if vendor() == "sqlite":
+        with connection.cursor() as c: c.execute(f"DELETE FROM {SQLITE_TABLE}")
+    _reindex("1 = 1", [])
+    caching.bump_catalog_version()
+
+def remove_products(product_ids):
+    # postgres rows go away with the FK's ON DELETE CASCADE
+    ids = list(product_ids)
+    if ids and vendor() == "sqlite":
+        with connection.cursor() as c:
+            c.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(ids))})", ids)
+
+# ---------- querying ----------
+def search_products(queryset, query, prefix=False):
+    """Filter `queryset` to products matching `query` and annotate `search_rank` (higher is better)."""
+    words = terms(query)
+    if not words:
+        return queryset
+    table = models.Product._meta.db_table
+    if vendor() == "sqlite":
+        match = " ".join(f'"{w}"' for w in words) + ("*" if prefix else "")
+        # bm25 weights: name, category, supplier name; bm25 is "lower is better"
+        rank = RawSQL(f"SELECT -bm25({SQLITE_TABLE}, 10.0, 4.0, 1.0) FROM {SQLITE_TABLE} "
+                      f"WHERE {SQLITE_TABLE} MATCH %s AND rowid = {table}.id", [match], output_field=FloatField())
+        ids = RawSQL(f"SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s", [match])
+    elif vendor() == "postgresql":
+        tsquery = " & ".join(words) + (":*" if prefix else "")
+        rank = RawSQL(f"SELECT ts_rank(document, to_tsquery(%s::regconfig, %s)) FROM {POSTGRES_TABLE} "
+                      f"WHERE product_id = {table}.id", [pg_config(), tsquery], output_field=FloatField())
+        ids = RawSQL(f"SELECT product_id FROM {POSTGRES_TABLE} WHERE document @@ to_tsquery(%s::regconfig, %s)",
+                     [pg_config(), tsquery])
+    else:
+        q = Q()
+        for w in words:
+            q &= Q(name__icontains=w) | Q(category__icontains=w) | Q(supplier__company_name__icontains=w)
+        return queryset.filter(q).annotate(search_rank=RawSQL("0.0", [], output_field=FloatField()))
+    return queryset.filter(id__in=ids).annotate(search_rank=rank)
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search=... against the product text index; ?search_mode=prefix for autocomplete.
+    Results are ranked unless an explicit ?ordering= is given.
+    """
+    search_mode_param = "search_mode"
+
+    def is_prefix(self, request):
+        return request.query_params.get(self.search_mode_param) == "prefix"
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "")
+        return search_products(queryset, query, prefix=self.is_prefix(request))
+
+    def get_ordering(self, request, queryset, view):
+        # picked up by the keyset paginator, which orders by the first backend's get_ordering
+        ordering_filter = core_filters.AliasedOrderingFilter()
+        if terms(request.query_params.get(self.search_param)) and \
+                not request.query_params.get(ordering_filter.ordering_param):
+            return ("-search_rank", "-id")
+        return ordering_filter.get_ordering(request, queryset, view)
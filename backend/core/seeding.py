@@ -0,0 +1,152 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from . import caching, fx, matching, models, offers, ratings, rollups, search
+
+User = get_user_model()
+
+PREFIX = "bench_"
+BATCH_SIZE = 5000
+# rows per unit of --scale
+PER_SCALE = {"restaurants": 20, "suppliers": 5, "products": 200, "orders": 100, "offers": 200, "reviews": 100,
+             "preorders": 50, "waitlist": 40}
+ITEMS_PER_ORDER = (20, 60)
+
+CATEGORIES = {
+    "Рыба": ["Лосось", "Форель", "Треска", "Сибас", "Дорадо", "Тунец"],
+    "Мясо": ["Говядина", "Телятина", "Свинина", "Баранина", "Курица", "Утка"],
+    "Овощи": ["Томаты", "Огурцы", "Картофель", "Морковь", "Лук", "Кабачки"],
+    "Фрукты и ягоды": ["Клубника", "Малина", "Черника", "Яблоки", "Груши", "Вишня"],
+    "Молочные продукты": ["Сливки", "Моцарелла", "Пармезан", "Масло сливочное", "Йогурт"],
+}
+GRADES = ["свежий", "премиум", "фермерский", "охлаждённый", "органик", "отборный"]
+COUNTRIES = ["DE", "FR", "IT", "ES", "NL", "PL", "GB"]
+
+def bench_exists():
+    return User.objects.filter(username__startswith=PREFIX).exists()
+
+def reset():
+    with transaction.atomic():
+        # order items PROTECT their products: orders go first
+        models.Order.objects.filter(restaurant__user__username__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+def _chunks(seq, size=BATCH_SIZE):
+    for start in range(0, len(seq), size):
+        yield seq[start:start + size]
+
+def _create(model, objs):
+    created = []
+    for chunk in _chunks(objs):
+        created += model.objects.bulk_create(chunk)
+    return created
+
+def seed(scale, seed=0, log=print):
+    """
+    Deterministic bulk data set: the same (scale, seed) always produces the same rows,
+    so benchmark runs against it are comparable. Everything is written with bulk_create;
+    derived data (search index, ratings, best offers) is rebuilt once at the end.
+    """
+    rnd = random.Random(seed)
+    counts = {k: v * scale for k, v in PER_SCALE.items()}
+    today = date.today()
+    password = make_password("bench12345")  # hashed once, shared by every bench user
+
+    with transaction.atomic():
+        users = _create(User, [User(username=f"{PREFIX}r{i}", email=f"r{i}@bench.local", password=password,
+                                    is_restaurant=True) for i in range(counts["restaurants"])] +
+                              [User(username=f"{PREFIX}s{i}", email=f"s{i}@bench.local", password=password,
+                                    is_supplier=True) for i in range(counts["suppliers"])])
+        resto_users, supplier_users = users[:counts["restaurants"]], users[counts["restaurants"]:]
+        restaurants = _create(models.RestaurantProfile, [
+            models.RestaurantProfile(user=u, company_name=f"Ресторан {i}", preferred_currency=rnd.choice(["EUR"] * 8 + ["USD", "RUB"]))
+            for i, u in enumerate(resto_users)])
+        suppliers = _create(models.SupplierProfile, [
+            models.SupplierProfile(user=u, company_name=f"Поставщик {i}", categories=", ".join(rnd.sample(list(CATEGORIES), 2)),
+                                   verified=rnd.random() < 0.7, is_farmer=rnd.random() < 0.3, country=rnd.choice(COUNTRIES))
+            for i, u in enumerate(supplier_users)])
+        log(f"{len(restaurants)} restaurants, {len(suppliers)} suppliers")
+
+        product_objs = []
+        for i in range(counts["products"]):
+            category = rnd.choice(list(CATEGORIES))
+            start = today + timedelta(days=rnd.randint(-120, 60))
+            product_objs.append(models.Product(
+                name=f"{rnd.choice(CATEGORIES[category])} {rnd.choice(GRADES)} #{i}", category=category,
+                unit=rnd.choice(["kg", "kg", "kg", "pcs", "l"]), price_per_unit=Decimal(rnd.randint(50, 9000)) / 100,
+                currency=rnd.choice(["EUR"] * 6 + ["USD", "RUB"]), available_from=start,
+                available_to=start + timedelta(days=rnd.randint(30, 365)) if rnd.random() < 0.4 else None,
+                supplier=rnd.choice(suppliers), verified=rnd.random() < 0.8))
+        products = _create(models.Product, product_objs)
+        del product_objs
+        log(f"{len(products)} products")
+        # up to four earlier prices per product over the past year, then the current one
+        now, history = timezone.now(), []
+        for product in products:
+            for days_ago in sorted(rnd.sample(range(1, 366), rnd.randint(0, 4)), reverse=True):
+                history.append(models.ProductPrice(product=product, currency=product.currency,
+                                                   price_per_unit=(product.price_per_unit * rnd.randint(80, 120) / 100).quantize(Decimal("0.01")),
+                                                   effective_from=now - timedelta(days=days_ago)))
+            history.append(models.ProductPrice(product=product, price_per_unit=product.price_per_unit,
+                                               currency=product.currency, effective_from=now))
+        _create(models.ProductPrice, history)
+        log(f"{len(history)} price history rows")
+
+        statuses = [s for s, _ in models.Order.STATUS_CHOICES]
+        order_ids, item_count = [], 0
+        for chunk_start in range(0, counts["orders"], BATCH_SIZE // 10):
+            size = min(BATCH_SIZE // 10, counts["orders"] - chunk_start)
+            orders = models.Order.objects.bulk_create([
+                models.Order(restaurant=rnd.choice(restaurants), delivery_date=today + timedelta(days=rnd.randint(-365, 30)),
+                             status=rnd.choice(statuses)) for _ in range(size)])
+            items, events = [], []
+            for order in orders:
+                lines = rnd.sample(products, min(len(products), rnd.randint(*ITEMS_PER_ORDER)))
+                items += [models.OrderItem(order=order, product=product, quantity=Decimal(rnd.randint(1, 400)) / 4,
+                                           unit_price_snapshot=product.price_per_unit) for product in lines]
+                events.append(models.CalendarEvent(date=order.delivery_date, restaurant_id=order.restaurant_id,
+                                                   supplier_id=lines[0].supplier_id, order=order, event_type="order"))
+            _create(models.OrderItem, items)
+            _create(models.CalendarEvent, events)
+            order_ids += [o.id for o in orders]
+            item_count += len(items)
+        log(f"{len(order_ids)} orders, {item_count} items")
+        _create(models.Offer, [
+            models.Offer(order_id=rnd.choice(order_ids), supplier=rnd.choice(suppliers),
+                         price=Decimal(rnd.randint(1000, 500000)) / 100, delivery_eta=today + timedelta(days=rnd.randint(1, 14)))
+            for _ in range(counts["offers"])])
+        preorders = []
+        for p in rnd.sample(products, min(len(products), counts["preorders"])):
+            restaurant, quantity = rnd.choice(restaurants), Decimal(rnd.randint(1, 100))
+            preorders.append(models.PreOrder(restaurant=restaurant, supplier=p.supplier, product=p, quantity=quantity,
+                                             reserved_quantity=quantity, delivery_date=today + timedelta(days=rnd.randint(7, 90))))
+        preorders = _create(models.PreOrder, preorders)
+        # every preordered harvest has a capacity ledger row, half of it reserved by that preorder
+        _create(models.ProductCapacity, [
+            models.ProductCapacity(product=p.product, delivery_date=p.delivery_date, total=p.quantity * 2, remaining=p.quantity)
+            for p in preorders])
+        _create(models.CalendarEvent, [
+            models.CalendarEvent(date=p.delivery_date, restaurant=p.restaurant, supplier=p.supplier, preorder=p,
+                                 event_type="preorder") for p in preorders])
+        _create(models.Review, [
+            models.Review(reviewer=rnd.choice(resto_users), target=rnd.choice(supplier_users), rating=rnd.choice([3, 4, 4, 5, 5]),
+                          comment="") for _ in range(counts["reviews"])])
+        _create(models.ProductWaitlist, [
+            models.ProductWaitlist(product=rnd.choice(products), restaurant=rnd.choice(restaurants),
+                                   desired_quantity=Decimal(rnd.randint(1, 50))) for _ in range(counts["waitlist"])])
+        _create(models.FavoritePartner, [
+            models.FavoritePartner(restaurant=r, partner_user=rnd.choice(supplier_users)) for r in restaurants])
+
+        # bulk_create skips signals: rebuild derived data once
+        search.rebuild_index()
+        fx.refresh_prices()
+        matching.rebuild()
+        ratings.rebuild()
+        offers.refresh_best_offers()
+        rollups.rebuild()
+        caching.bump_catalog_version()
+    return counts
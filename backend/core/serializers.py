@@ -1,65 +1,234 @@
+from django.db import transaction
 from rest_framework import serializers
-from . import models
+from rest_framework.exceptions import NotFound
+from . import capacity, fx, media, models, rollups
+from .sparse import FastListSerializer, SparseFieldsMixin
 
-class ProductMediaSerializer(serializers.ModelSerializer):
+# Read serializers take ?fields=a,b and ?expand=<Meta.expandable> and serialize lists through
+# FastListSerializer (core.sparse); views trim their querysets to match with SparseQuerysetMixin.
+
+class ProductMediaSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # original plus resized JPEG/WebP derivatives (core.media); sizes appear once processing is done
+    urls = serializers.SerializerMethodField()
     class Meta:
         model = models.ProductMedia
-        fields = ["id","image","video"]
+        list_serializer_class = FastListSerializer
+        fields = ["id","image","video","urls","processing_status"]
+    def get_urls(self, obj):
+        request = self.context.get("request")
+        return media.url_set(obj, request.build_absolute_uri if request else None)
+
+class SupplierProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    rating_avg = serializers.FloatField(source="user.rating_avg", read_only=True)
+    rating_count = serializers.IntegerField(source="user.rating_count", read_only=True)
+    class Meta:
+        model = models.SupplierProfile
+        list_serializer_class = FastListSerializer
+        fields = ["id","company_name","categories","verified","is_farmer","country","rating_avg","rating_count"]
+
+class CandidateSupplierSerializer(SupplierProfileSerializer):
+    # set by core.matching.candidates
+    matched = serializers.IntegerField(read_only=True)
+    needed = serializers.IntegerField(read_only=True)
+    rank = serializers.IntegerField(read_only=True)
+    class Meta(SupplierProfileSerializer.Meta):
+        fields = SupplierProfileSerializer.Meta.fields + ["matched","needed","rank"]
+
+class RestaurantProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.RestaurantProfile
+        list_serializer_class = FastListSerializer
+        fields = ["id","company_name","preferred_currency"]
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     media = ProductMediaSerializer(many=True, read_only=True)
-    is_available = serializers.ReadOnlyField()
+    is_available = serializers.SerializerMethodField()
     display_price = serializers.SerializerMethodField()
+    # price_per_unit in the viewer's currency (?currency=, else RestaurantProfile.preferred_currency)
+    price = serializers.SerializerMethodField()
+    price_currency = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Product
-        fields = ["id","name","category","unit","price_per_unit","currency","display_price",
+        list_serializer_class = FastListSerializer
+        fields = ["id","name","category","unit","price_per_unit","currency","display_price","price","price_currency",
                   "available_from","available_to","verified","supplier","is_available","media"]
+        expandable = {"supplier": "SupplierProfileSerializer"}
+        expand_select = {"supplier": ["supplier__user"]}
+        # model columns behind computed fields, kept by ?fields= trimming
+        sparse_requires = {"is_available": ["available_from","available_to"], "display_price": ["price_per_unit","currency"],
+                           "price": ["price_eur"]}
+
+    def target_currency(self):
+        request = self.context.get("request")
+        return fx.request_currency(request) if request else fx.BASE
 
     def get_display_price(self, obj): return obj.display_price()
+    def get_price(self, obj):
+        # annotated by Product.objects.with_price_in(); converted here for unannotated instances
+        price = obj.price if hasattr(obj, "price") else fx.from_eur(obj.price_eur, self.target_currency())
+        return f"{price:.2f}"
+    def get_price_currency(self, obj): return self.target_currency()
+    def get_is_available(self, obj):
+        # annotated by Product.objects.with_availability(); property only for unannotated instances
+        return obj.available_now if hasattr(obj, "available_now") else obj.is_available
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.OrderItem
+        list_serializer_class = FastListSerializer
         fields = ["id","product","quantity","unit_price_snapshot"]
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
+    # annotated by Order.objects.with_totals()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    line_count = serializers.IntegerField(read_only=True)
+    total_quantity = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
     class Meta:
         model = models.Order
-        fields = ["id","restaurant","delivery_date","status","created_at","items"]
+        list_serializer_class = FastListSerializer
+        fields = ["id","restaurant","delivery_date","status","created_at","items",
+                  "total","line_count","total_quantity","best_offer"]
+        expandable = {"restaurant": "RestaurantProfileSerializer"}
+        read_only_fields = ["best_offer"]
     def create(self, validated_data):
         items = validated_data.pop("items", [])
-        order = models.Order.objects.create(**validated_data)
-        for item in items: models.OrderItem.objects.create(order=order, **item)
-        return order
+        with transaction.atomic():
+            order = models.Order.objects.create(**validated_data)
+            taken = {p for p, _ in capacity.reserve(capacity.order_lines(order, [(i["product"].pk, i["quantity"]) for i in items]))}
+            models.OrderItem.objects.bulk_create([
+                models.OrderItem(order=order, reserved_quantity=item["quantity"] if item["product"].pk in taken else 0, **item)
+                for item in items])
+            # one rollup update for the whole order (bulk_create skips the per-item signal)
+            rollups.apply((), rollups.order_lines(order, [
+                (i["product"].pk, i["product"].supplier_id, i["product"].category_key, i["quantity"], i["unit_price_snapshot"])
+                for i in items]))
+        return models.Order.objects.with_totals().prefetch_related("items").get(pk=order.pk)
+    def update(self, instance, validated_data):
+        # status / delivery date changes move the reservation (cancelling releases it); the change
+        # is applied to the locked row, so concurrent updates see each other's status
+        with transaction.atomic():
+            current = capacity.locked(models.Order, instance.pk)
+            if current is None:
+                raise NotFound()
+            before = capacity.order_snapshot(current)
+            instance = super().update(current, validated_data)
+            capacity.move_order(instance, before)
+        return models.Order.objects.with_totals().prefetch_related("items").get(pk=instance.pk)
+
+class BulkOrderItemSerializer(serializers.Serializer):
+    # plain ids: references are resolved for the whole batch in core.orders
+    product = serializers.IntegerField()
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    unit_price_snapshot = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
 
-class OfferSerializer(serializers.ModelSerializer):
+class BulkOrderSerializer(serializers.Serializer):
+    restaurant = serializers.IntegerField()
+    delivery_date = serializers.DateField()
+    status = serializers.ChoiceField(choices=models.Order.STATUS_CHOICES, default="pending")
+    items = BulkOrderItemSerializer(many=True, allow_empty=False)
+
+class OfferSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Offer
+        list_serializer_class = FastListSerializer
         fields = ["id","order","supplier","price","delivery_eta","created_at"]
+        expandable = {"supplier": "SupplierProfileSerializer"}
+        expand_select = {"supplier": ["supplier__user"]}
+
+class RankedOfferSerializer(OfferSerializer):
+    rank = serializers.IntegerField(read_only=True)
+    class Meta(OfferSerializer.Meta):
+        fields = OfferSerializer.Meta.fields + ["rank"]
 
-class PreOrderSerializer(serializers.ModelSerializer):
+class PreOrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.PreOrder
+        list_serializer_class = FastListSerializer
         fields = ["id","restaurant","supplier","product","quantity","delivery_date","status","created_at"]
+        expandable = {"restaurant": "RestaurantProfileSerializer", "supplier": "SupplierProfileSerializer",
+                      "product": "ProductSerializer"}
+        expand_select = {"supplier": ["supplier__user"]}
+        expand_prefetch = {"product": ["product__media"]}
+    def create(self, validated_data):
+        with transaction.atomic():
+            preorder = models.PreOrder(**validated_data)
+            taken = capacity.reserve(capacity.preorder_lines(preorder))
+            if (preorder.product_id, preorder.delivery_date) in taken:
+                validated_data["reserved_quantity"] = preorder.quantity
+            preorder = super().create(validated_data)
+        return preorder
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            current = capacity.locked(models.PreOrder, instance.pk)
+            if current is None:
+                raise NotFound()
+            before = capacity.preorder_held(current), capacity.preorder_lines(current)
+            instance = super().update(current, validated_data)
+            capacity.move_preorder(instance, before)
+        return instance
 
-class CalendarEventSerializer(serializers.ModelSerializer):
+class ProductCapacitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.ProductCapacity
+        list_serializer_class = FastListSerializer
+        fields = ["id","product","delivery_date","total","remaining"]
+        read_only_fields = ["remaining"]
+    def validate_total(self, value):
+        if value < 0: raise serializers.ValidationError("Must not be negative.")
+        return value
+    def create(self, validated_data):
+        return capacity.set_capacity(validated_data["product"].pk, validated_data["delivery_date"], validated_data["total"])
+    def update(self, instance, validated_data):
+        # product and date identify the ledger row and are fixed once created
+        return capacity.set_capacity(instance.product_id, instance.delivery_date,
+                                     validated_data.get("total", instance.total))
+
+class CalendarEventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.CalendarEvent
+        list_serializer_class = FastListSerializer
         fields = ["id","date","restaurant","supplier","order","preorder","event_type","status"]
+        expandable = {"restaurant": "RestaurantProfileSerializer", "supplier": "SupplierProfileSerializer"}
+        expand_select = {"supplier": ["supplier__user"]}
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Review
+        list_serializer_class = FastListSerializer
         fields = ["id","reviewer","target","rating","comment","image","created_at"]
 
-class ProductWaitlistSerializer(serializers.ModelSerializer):
+class ProductWaitlistSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.ProductWaitlist
+        list_serializer_class = FastListSerializer
         fields = ["id","product","restaurant","desired_quantity","notified","created_at"]
+        expandable = {"product": "ProductSerializer", "restaurant": "RestaurantProfileSerializer"}
+        expand_prefetch = {"product": ["product__media"]}
 
-class FavoritePartnerSerializer(serializers.ModelSerializer):
+class FavoritePartnerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.FavoritePartner
+        list_serializer_class = FastListSerializer
         fields = ["id","restaurant","partner_user","created_at"]
+        expandable = {"restaurant": "RestaurantProfileSerializer"}
+
+class RestaurantSpendSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.RestaurantSpend
+        list_serializer_class = FastListSerializer
+        fields = ["id","restaurant","month","category","amount","delivered_amount","quantity","lines"]
+
+class SupplierSalesSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = models.SupplierSales
+        list_serializer_class = FastListSerializer
+        fields = ["id","supplier","week","product","amount","delivered_amount","quantity","lines"]
+        expandable = {"product": "ProductSerializer"}
+        expand_prefetch = {"product": ["product__media"]}
+
+class ProductPriceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.ProductPrice
+        fields = ["product","price_per_unit","currency","effective_from"]
@@ -0,0 +1,168 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from . import caching, capacity, fx, instrumentation, matching, media, models, offers, prices, ratings, rollups, search, waitlist
+
+# ---------- Product search index ----------
+@receiver(post_save, sender=models.Product)
+def product_saved_reindex(sender, instance, **kwargs):
+    search.index_products([instance.pk])
+
+@receiver(post_delete, sender=models.Product)
+def product_deleted_unindex(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+@receiver(post_save, sender=models.SupplierProfile)
+@receiver(post_save, sender=models.FarmerProfile)
+def supplier_saved_reindex(sender, instance, created, **kwargs):
+    if not created: search.index_supplier(instance.pk)
+
+# ---------- Order.best_offer ----------
+@receiver(post_init, sender=models.Offer)
+def offer_order_snapshot(sender, instance, **kwargs):
+    # the order the offer was loaded under; from __dict__ so a deferred order_id is not fetched
+    instance._order_snapshot = instance.__dict__.get("order_id") if instance.pk else None
+
+@receiver(post_save, sender=models.Offer)
+@receiver(post_delete, sender=models.Offer)
+def offer_changed_refresh_best(sender, instance, **kwargs):
+    # an offer moved to another order stops being the best offer of the one it left
+    offers.refresh_best_offers({instance.order_id, instance._order_snapshot} - {None})
+    instance._order_snapshot = instance.order_id
+
+# ---------- Review -> CustomUser rating counters ----------
+@receiver(post_init, sender=models.Review)
+def review_snapshot(sender, instance, **kwargs):
+    # remember what was counted, so edits apply only the difference
+    instance._rating_snapshot = (instance.target_id, instance.rating) if instance.pk else (None, None)
+
+@receiver(post_save, sender=models.Review)
+def review_saved_update_rating(sender, instance, created, **kwargs):
+    ratings.review_saved(instance, created)
+    instance._rating_snapshot = (instance.target_id, instance.rating)
+
+@receiver(post_delete, sender=models.Review)
+def review_deleted_update_rating(sender, instance, **kwargs):
+    ratings.review_deleted(instance)
+
+# ---------- Waitlist ----------
+@receiver(post_save, sender=models.Product)
+def product_saved_notify_waitlist(sender, instance, **kwargs):
+    waitlist.schedule([instance.pk])
+
+# ---------- FX ----------
+@receiver(pre_save, sender=models.Product)
+def product_price_eur(sender, instance, **kwargs):
+    fx.set_price_eur(instance)
+
+@receiver(post_save, sender=models.FxRate)
+@receiver(post_delete, sender=models.FxRate)
+def fx_rate_changed(sender, **kwargs):
+    fx.invalidate()
+    fx.refresh_prices()
+    caching.bump_catalog_version()
+
+# ---------- Price history (core.prices) ----------
+@receiver(post_init, sender=models.Product)
+def product_price_snapshot(sender, instance, **kwargs):
+    prices.snapshot(instance)
+
+@receiver(post_save, sender=models.Product)
+def product_saved_price_history(sender, instance, created, **kwargs):
+    prices.product_saved(instance, created)
+
+# ---------- Supplier categories (core.matching) ----------
+@receiver(pre_save, sender=models.Product)
+def product_category_key(sender, instance, **kwargs):
+    matching.set_category_key(instance)
+
+@receiver(post_save, sender=models.SupplierProfile)
+@receiver(post_save, sender=models.FarmerProfile)
+def supplier_saved_sync_categories(sender, instance, **kwargs):
+    matching.sync_supplier(instance)
+
+# ---------- Capacity ledger: deleting a live order / preorder gives its quantity back ----------
+# pre_delete runs inside the deletion's transaction: the locked re-read sees whether a concurrent
+# request already cancelled or deleted the row, and the items still exist until the cascade runs
+@receiver(pre_delete, sender=models.Order)
+def order_deleted_release(sender, instance, **kwargs):
+    current = capacity.locked(models.Order, instance.pk)
+    if current is not None:
+        capacity.release_order(current)
+
+@receiver(pre_delete, sender=models.PreOrder)
+def preorder_deleted_release(sender, instance, **kwargs):
+    current = capacity.locked(models.PreOrder, instance.pk)
+    if current is not None:
+        capacity.release(capacity.preorder_held(current))
+
+# ---------- ProductMedia derivatives ----------
+@receiver(post_init, sender=models.ProductMedia)
+def media_snapshot(sender, instance, **kwargs):
+    instance._image_snapshot = instance.image.name if instance.pk else None
+
+@receiver(post_save, sender=models.ProductMedia)
+def media_saved_process(sender, instance, created, **kwargs):
+    if created or instance.image.name != instance._image_snapshot:
+        media.schedule(instance.pk)
+        instance._image_snapshot = instance.image.name
+
+# ---------- Analytics rollups ----------
+@receiver(post_init, sender=models.Order)
+def order_rollup_snapshot(sender, instance, **kwargs):
+    rollups.snapshot_order(instance)
+
+@receiver(pre_save, sender=models.Order)
+def order_saving_rollups(sender, instance, **kwargs):
+    rollups.order_saving(instance)
+
+@receiver(post_save, sender=models.Order)
+def order_saved_rollups(sender, instance, created, **kwargs):
+    rollups.order_saved(instance, created)
+
+@receiver(pre_delete, sender=models.Order)
+def order_deleted_rollups(sender, instance, **kwargs):
+    rollups.order_deleted(instance)
+
+@receiver(post_init, sender=models.OrderItem)
+def item_rollup_snapshot(sender, instance, **kwargs):
+    rollups.snapshot_item(instance)
+
+@receiver(post_save, sender=models.OrderItem)
+def item_saved_rollups(sender, instance, created, **kwargs):
+    rollups.item_saved(instance, created)
+
+@receiver(post_delete, sender=models.OrderItem)
+def item_deleted_rollups(sender, instance, origin=None, **kwargs):
+    # items deleted along with their order were subtracted by order_deleted_rollups
+    if isinstance(origin, models.OrderItem) or getattr(origin, "model", None) is models.OrderItem:
+        rollups.item_deleted(instance)
+
+@receiver(post_init, sender=models.Product)
+def product_rollup_snapshot(sender, instance, **kwargs):
+    rollups.snapshot_product(instance)
+
+@receiver(post_save, sender=models.Product)
+def product_saved_rollups(sender, instance, created, **kwargs):
+    # a new supplier or category (its key is set in pre_save) moves the product's past lines too
+    rollups.product_saved(instance, created)
+
+# ---------- Catalog cache version ----------
+@receiver(post_save, sender=models.Product)
+@receiver(post_delete, sender=models.Product)
+@receiver(post_save, sender=models.ProductMedia)
+@receiver(post_delete, sender=models.ProductMedia)
+@receiver(post_save, sender=models.SupplierProfile)
+@receiver(post_delete, sender=models.SupplierProfile)
+@receiver(post_save, sender=models.FarmerProfile)
+@receiver(post_delete, sender=models.FarmerProfile)
+@receiver(post_save, sender=models.Review)
+@receiver(post_delete, sender=models.Review)
+def catalog_changed(sender, **kwargs):
+    # reviews move supplier ratings, which products can be ordered by
+    caching.bump_catalog_version()
+
+# ---------- Request instrumentation ----------
+@receiver(connection_created)
+def connection_instrumented(sender, connection, **kwargs):
+    instrumentation.install(connection)
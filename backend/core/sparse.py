@@ -0,0 +1,207 @@
+from decimal import Decimal
+from functools import lru_cache
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.manager import BaseManager
+from django.utils import timezone
+from rest_framework import fields as drf_fields, relations, serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+def requested(request):
+    """(fields or None, expand) from ?fields=a,b&expand=c on safe requests; writes always use every field."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    params = request.query_params if hasattr(request, "query_params") else request.GET
+    split = lambda name: {f.strip() for f in params.get(name, "").split(",") if f.strip()}
+    fields = split(FIELDS_PARAM)
+    return fields or None, split(EXPAND_PARAM)
+
+# ---------- serializers ----------
+class SparseFieldsMixin:
+    """
+    ?fields=id,name keeps only those fields; ?expand=supplier swaps a primary key for the nested
+    object named in Meta.expandable ({field: serializer class name in core.serializers}).
+    Only the top-level serializer of a response reads the query string.
+    """
+    def is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.is_root():
+            return fields
+        wanted, expand = requested(self.context.get("request"))
+        for name in expand & set(getattr(self.Meta, "expandable", {})):
+            if name in fields and (wanted is None or name in wanted):
+                fields[name] = expandable_serializer(self, name)(read_only=True)
+        if wanted is not None:
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        return fields
+
+def expandable_serializer(serializer, name):
+    from . import serializers as core_serializers
+    return getattr(core_serializers, serializer.Meta.expandable[name])
+
+# ---------- querysets ----------
+@lru_cache(maxsize=None)
+def field_sources(serializer_class):
+    """{field name: first attribute of its source} for a serializer class, e.g. rating_avg -> user."""
+    return {name: field.source.split(".")[0] for name, field in serializer_class().fields.items() if field.source != "*"}
+
+def _root(lookup):
+    return (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup).split("__")[0]
+
+def trim(queryset, serializer_class, request, keep=()):
+    """
+    Cut a list/detail queryset down to what the requested fields read: prefetches and
+    select_related joins nobody renders are dropped, expanded relations are joined, and
+    with ?fields= the columns are limited with only() (plus Meta.sparse_requires for computed
+    fields and `keep`, e.g. the keyset ordering columns, so nothing is loaded lazily per row).
+    """
+    wanted, expand = requested(request)
+    meta = serializer_class.Meta
+    expand &= set(getattr(meta, "expandable", {}))
+    if wanted is not None:
+        expand &= wanted
+    joins = [path for name in expand for path in getattr(meta, "expand_select", {}).get(name, [name])]
+    prefetches = [path for name in expand for path in getattr(meta, "expand_prefetch", {}).get(name, [])]
+    if wanted is None:
+        return queryset.select_related(*joins).prefetch_related(*prefetches) if joins or prefetches else queryset
+
+    sources = field_sources(serializer_class)
+    roots = {sources.get(name, name) for name in wanted}
+    kept_prefetch = [lookup for lookup in queryset._prefetch_related_lookups if _root(lookup) in roots]
+    selected = queryset.query.select_related
+    kept_joins = [path for path in _select_paths(selected) if path.split("__")[0] in roots] + joins
+    queryset = queryset.prefetch_related(None).prefetch_related(*kept_prefetch, *prefetches).select_related(None)
+    if kept_joins:
+        queryset = queryset.select_related(*kept_joins)
+
+    model = queryset.model
+    columns = {model._meta.pk.name}
+    for name in wanted | set(keep):
+        name = name.lstrip("-")
+        for candidate in [sources.get(name, name), *getattr(meta, "sparse_requires", {}).get(name, [])]:
+            try:
+                field = model._meta.get_field(candidate)
+            except FieldDoesNotExist:
+                continue  # annotations and computed values
+            if field.concrete:
+                columns.add(field.name)
+    columns |= {path.split("__")[0] for path in kept_joins}
+    return queryset.only(*columns)
+
+def _select_paths(selected, prefix=""):
+    if not isinstance(selected, dict):
+        return []
+    paths = []
+    for name, nested in selected.items():
+        paths.append(prefix + name)
+        paths += _select_paths(nested, prefix + name + "__")
+    return paths
+
+class SparseQuerysetMixin:
+    """Viewset side of ?fields= / ?expand=: list and retrieve querysets are trimmed to the serializer's needs."""
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, "action", None) not in ("list", "retrieve"):
+            return queryset
+        keep = ()
+        paginator = self.paginator if self.action == "list" else None
+        if paginator is not None and hasattr(paginator, "get_ordering"):
+            keep = paginator.get_ordering(self.request, queryset, self)
+        return trim(queryset, self.get_serializer_class(), self.request, keep)
+
+# ---------- fast list serialization ----------
+def _plain(attname):
+    return lambda obj: getattr(obj, attname)
+
+def _nullable(convert, attname):
+    def read(obj):
+        value = getattr(obj, attname)
+        return None if value is None else convert(value)
+    return read
+
+def _generic(field):
+    def read(obj):
+        try:
+            attribute = field.get_attribute(obj)
+        except drf_fields.SkipField:
+            return None
+        check = attribute.pk if isinstance(attribute, relations.PKOnlyObject) else attribute
+        return None if check is None else field.to_representation(attribute)
+    return read
+
+def _decimal(places):
+    def convert(value):
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+        return f"{value:.{places}f}"
+    return convert
+
+def _datetime(field):
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    def convert(value):
+        if tz is not None and timezone.is_aware(value):
+            value = value.astimezone(tz)
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return convert
+
+def _getter(serializer, name, field):
+    """A plain-attribute reader equivalent to field.to_representation(field.get_attribute(obj))."""
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(serializer, field.method_name)
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    simple = len(field.source_attrs) == 1 and model is not None
+    if not simple or field.source == "*":
+        return _generic(field)
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        model_field = None  # annotation: plain attribute
+    attname = getattr(model_field, "attname", None) or field.source
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return _plain(attname)
+    kind = type(field)
+    if kind in (drf_fields.CharField, drf_fields.BooleanField, drf_fields.IntegerField, drf_fields.EmailField):
+        return _plain(attname)
+    if kind is drf_fields.ChoiceField and all(isinstance(key, str) for key in field.choices):
+        return _plain(attname)
+    if kind is drf_fields.DecimalField and getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING) \
+            and not field.localize and field.rounding is None and field.decimal_places is not None:
+        return _nullable(_decimal(field.decimal_places), attname)
+    if kind is drf_fields.DateField and getattr(field, "format", api_settings.DATE_FORMAT) == "iso-8601":
+        return _nullable(lambda value: value.isoformat(), attname)
+    if kind is drf_fields.DateTimeField and getattr(field, "format", api_settings.DATETIME_FORMAT) == "iso-8601":
+        return _nullable(_datetime(field), attname)
+    return _generic(field)
+
+class FastListSerializer(serializers.ListSerializer):
+    """
+    Read path for `many=True`: each field's reader is worked out once per list (attribute access
+    plus a direct conversion for common field types), then rows are built as plain dicts.
+    Anything unusual falls back to the field's own to_representation, so output matches the
+    regular ModelSerializer; writes go through DRF unchanged. FAST_LIST_SERIALIZER = False
+    switches back to DRF's own per-field path.
+    """
+    def readers(self):
+        if not hasattr(self, "_readers"):
+            self._readers = [(name, _getter(self.child, name, field))
+                             for name, field in self.child.fields.items() if not field.write_only]
+        return self._readers
+
+    def to_representation(self, data):
+        if not getattr(settings, "FAST_LIST_SERIALIZER", True):
+            return super().to_representation(data)
+        rows = data.all() if isinstance(data, BaseManager) else data
+        readers = self.readers()
+        return [{name: read(obj) for name, read in readers} for obj in rows]
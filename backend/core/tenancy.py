@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q
+from rest_framework.exceptions import PermissionDenied
+from . import models
+
+def profile_ids(request):
+    """
+    (restaurant_profile_id, supplier_profile_id) of the caller, None where the user has no such
+    profile; one query per request, cached on the underlying Django request so every viewset,
+    serializer and async view handling it shares the result.
+    """
+    django_request = getattr(request, "_request", request)
+    cached = getattr(django_request, "_tenant_profiles", None)
+    if cached is None:
+        user = request.user
+        cached = (None, None)
+        if user.is_authenticated:
+            cached = get_user_model().objects.filter(pk=user.pk).values_list(
+                "restaurant_profile__id", "supplier_profile__id").first() or cached
+        django_request._tenant_profiles = cached
+    return cached
+
+def order_filter(restaurant_id, supplier_id):
+    """Orders the caller can see: its restaurant's, and for a supplier those that contain its products or that it bid on."""
+    q = Q(restaurant_id=restaurant_id) if restaurant_id else Q()
+    if supplier_id:
+        q |= Q(Exists(models.OrderItem.objects.filter(order=OuterRef("pk"), product__supplier_id=supplier_id)))
+        q |= Q(Exists(models.Offer.objects.filter(order=OuterRef("pk"), supplier_id=supplier_id)))
+    return q
+
+WRITE_ACTIONS = ("update", "partial_update", "destroy")
+
+class TenantScopedMixin:
+    """
+    Limits get_queryset (lists, detail lookups, updates, exports) to the caller's own rows: those
+    whose `tenant_restaurant` lookup is the caller's RestaurantProfile or whose `tenant_supplier`
+    lookup is its SupplierProfile, both plain FK columns. Staff see everything, users without a
+    profile nothing. With `tenant_owner` ("restaurant" / "supplier") only that side may update
+    or delete; the other side gets 404 as for rows it cannot see.
+    """
+    tenant_restaurant = None
+    tenant_supplier = None
+    tenant_owner = None
+
+    def check_tenant(self, restaurant_id=None, supplier_id=None):
+        """For writes naming an owner (create, reassign): it has to be one of the caller's profiles."""
+        if self.request.user.is_staff:
+            return
+        own_restaurant, own_supplier = profile_ids(self.request)
+        if restaurant_id is not None and restaurant_id != own_restaurant:
+            raise PermissionDenied("You can only act for your own restaurant.")
+        if supplier_id is not None and supplier_id != own_supplier:
+            raise PermissionDenied("You can only act for your own supplier profile.")
+
+    def tenant_filter(self, restaurant_id, supplier_id):
+        q = Q()
+        if restaurant_id and self.tenant_restaurant:
+            q |= Q(**{self.tenant_restaurant: restaurant_id})
+        if supplier_id and self.tenant_supplier:
+            q |= Q(**{self.tenant_supplier: supplier_id})
+        return q
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        restaurant_id, supplier_id = profile_ids(self.request)
+        if self.tenant_owner and getattr(self, "action", None) in WRITE_ACTIONS:
+            restaurant_id, supplier_id = (restaurant_id, None) if self.tenant_owner == "restaurant" else (None, supplier_id)
+        q = self.tenant_filter(restaurant_id, supplier_id)
+        return queryset.filter(q) if q else queryset.none()
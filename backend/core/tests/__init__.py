@@ -0,0 +1,23 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from core import models
+
+User = get_user_model()
+
+# ---------- fixtures shared by the test modules ----------
+def make_restaurant(username="resto", company_name="Resto", email="", **fields):
+    """A restaurant user with its profile; the user is `profile.user`."""
+    user = User.objects.create_user(username=username, password="x", email=email, is_restaurant=True)
+    return models.RestaurantProfile.objects.create(user=user, company_name=company_name, **fields)
+
+def make_supplier(username="sup", company_name="Sup", **fields):
+    """A supplier user with its profile; the user is `profile.user`."""
+    user = User.objects.create_user(username=username, password="x", is_supplier=True)
+    return models.SupplierProfile.objects.create(user=user, company_name=company_name, **fields)
+
+def make_product(supplier, name="P", price="1.00", category="C", **fields):
+    """A product available from today unless `available_from` says otherwise."""
+    fields.setdefault("available_from", date.today())
+    return models.Product.objects.create(name=name, category=category, price_per_unit=Decimal(price),
+                                         supplier=supplier, **fields)
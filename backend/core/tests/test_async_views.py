@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+from django.test import TestCase
+from core import models
+from . import make_product, make_restaurant, make_supplier
+
+class AsyncReadPathTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.resto = make_restaurant()
+        cls.user = cls.resto.user
+        cls.supplier = make_supplier()
+        cls.products = [make_product(cls.supplier, f"P{i}", i + 1, category="Рыба") for i in range(7)]
+        models.ProductMedia.objects.create(product=cls.products[0])
+        order = models.Order.objects.create(restaurant=cls.resto, delivery_date=date.today())
+        models.Offer.objects.create(order=order, supplier=cls.supplier, price=10, delivery_eta=date.today())
+        models.CalendarEvent.objects.bulk_create([
+            models.CalendarEvent(date=date(2026, 1, 1) + timedelta(days=i), restaurant=cls.resto, event_type="order")
+            for i in range(5)])
+
+    async def test_product_pages_match_the_wsgi_endpoint(self):
+        params = {"page_size": 3, "ordering": "price"}
+        sync_body = (await self.async_client.get("/api/products/", params)).json()
+        body = (await self.async_client.get("/api/async/products/", params)).json()
+        self.assertEqual(body["results"], sync_body["results"])
+        seen = [p["name"] for p in body["results"]]
+        while body["next"]:
+            body = (await self.async_client.get(body["next"])).json()
+            seen += [p["name"] for p in body["results"]]
+        self.assertEqual(seen, [f"P{i}" for i in range(7)])
+
+    async def test_detail_count_and_404(self):
+        product = self.products[0]
+        response = await self.async_client.get(f"/api/async/products/{product.id}/")
+        self.assertEqual((response.json()["name"], len(response.json()["media"])), ("P0", 1))
+        # queries run on the sync_to_async thread are still attributed to the request
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+        self.assertEqual((await self.async_client.get("/api/async/products/999999/")).status_code, 404)
+        body = (await self.async_client.get("/api/async/products/", {"count": 1, "category": "Рыба"})).json()
+        self.assertEqual(body["count"], 7)
+
+    async def test_offers_and_calendar_keep_viewset_permissions_and_filters(self):
+        self.assertEqual((await self.async_client.get("/api/async/offers/")).status_code, 403)
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual(len((await self.async_client.get("/api/async/offers/")).json()["results"]), 1)
+        body = (await self.async_client.get("/api/async/calendar/", {"date_after": "2026-01-02",
+                                                                    "date_before": "2026-01-03"})).json()
+        self.assertEqual([e["date"] for e in body["results"]], ["2026-01-02", "2026-01-03"])
+        self.assertEqual((await self.async_client.get("/api/async/calendar/", {"restaurant": 999999})).status_code, 400)
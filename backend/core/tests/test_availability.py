@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+from rest_framework.test import APITestCase
+from core import models
+from . import make_product, make_supplier
+
+class ProductAvailabilityTest(APITestCase):
+    def setUp(self):
+        self.supplier = make_supplier()
+        self.today = date.today()
+        self.open_ended = self.product(self.today - timedelta(days=5), None)
+        self.summer = self.product(self.today + timedelta(days=20), self.today + timedelta(days=50))
+        self.expired = self.product(self.today - timedelta(days=30), self.today - timedelta(days=10))
+
+    def product(self, start, end):
+        return make_product(self.supplier, category="Фрукты", available_from=start, available_to=end)
+
+    def ids(self, **params):
+        return {p["id"] for p in self.client.get("/api/products/", params).json()["results"]}
+
+    def test_available_on(self):
+        self.assertEqual(self.ids(available_on=self.today), {self.open_ended.id})
+        self.assertEqual(self.ids(available_on=self.today + timedelta(days=30)), {self.open_ended.id, self.summer.id})
+
+    def test_available_between_overlaps_window(self):
+        window = f"{self.today - timedelta(days=12)},{self.today + timedelta(days=20)}"
+        self.assertEqual(self.ids(available_between=window), {self.open_ended.id, self.summer.id, self.expired.id})
+        self.assertEqual(self.client.get("/api/products/", {"available_between": str(self.today)}).status_code, 400)
+
+    def test_available_flag_is_annotated(self):
+        self.assertEqual(self.ids(available="true"), {self.open_ended.id})
+        rows = {p["id"]: p["is_available"] for p in self.client.get("/api/products/").json()["results"]}
+        self.assertEqual(rows, {self.open_ended.id: True, self.summer.id: False, self.expired.id: False})
+        for product in models.Product.objects.with_availability():
+            self.assertEqual(product.available_now, product.is_available)
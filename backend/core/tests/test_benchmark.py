@@ -0,0 +1,60 @@
+from django.core.management import call_command, CommandError
+from django.test import TestCase, TransactionTestCase
+from core import benchmark, models, seeding
+
+class ScaleSeedTest(TestCase):
+    def test_seed_is_deterministic_and_complete(self):
+        counts = seeding.seed(1, seed=7, log=lambda *a: None)
+        self.assertEqual(models.Product.objects.filter(supplier__user__username__startswith=seeding.PREFIX).count(),
+                         counts["products"])
+        self.assertEqual(models.Order.objects.count(), counts["orders"])
+        self.assertFalse(models.Order.objects.filter(items__isnull=True).exists())
+        first = list(models.Product.objects.order_by("id").values_list("name", "price_per_unit"))
+        seeding.reset()
+        self.assertFalse(seeding.bench_exists())
+        seeding.seed(1, seed=7, log=lambda *a: None)
+        self.assertEqual(list(models.Product.objects.order_by("id").values_list("name", "price_per_unit")), first)
+
+    def test_command_refuses_to_seed_twice(self):
+        call_command("seed_demo", scale=1, stdout=open("/dev/null", "w"))
+        with self.assertRaises(CommandError):
+            call_command("seed_demo", scale=1, stdout=open("/dev/null", "w"))
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(1, log=lambda *a: None)
+
+    def test_every_route_is_hit_and_succeeds(self):
+        results = benchmark.run(repeat=2, warmup=0, log=lambda *a: None)["endpoints"]
+        from restockhub.urls import router
+        for _, _, basename in router.registry:
+            self.assertIn(f"{basename}-list", results)
+            self.assertIn(f"{basename}-detail", results)
+        self.assertIn("offer-best", results)
+        for name, r in results.items():
+            self.assertEqual(r["status"], 200, name)
+            self.assertGreater(r["queries"], 0, name)
+
+    def test_serializer_benchmark_outputs_match(self):
+        results = benchmark.serializers(repeat=1, limit=50, log=lambda *a: None)
+        self.assertIn("product-list", results)
+        for name, r in results.items():
+            self.assertTrue(r["identical"], name)
+
+    def test_compare_flags_slower_and_chattier_endpoints(self):
+        base = {"endpoints": {"a": {"p50_ms": 10.0, "queries": 2}, "b": {"p50_ms": 10.0, "queries": 2}}}
+        now = {"endpoints": {"a": {"p50_ms": 11.0, "queries": 2}, "b": {"p50_ms": 15.0, "queries": 3}}}
+        self.assertEqual(len(benchmark.compare(base, now, 0.2)), 2)
+        self.assertEqual(benchmark.compare(base, base), [])
+
+class SqliteProfileTest(TransactionTestCase):
+    def test_mixed_load_on_the_production_profile(self):
+        seeding.seed(1, log=lambda *a: None)
+        orders = models.Order.objects.count()
+        result = benchmark.mixed_load(workers=2, seconds=0.3, write_share=0.5)
+        self.assertEqual(result["transaction_mode"], "IMMEDIATE")
+        self.assertEqual((result["pragmas"]["synchronous"], result["pragmas"]["busy_timeout"]), (1, 5000))  # 1 = NORMAL
+        self.assertGreater(result["read"]["ok"], 0)
+        self.assertGreater(result["write"]["ok"], 0)
+        self.assertEqual(models.Order.objects.count() - orders, result["write"]["ok"])
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from core import models
+from . import make_product, make_supplier
+
+class CatalogCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.supplier = make_supplier()
+        self.product = make_product(self.supplier, "Лосось", category="Рыба")
+
+    def test_matching_etag_is_304_without_queries(self):
+        first = self.client.get("/api/products/")
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        with self.assertNumQueries(0):
+            third = self.client.get("/api/products/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(third.status_code, 304)
+
+    def test_response_cache_hit_runs_no_queries(self):
+        self.client.get("/api/products/", {"category": "Рыба"})
+        with self.assertNumQueries(0):
+            body = self.client.get("/api/products/", {"category": "Рыба"}).json()
+        self.assertEqual(len(body["results"]), 1)
+        other = self.client.get("/api/products/", {"category": "Мясо"}).json()
+        self.assertEqual(other["results"], [])
+
+    def test_saves_invalidate(self):
+        first = self.client.get("/api/products/")
+        self.product.name = "Форель"
+        self.product.save()
+        second = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()["results"][0]["name"], "Форель")
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        models.ProductMedia.objects.create(product=self.product)
+        self.assertEqual(len(self.client.get("/api/products/").json()["results"][0]["media"]), 1)
+        self.supplier.delete()
+        self.assertEqual(self.client.get("/api/products/").json()["results"], [])
+
+    def test_file_based_backend(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={"default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp}}):
+            first = self.client.get("/api/products/")
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get("/api/products/").json(), first.json())
+            self.product.save()
+            self.assertNotEqual(self.client.get("/api/products/")["ETag"], first["ETag"])
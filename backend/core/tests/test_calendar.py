@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+from rest_framework.test import APITestCase
+from core import ical, models
+from . import make_restaurant, make_supplier
+
+class CalendarRangeAndFeedTest(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+        self.supplier = make_supplier(company_name="FreshSea; Ltd, Co")
+        self.start = date(2026, 1, 1)
+        models.CalendarEvent.objects.bulk_create([
+            models.CalendarEvent(date=self.start + timedelta(days=i), restaurant=self.resto, supplier=self.supplier,
+                                 event_type="order", status="cancelled" if i == 3 else "scheduled")
+            for i in range(10)
+        ])
+        self.client.force_authenticate(self.user)
+
+    def test_date_range(self):
+        body = self.client.get("/api/calendar/", {"date_after": "2026-01-03", "date_before": "2026-01-05",
+                                                  "supplier": self.supplier.id}).json()
+        self.assertEqual([e["date"] for e in body["results"]], ["2026-01-03", "2026-01-04", "2026-01-05"])
+
+    def test_feed_streams_ics(self):
+        resp = self.client.get("/api/calendar/feed/", {"restaurant": self.resto.id, "date_after": "2026-01-02"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertTrue(resp["Content-Type"].startswith("text/calendar"))
+        body = b"".join(resp.streaming_content).decode()
+        self.assertTrue(body.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertTrue(body.endswith("END:VCALENDAR\r\n"))
+        self.assertEqual(body.count("BEGIN:VEVENT"), 9)
+        self.assertIn("DTSTART;VALUE=DATE:20260102", body)
+        self.assertIn("FreshSea\\; Ltd\\, Co", body)
+        self.assertEqual(body.count("STATUS:CANCELLED"), 1)
+
+    def test_feed_needs_owner(self):
+        self.assertEqual(self.client.get("/api/calendar/feed/").status_code, 400)
+
+    def test_long_lines_are_folded_on_utf8_boundaries(self):
+        line = ical.fold("SUMMARY:" + "Клубника " * 20)
+        for part in line.split("\r\n")[:-1]:
+            self.assertLessEqual(len(part.encode("utf-8")), 75)
+        self.assertEqual(line.replace("\r\n ", "").rstrip("\r\n"), "SUMMARY:" + "Клубника " * 20)
+
+class CalendarScopeAndTokenFeedTest(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+        other = make_restaurant("other", "Other")
+        self.other_u = other.user
+        supplier = make_supplier()
+        self.mine = models.CalendarEvent.objects.create(date=date(2026, 1, 1), restaurant=self.resto, supplier=supplier)
+        models.CalendarEvent.objects.create(date=date(2026, 1, 2), restaurant=other, supplier=supplier)
+
+    def test_events_are_scoped_to_the_caller(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual([e["id"] for e in self.client.get("/api/calendar/").json()["results"]], [self.mine.id])
+        self.client.force_authenticate(self.other_u)
+        self.assertEqual(self.client.get(f"/api/calendar/{self.mine.id}/").status_code, 404)
+        feed = self.client.get("/api/calendar/feed/", {"restaurant": self.resto.id})
+        self.assertNotIn(b"BEGIN:VEVENT", b"".join(feed.streaming_content))
+
+    def test_token_feed_without_login_and_rotation(self):
+        self.client.force_authenticate(self.user)
+        self.assertIsNone(self.client.get("/api/calendar/feed-token/").json()["url"])
+        url = self.client.post("/api/calendar/feed-token/").json()["url"]
+        self.client.force_authenticate(None)
+        feed = self.client.get(url)
+        self.assertEqual(feed.status_code, 200)
+        self.assertEqual(b"".join(feed.streaming_content).count(b"BEGIN:VEVENT"), 1)
+        self.client.force_authenticate(self.user)
+        self.client.post("/api/calendar/feed-token/")
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get("/api/calendar/feed/guess.ics").status_code, 404)
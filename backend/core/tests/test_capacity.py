@@ -0,0 +1,185 @@
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from rest_framework.test import APITestCase
+from core import capacity, models, serializers
+from . import make_product, make_restaurant, make_supplier
+
+class CapacityBase:
+    def make_catalog(self):
+        self.resto, self.supplier = make_restaurant(), make_supplier(company_name="Farm")
+        self.user, self.supplier_u = self.resto.user, self.supplier.user
+        make = lambda name: make_product(self.supplier, name, "2.00", category="Овощи")
+        self.tomato, self.basil = make("Томаты"), make("Базилик")
+        self.day = date.today() + timedelta(days=3)
+
+    def remaining(self, product, day=None):
+        return models.ProductCapacity.objects.get(product=product, delivery_date=day or self.day).remaining
+
+class LedgerTest(CapacityBase, APITestCase):
+    def setUp(self):
+        self.make_catalog()
+        capacity.set_capacity(self.tomato.id, self.day, 10)
+        capacity.set_capacity(self.basil.id, self.day, 3)
+
+    def test_reserve_is_all_or_nothing(self):
+        capacity.reserve([(self.tomato.id, self.day, 4), (self.basil.id, self.day, 2)])
+        self.assertEqual((self.remaining(self.tomato), self.remaining(self.basil)), (Decimal("6"), Decimal("1")))
+        with self.assertRaises(capacity.CapacityExceeded) as e:
+            capacity.reserve([(self.tomato.id, self.day, 1), (self.basil.id, self.day, 2)])
+        self.assertEqual([s["product"] for s in e.exception.shortages], [self.basil.id])
+        self.assertEqual((self.remaining(self.tomato), self.remaining(self.basil)), (Decimal("6"), Decimal("1")))
+
+    def test_one_update_per_reservation_and_unlimited_without_row(self):
+        with self.assertNumQueries(4):  # savepoint, ledger read (which keys are reserved), UPDATE, release
+            capacity.reserve([(self.tomato.id, self.day, 1), (self.tomato.id, self.day, 2)])
+        capacity.reserve([(self.tomato.id, self.day + timedelta(days=1), 500)])
+        self.assertEqual(self.remaining(self.tomato), Decimal("7"))
+
+    def test_resize_keeps_reservations(self):
+        capacity.reserve([(self.tomato.id, self.day, 8)])
+        self.assertEqual(capacity.set_capacity(self.tomato.id, self.day, 12).remaining, Decimal("4"))
+        with self.assertRaises(capacity.CapacityExceeded):
+            capacity.set_capacity(self.tomato.id, self.day, 7)
+
+    def test_batches_fail_independently(self):
+        with self.assertNumQueries(2):  # ledger read + one UPDATE for every accepted set
+            shortages, managed = capacity.reserve_batches([[(self.basil.id, self.day, 2)], [(self.basil.id, self.day, 2)],
+                                                  [(self.tomato.id, self.day, 5), (self.basil.id, self.day, 1)]])
+        self.assertEqual([bool(s) for s in shortages], [False, True, False])
+        self.assertEqual(managed, {(self.tomato.id, self.day), (self.basil.id, self.day)})
+        self.assertEqual((self.remaining(self.tomato), self.remaining(self.basil)), (Decimal("5"), Decimal("0")))
+
+class ReservationApiTest(CapacityBase, APITestCase):
+    def setUp(self):
+        self.make_catalog()
+        capacity.set_capacity(self.tomato.id, self.day, 10)
+        self.client.force_authenticate(self.user)
+
+    def order(self, quantity, **extra):
+        return self.client.post("/api/orders/", {"restaurant": self.resto.id, "delivery_date": self.day,
+                                                 "items": [{"product": self.tomato.id, "quantity": quantity,
+                                                            "unit_price_snapshot": "2.00"}], **extra}, format="json")
+
+    def test_orders_reserve_and_cancel_releases(self):
+        first = self.order("7")
+        self.assertEqual(first.status_code, 201)
+        short = self.order("4")
+        self.assertEqual(short.status_code, 409)
+        self.assertEqual(models.Order.objects.count(), 1)
+        self.assertEqual(self.client.patch(f"/api/orders/{first.json()['id']}/", {"status": "cancelled"}).status_code, 200)
+        self.assertEqual(self.remaining(self.tomato), Decimal("10"))
+        self.assertEqual(self.order("4").status_code, 201)
+        # reopening the cancelled order needs its 7 units back, only 6 are left
+        self.assertEqual(self.client.patch(f"/api/orders/{first.json()['id']}/", {"status": "pending"}).status_code, 409)
+
+    def test_preorder_reserve_move_and_delete(self):
+        payload = {"restaurant": self.resto.id, "supplier": self.supplier.id, "product": self.tomato.id,
+                   "quantity": "6", "delivery_date": self.day}
+        preorder = self.client.post("/api/preorders/", payload, format="json").json()
+        self.assertEqual(self.client.post("/api/preorders/", payload, format="json").status_code, 409)
+        later = self.day + timedelta(days=1)
+        capacity.set_capacity(self.tomato.id, later, 6)
+        self.client.patch(f"/api/preorders/{preorder['id']}/", {"delivery_date": later}, format="json")
+        self.assertEqual((self.remaining(self.tomato), self.remaining(self.tomato, later)), (Decimal("10"), Decimal("0")))
+        self.client.delete(f"/api/preorders/{preorder['id']}/")
+        self.assertEqual(self.remaining(self.tomato, later), Decimal("6"))
+
+    def test_bulk_short_order_fails_alone(self):
+        lines = lambda q: {"restaurant": self.resto.id, "delivery_date": self.day,
+                           "items": [{"product": self.tomato.id, "quantity": q}]}
+        body = self.client.post("/api/orders/bulk/", [lines("6"), lines("6"), lines("4")], format="json").json()
+        self.assertEqual([r["status"] for r in body["results"]], ["created", "error", "created"])
+        self.assertEqual(self.remaining(self.tomato), Decimal("0"))
+
+    def test_only_the_supplier_sets_capacity(self):
+        payload = {"product": self.basil.id, "delivery_date": self.day, "total": "5"}
+        self.assertEqual(self.client.post("/api/capacity/", payload, format="json").status_code, 403)
+        self.client.force_authenticate(self.supplier_u)
+        created = self.client.post("/api/capacity/", payload, format="json")
+        self.assertEqual((created.status_code, created.json()["remaining"]), (201, "5.00"))
+
+class StressTest(CapacityBase, TransactionTestCase):
+    def test_parallel_reservations_never_oversell(self):
+        self.make_catalog()
+        keys = [(self.tomato.id, self.day), (self.basil.id, self.day)]
+        capacity.set_capacity(self.tomato.id, self.day, 50)
+        capacity.set_capacity(self.basil.id, self.day, 40)
+        result = capacity.stress(keys, workers=8, attempts=10, quantity=1)
+        self.assertFalse(result["oversold"], result)
+        self.assertEqual(result["failed"], 0)
+        self.assertEqual(result["accepted"], 40)
+        self.assertEqual(result["rejected"], 80 - 40)
+        self.assertEqual([row["remaining"] for row in result["rows"]], [Decimal("10"), Decimal("0")])
+
+    def test_concurrent_cancels_release_once(self):
+        self.make_catalog()
+        capacity.set_capacity(self.tomato.id, self.day, 10)
+        order = models.Order.objects.create(restaurant=self.resto, delivery_date=self.day)
+        models.OrderItem.objects.create(order=order, product=self.tomato, quantity=Decimal("4"), unit_price_snapshot=Decimal("2"),
+                                        reserved_quantity=Decimal("4"))
+        capacity.reserve([(self.tomato.id, self.day, 4)])
+        # both requests loaded the order while it was still pending
+        stale = [models.Order.objects.get(pk=order.pk) for _ in range(2)]
+        start, errors = threading.Barrier(2), []
+
+        def cancel(instance):
+            start.wait()
+            try:
+                for _ in range(200):
+                    try:
+                        serializer = serializers.OrderSerializer(instance, data={"status": "cancelled"}, partial=True)
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save()
+                        break
+                    except OperationalError:  # the shared in-memory test database reports locks instead of waiting
+                        time.sleep(0.005)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=cancel, args=(instance,)) for instance in stale]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.remaining(self.tomato), Decimal("10"))
+
+class LedgerAfterTheOrderTest(CapacityBase, APITestCase):
+    # lines placed before their ledger row existed took nothing, so they give nothing back
+    def setUp(self):
+        self.make_catalog()
+        self.client.force_authenticate(self.user)
+        payload = {"restaurant": self.resto.id, "delivery_date": self.day,
+                   "items": [{"product": self.tomato.id, "quantity": "5", "unit_price_snapshot": "2.00"}]}
+        self.order_id = self.client.post("/api/orders/", payload, format="json").json()["id"]
+        self.preorder_id = self.client.post("/api/preorders/", {"restaurant": self.resto.id, "supplier": self.supplier.id,
+                                                                 "product": self.tomato.id, "quantity": "2",
+                                                                 "delivery_date": self.day}, format="json").json()["id"]
+        capacity.set_capacity(self.tomato.id, self.day, 3)
+
+    def test_cancel_releases_nothing(self):
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_id}/", {"status": "cancelled"}).status_code, 200)
+        self.assertEqual(self.client.patch(f"/api/preorders/{self.preorder_id}/", {"status": "cancelled"}).status_code, 200)
+        self.assertEqual(self.remaining(self.tomato), Decimal("3"))
+        # reopening is a new reservation against the ledger that now exists
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_id}/", {"status": "pending"}).status_code, 409)
+        self.assertEqual(self.client.patch(f"/api/preorders/{self.preorder_id}/", {"status": "reserved"}).status_code, 200)
+        self.assertEqual(self.remaining(self.tomato), Decimal("1"))
+        self.client.delete(f"/api/preorders/{self.preorder_id}/")
+        self.assertEqual(self.remaining(self.tomato), Decimal("3"))
+
+    def test_delete_releases_nothing(self):
+        self.assertEqual(self.client.delete(f"/api/orders/{self.order_id}/").status_code, 204)
+        self.assertEqual(self.client.delete(f"/api/preorders/{self.preorder_id}/").status_code, 204)
+        self.assertEqual(self.remaining(self.tomato), Decimal("3"))
+
+    def test_unrelated_edit_does_not_start_charging(self):
+        later = self.day + timedelta(days=1)
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_id}/", {"delivery_date": later}, format="json").status_code, 200)
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_id}/", {"delivery_date": self.day}, format="json").status_code, 409)
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_id}/", {"status": "accepted"}, format="json").status_code, 200)
+        self.assertEqual(self.remaining(self.tomato), Decimal("3"))
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from core import models
+from core.views import OrderViewSet
+from . import make_product, make_restaurant, make_supplier
+
+class ExportTest(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+        self.supplier = make_supplier()
+        self.products = [make_product(self.supplier, name, "2.50", category=cat)
+                         for name, cat in (("Лосось", "Рыба"), ("Говядина", "Мясо"))]
+        for n in range(5):
+            order = models.Order.objects.create(restaurant=self.resto, delivery_date=date.today())
+            for product in self.products[:n % 3]:
+                models.OrderItem.objects.create(order=order, product=product, quantity=Decimal("2"),
+                                                unit_price_snapshot=product.price_per_unit)
+        self.client.force_authenticate(self.user)
+
+    def read(self, url, params=None):
+        resp = self.client.get(url, params or {})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return b"".join(resp.streaming_content).decode()
+
+    def test_orders_csv_has_one_row_per_line(self):
+        rows = list(csv.DictReader(io.StringIO(self.read("/api/orders/export/"))))
+        # orders with 0, 1, 2, 0, 1 items -> 2 empty orders + 4 lines
+        self.assertEqual(len(rows), 6)
+        line = next(r for r in rows if r["item_id"])
+        self.assertEqual(Decimal(line["line_total"]), Decimal("5.00"))
+
+    def test_orders_ndjson_nests_items(self):
+        docs = [json.loads(l) for l in self.read("/api/orders/export/", {"export_format": "ndjson"}).splitlines()]
+        self.assertEqual(len(docs), 5)
+        self.assertEqual(sorted(len(d["items"]) for d in docs), [0, 0, 1, 1, 2])
+        self.assertEqual(Decimal(docs[2]["order_total"]), Decimal("10.00"))
+
+    def test_orders_items_are_fetched_per_chunk(self):
+        original = OrderViewSet.export_chunk_size
+        OrderViewSet.export_chunk_size = 2
+        try:
+            # the caller's profile, one streamed orders query, then one items query per chunk of 2 orders
+            with self.assertNumQueries(5):
+                self.read("/api/orders/export/")
+        finally:
+            OrderViewSet.export_chunk_size = original
+
+    def test_filters_apply(self):
+        rows = list(csv.DictReader(io.StringIO(self.read("/api/products/export/", {"category": "Мясо"}))))
+        self.assertEqual([r["name"] for r in rows], ["Говядина"])
+        offer = models.Offer.objects.create(order=models.Order.objects.first(), supplier=self.supplier,
+                                            price=Decimal("9"), delivery_eta=date.today())
+        text = self.read("/api/offers/export/", {"export_format": "ndjson", "supplier": self.supplier.id})
+        self.assertEqual(json.loads(text)["id"], offer.id)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get("/api/offers/export/", {"export_format": "xml"}).status_code, 400)
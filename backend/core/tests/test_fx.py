@@ -0,0 +1,91 @@
+from datetime import date
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from core import fx, models
+from . import make_product, make_restaurant, make_supplier
+
+class FxTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        fx.invalidate()
+        models.FxRate.objects.update_or_create(currency="USD", defaults={"rate_to_eur": Decimal("0.92")})
+        models.FxRate.objects.update_or_create(currency="RUB", defaults={"rate_to_eur": Decimal("0.0105")})
+        self.supplier = make_supplier()
+        make = lambda name, price, currency: make_product(self.supplier, name, price, category="Рыба", currency=currency)
+        self.eur, self.usd, self.rub = make("eur", "10.00", "EUR"), make("usd", "10.00", "USD"), make("rub", "1000.00", "RUB")
+        self.resto = make_restaurant(company_name="R", preferred_currency="RUB")
+        self.user = self.resto.user
+
+    def tearDown(self):
+        fx.invalidate()
+
+    def names(self, params):
+        return [p["name"] for p in self.client.get("/api/products/", params).json()["results"]]
+
+    def test_price_ordering_is_across_currencies(self):
+        # 10 USD = 9.20 EUR < 10 EUR < 1000 RUB = 10.50 EUR
+        self.assertEqual(self.names({"ordering": "price", "currency": "EUR"}), ["usd", "eur", "rub"])
+        self.assertEqual(self.names({"ordering": "-price"}), ["rub", "eur", "usd"])
+        # raw numbers still sort by price_per_unit
+        self.assertEqual(self.names({"ordering": "price_per_unit"})[-1], "rub")
+
+    def test_keyset_pages_follow_converted_price(self):
+        seen, url = [], "/api/products/?ordering=price&page_size=1"
+        while url:
+            body = self.client.get(url).json()
+            seen += [p["name"] for p in body["results"]]
+            url = body["next"]
+        self.assertEqual(seen, ["usd", "eur", "rub"])
+
+    def test_keyset_pages_are_exact_with_long_rates(self):
+        # rates with more decimals than price_eur keeps; the cursor carries the stored value
+        for i in range(12):
+            make_product(self.supplier, f"rub{i}", Decimal("52.75") + i / Decimal(100), category="Рыба", currency="RUB")
+        rub = models.FxRate.objects.get(currency="RUB")
+        rub.rate_to_eur = Decimal("0.010537")
+        rub.save()  # refreshes every price_eur in SQL
+        for ordering in ("price", "-price"):
+            seen, url = [], f"/api/products/?ordering={ordering}&page_size=2&currency=RUB"
+            while url:
+                body = self.client.get(url).json()
+                seen += [p["name"] for p in body["results"]]
+                url = body["next"]
+            self.assertEqual(sorted(seen), sorted(models.Product.objects.values_list("name", flat=True)), ordering)
+            self.assertEqual(len(seen), len(set(seen)))
+
+    def test_ordering_uses_the_price_eur_index(self):
+        plan = models.Product.objects.order_by("price_eur", "id")[:10].explain()
+        self.assertIn("product_price_eur_id_idx", plan)
+
+    def test_prices_render_in_requested_or_preferred_currency(self):
+        rows = {p["name"]: p for p in self.client.get("/api/products/", {"currency": "USD"}).json()["results"]}
+        self.assertEqual((rows["eur"]["price"], rows["eur"]["price_currency"]), ("10.87", "USD"))
+        self.assertEqual(rows["usd"]["price"], "10.00")
+        self.assertEqual(rows["usd"]["price_per_unit"], "10.00")
+        self.client.force_authenticate(self.user)
+        rows = {p["name"]: p for p in self.client.get("/api/products/").json()["results"]}
+        self.assertEqual((rows["rub"]["price"], rows["rub"]["price_currency"]), ("1000.00", "RUB"))
+        self.assertEqual(rows["eur"]["price"], "952.38")
+        self.assertEqual(self.client.get(f"/api/products/{self.usd.id}/").json()["price"], "876.19")
+
+    def test_no_per_row_lookups(self):
+        self.client.force_authenticate(self.user)
+        self.client.get("/api/products/", {"category": "none"})  # warms the rate table and user.restaurant_profile
+        with self.assertNumQueries(2):  # page, media prefetch
+            self.client.get("/api/products/", {"ordering": "price"})
+        models.Product.objects.bulk_create([models.Product(
+            name=f"p{i}", category="Рыба", price_per_unit=1, currency="USD", available_from=date.today(),
+            supplier=self.supplier) for i in range(20)])
+        with self.assertNumQueries(2):
+            self.client.get("/api/products/", {"ordering": "-price"})
+
+    def test_invalid_currency_is_400(self):
+        self.assertEqual(self.client.get("/api/products/", {"currency": "GBP"}).status_code, 400)
+
+    def test_rate_change_reconverts_prices(self):
+        call_command("set_fx_rate", "USD=1.20", stdout=open("/dev/null", "w"))
+        self.usd.refresh_from_db()
+        self.assertEqual(self.usd.price_eur, Decimal("12.0000"))
+        self.assertEqual(self.names({"ordering": "price"}), ["eur", "rub", "usd"])
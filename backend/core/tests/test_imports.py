@@ -0,0 +1,117 @@
+from datetime import date
+from decimal import Decimal
+import csv
+import os
+import tempfile
+from io import BytesIO, StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from core import imports, models, rollups
+from . import make_product, make_restaurant, make_supplier
+
+PRICE_LIST = """name,unit,category,price,currency,available_from
+Лосось свежий,kg,Рыба,19.90,EUR,2026-01-01
+Говядина премиум,kg,Мясо,14.90,EUR,
+Устрицы,pcs,Морепродукты,2.10,EUR,2026-02-01
+,kg,Рыба,1.00,EUR,
+Треска,kg,Рыба,abc,EUR,
+"""
+
+class PriceListImportTest(APITestCase):
+    def setUp(self):
+        self.supplier, self.other = make_supplier(), make_supplier("other", "Other")
+        self.supplier_u = self.supplier.user
+        self.salmon = self.product(self.supplier, "Лосось свежий", "18.50")
+        self.beef = self.product(self.supplier, "Говядина премиум", "14.90")
+        self.foreign = self.product(self.other, "Устрицы", "3.00", unit="pcs")
+        self.resto = make_restaurant("r", "R")
+        order = models.Order.objects.create(restaurant=self.resto, delivery_date=date.today())
+        self.item = models.OrderItem.objects.create(order=order, product=self.salmon, quantity=1,
+                                                    unit_price_snapshot=self.salmon.price_per_unit)
+
+    def product(self, supplier, name, price, unit="kg"):
+        return make_product(supplier, name, price, unit=unit, available_from=date(2025, 1, 1))
+
+    def rows(self, text=PRICE_LIST):
+        return imports.read_csv(text.encode("utf-8").splitlines(keepends=True))
+
+    def test_category_changes_move_the_rollups(self):
+        imports.import_price_list(self.supplier, self.rows())
+        spend = list(models.RestaurantSpend.objects.values_list("category", "lines"))
+        self.assertEqual(spend, [(models.Product.objects.get(pk=self.salmon.pk).category_key, 1)])
+        rollups.rebuild()
+        self.assertEqual(list(models.RestaurantSpend.objects.values_list("category", "lines")), spend)
+
+    def test_diff_report_and_upsert(self):
+        report = imports.import_price_list(self.supplier, self.rows(), batch_size=2)
+        self.assertEqual(report["summary"], {"created": 1, "updated": 2, "unchanged": 0, "errors": 2, "dry_run": False})
+        self.assertEqual([e["line"] for e in report["errors"]], [5, 6])
+        changes = report["updated"][0]["changes"]
+        self.assertEqual(changes["price_per_unit"], [Decimal("18.50"), Decimal("19.90")])
+        self.salmon.refresh_from_db()
+        self.assertEqual(self.salmon.price_per_unit, Decimal("19.90"))
+        self.beef.refresh_from_db()
+        self.assertEqual((self.beef.category, self.beef.available_from), ("Мясо", date(2025, 1, 1)))
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.price_per_unit, Decimal("3.00"))
+        self.assertTrue(models.Product.objects.filter(supplier=self.supplier, name="Устрицы", unit="pcs").exists())
+        # ordered lines keep the price they were ordered at
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.unit_price_snapshot, Decimal("18.50"))
+        again = imports.import_price_list(self.supplier, self.rows())
+        self.assertEqual(again["summary"]["unchanged"], 3)
+
+    def test_query_count_per_batch_is_constant(self):
+        lines = "name,unit,price\n" + "".join(f"P{i},kg,{i}.00\n" for i in range(40))
+        # per batch: match select, bulk write, price history insert, search index refresh (2); plus the savepoint pair
+        with self.assertNumQueries(12):
+            imports.import_price_list(self.supplier, self.rows(lines), batch_size=20)
+        lines = "name,unit,price\n" + "".join(f"P{i},kg,{i}.50\n" for i in range(40))
+        with self.assertNumQueries(12):
+            imports.import_price_list(self.supplier, self.rows(lines), batch_size=20)
+
+    def test_dry_run_writes_nothing(self):
+        report = imports.import_price_list(self.supplier, self.rows(), dry_run=True)
+        self.assertEqual(report["summary"]["created"], 1)
+        self.assertFalse(models.Product.objects.filter(supplier=self.supplier, name="Устрицы").exists())
+
+    def test_upload_endpoint(self):
+        self.client.force_authenticate(self.supplier_u)
+        upload = SimpleUploadedFile("prices.csv", PRICE_LIST.encode("utf-8"), content_type="text/csv")
+        resp = self.client.post("/api/products/import/", {"file": upload}, format="multipart")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["summary"]["created"], 1)
+        self.assertEqual(self.client.get("/api/products/", {"search": "устрицы"}).json()["results"][0]["unit"], "pcs")
+
+    def test_xlsx_upload(self):
+        import openpyxl
+        book = openpyxl.Workbook()
+        for row in csv.reader(StringIO(PRICE_LIST)):
+            book.active.append(row)
+        data = BytesIO()
+        book.save(data)
+        self.client.force_authenticate(self.supplier_u)
+        upload = SimpleUploadedFile("prices.xlsx", data.getvalue())
+        summary = self.client.post("/api/products/import/", {"file": upload}, format="multipart").json()["summary"]
+        self.assertEqual((summary["created"], summary["updated"], summary["errors"]), (1, 2, 2))
+
+    def test_unreadable_files_are_rejected(self):
+        self.client.force_authenticate(self.supplier_u)
+        for name, content in (("prices.csv", PRICE_LIST.encode("cp1251")), ("prices.xlsx", b"not a workbook")):
+            resp = self.client.post("/api/products/import/", {"file": SimpleUploadedFile(name, content)}, format="multipart")
+            self.assertEqual(resp.status_code, 400, name)
+        self.assertFalse(models.Product.objects.filter(name="Устрицы", supplier=self.supplier).exists())
+
+    def test_upload_requires_supplier(self):
+        self.client.force_authenticate(self.resto.user)
+        upload = SimpleUploadedFile("prices.csv", PRICE_LIST.encode("utf-8"))
+        self.assertEqual(self.client.post("/api/products/import/", {"file": upload}).status_code, 403)
+
+    def test_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", delete=False) as f:
+            f.write(PRICE_LIST)
+        self.addCleanup(os.unlink, f.name)
+        out = StringIO()
+        call_command("import_price_list", f.name, supplier=self.supplier.id, stdout=out)
+        self.assertIn("1 created, 2 updated, 0 unchanged, 2 errors", out.getvalue())
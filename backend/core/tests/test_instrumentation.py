@@ -0,0 +1,41 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from core import instrumentation
+from . import make_product, make_supplier
+
+class InstrumentationTest(APITestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        make_product(make_supplier(), "Лосось", 10)
+
+    def test_server_timing_header_counts_queries(self):
+        with self.assertNumQueries(1):  # keyset page, no COUNT
+            response = self.client.get("/api/suppliers/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="1 queries"$')
+
+    @override_settings(DEBUG=True)
+    def test_metrics_exposes_per_view_histograms(self):
+        self.client.get("/api/products/")
+        self.client.get("/api/products/")
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn("# TYPE restockhub_request_duration_seconds histogram", body)
+        self.assertIn('restockhub_request_duration_seconds_count{view="product-list",method="GET"} 2', body)
+        self.assertIn('restockhub_request_duration_seconds_bucket{view="product-list",method="GET",le="+Inf"} 2', body)
+        self.assertIn('restockhub_responses_total{view="product-list",method="GET",status="200"} 2', body)
+        self.assertNotIn('view="metrics"', body)
+
+    @override_settings(REQUEST_SLOW_MS=0)
+    def test_slow_requests_are_logged_with_worst_queries(self):
+        with self.assertLogs("core.instrumentation", "WARNING") as logs:
+            self.client.get("/api/products/")
+        self.assertIn("slow request GET /api/products/ (product-list)", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    @override_settings(METRICS_TOKEN="s3cret", DEBUG=True)
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+
+    def test_metrics_are_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from core import matching, models
+from . import User, make_product, make_restaurant, make_supplier
+
+class SupplierMatchingTest(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+
+        def supplier(name, categories, verified=False, country="", rating=0.0):
+            profile = make_supplier(name, name, categories=categories, verified=verified, country=country)
+            User.objects.filter(pk=profile.user_id).update(rating_avg=rating, rating_count=int(rating))
+            return profile
+        self.both = supplier("both", "Рыба; Овощи ")
+        self.fish_verified = supplier("fish_verified", "рыба", verified=True)
+        self.fish_local = supplier("fish_local", "РЫБА, мясо", country="NO", rating=3.0)
+        self.fish_rated = supplier("fish_rated", "Рыба", rating=4.5)
+        self.meat = supplier("meat", "мясо")
+        products = [make_product(self.meat, name, category=category)
+                    for name, category in [("Лосось", "Рыба"), ("Треска", "  рыба"), ("Морковь", "Овощи")]]
+        self.order = models.Order.objects.create(restaurant=self.resto, delivery_date=date.today() + timedelta(days=1))
+        for product in products:
+            models.OrderItem.objects.create(order=self.order, product=product, quantity=1, unit_price_snapshot=Decimal("1"))
+
+    def test_categories_are_normalized(self):
+        self.assertEqual(matching.parse(" Рыба;овощи,, ёлки  зелёные\nрыба"), ["елки зеленые", "овощи", "рыба"])
+        self.assertEqual(sorted(self.both.category_links.values_list("name", flat=True)), ["овощи", "рыба"])
+        self.assertEqual(models.Product.objects.filter(category_key="рыба").count(), 2)
+
+    def test_saving_the_text_resyncs_rows(self):
+        self.meat.categories = "Мясо, птица"
+        self.meat.save()
+        self.assertEqual(sorted(self.meat.category_links.values_list("name", flat=True)), ["мясо", "птица"])
+
+    def test_ranking_in_one_query(self):
+        with self.assertNumQueries(1):
+            ranked = matching.candidates(self.order, country="NO")
+        self.assertEqual([s.company_name for s in ranked], ["both", "fish_verified", "fish_local", "fish_rated"])
+        self.assertEqual([(s.matched, s.needed, s.rank) for s in ranked[:2]], [(2, 2, 1), (1, 2, 2)])
+        # without a country, rating decides between unverified single-category suppliers
+        self.assertEqual([s.company_name for s in matching.candidates(self.order)][2:], ["fish_rated", "fish_local"])
+
+    def test_suppliers_with_an_offer_are_skipped(self):
+        models.Offer.objects.create(order=self.order, supplier=self.both, price=Decimal("5"), delivery_eta=date.today())
+        self.assertNotIn(self.both.pk, [s.pk for s in matching.candidates(self.order, limit=2)])
+
+    def test_rebuild_matches_signals(self):
+        before = set(models.SupplierCategory.objects.values_list("supplier_id", "name"))
+        models.SupplierCategory.objects.all().delete()
+        models.Product.objects.update(category_key="")
+        matching.rebuild()
+        self.assertEqual(set(models.SupplierCategory.objects.values_list("supplier_id", "name")), before)
+        self.assertEqual(models.Product.objects.filter(category_key="рыба").count(), 2)
+
+    def test_candidates_endpoint(self):
+        self.client.force_authenticate(self.user)
+        body = self.client.get(f"/api/orders/{self.order.pk}/candidates/", {"n": 2}).json()
+        self.assertEqual([(r["company_name"], r["rank"]) for r in body["results"]], [("both", 1), ("fish_verified", 2)])
+        self.assertEqual(self.client.get(f"/api/orders/{self.order.pk}/candidates/", {"n": 0}).status_code, 400)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+from core import media, models
+from . import make_product, make_supplier
+
+def photo(width=2000, height=1000):
+    out = BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(out, "JPEG")
+    return SimpleUploadedFile("phone.jpg", out.getvalue(), content_type="image/jpeg")
+
+class MediaTestMixin:
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_PROCESSING="inline")
+        self.settings_override.enable()
+        self.product = make_product(make_supplier(), "Лосось", 10, category="Рыба")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+class MediaPipelineTest(MediaTestMixin, APITestCase):
+    def test_upload_produces_sized_webp_and_jpeg(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = models.ProductMedia.objects.create(product=self.product, image=photo())
+        item.refresh_from_db()
+        self.assertEqual(item.processing_status, "ready")
+        self.assertEqual((item.variants["thumb"]["width"], item.variants["thumb"]["height"]), (160, 80))
+        self.assertEqual(item.variants["large"]["width"], 1280)
+        with default_storage.open(item.variants["small"]["webp"]) as f, Image.open(f) as img:
+            self.assertEqual((img.format, img.width), ("WEBP", 480))
+
+        urls = self.client.get(f"/api/products/{self.product.id}/").json()["media"][0]["urls"]
+        self.assertTrue(urls["original"].startswith("http://testserver/media/products/images/"))
+        self.assertTrue(urls["thumb"]["webp"].endswith(f"/media/products/derived/{item.id}/thumb.webp"))
+        self.assertEqual(self.client.get(urls["thumb"]["jpeg"]).status_code, 200)
+
+    def test_small_originals_are_not_upscaled_and_bad_files_fail(self):
+        with self.assertLogs("core.media", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            small = models.ProductMedia.objects.create(product=self.product, image=photo(100, 50))
+            broken = models.ProductMedia.objects.create(
+                product=self.product, image=SimpleUploadedFile("x.jpg", b"not an image", content_type="image/jpeg"))
+        small.refresh_from_db(); broken.refresh_from_db()
+        self.assertEqual(small.variants["large"]["width"], 100)
+        self.assertEqual((broken.processing_status, broken.variants), ("failed", {}))
+
+    def test_saving_without_a_new_image_does_not_reprocess(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            item = models.ProductMedia.objects.create(product=self.product, image=photo())
+        item = models.ProductMedia.objects.get(pk=item.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            item.save()
+        self.assertFalse([c for c in callbacks if c.__qualname__.startswith("schedule.")])
+
+class MediaRangeTest(MediaTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.media_root, "products/videos"))
+        self.data = bytes(range(256)) * 4
+        with open(os.path.join(self.media_root, "products/videos/clip.mp4"), "wb") as f:
+            f.write(self.data)
+        self.url = "/media/products/videos/clip.mp4"
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_and_partial_content(self):
+        full = self.client.get(self.url)
+        self.assertEqual((full.status_code, full["Accept-Ranges"], full["Content-Type"]), (200, "bytes", "video/mp4"))
+        self.assertEqual(self.body(full), self.data)
+        part = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual((part.status_code, part["Content-Range"], part["Content-Length"]), (206, "bytes 100-199/1024", "100"))
+        self.assertEqual(self.body(part), self.data[100:200])
+        self.assertEqual(self.body(self.client.get(self.url, HTTP_RANGE="bytes=1000-")), self.data[1000:])
+        self.assertEqual(self.body(self.client.get(self.url, HTTP_RANGE="bytes=-24")), self.data[-24:])
+
+    def test_unsatisfiable_and_outside_media_root(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */1024"))
+        self.assertIn(self.client.get("/media/../manage.py").status_code, (400, 404))
+        self.assertEqual(self.client.get("/media/products/videos/missing.mp4").status_code, 404)
+
+    def test_only_catalog_media_is_public(self):
+        for folder, name in (("certificates", "cert.pdf"), ("reviews", "r.jpg"), ("products/images", "page.html")):
+            os.makedirs(os.path.join(self.media_root, folder), exist_ok=True)
+            with open(os.path.join(self.media_root, folder, name), "wb") as f:
+                f.write(b"<script>alert(1)</script>")
+        self.assertEqual(self.client.get("/media/certificates/cert.pdf").status_code, 404)
+        self.assertEqual(self.client.get("/media/reviews/r.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media/products/../certificates/cert.pdf").status_code, 404)
+        page = self.client.get("/media/products/images/page.html")
+        self.assertTrue(page["Content-Disposition"].startswith("attachment"))
+        self.assertFalse(self.client.get(self.url).get("Content-Disposition", "").startswith("attachment"))
+        with override_settings(MEDIA_SERVE=False):
+            self.assertEqual(self.client.get(self.url).status_code, 404)
+
+class MediaThreadPoolTest(MediaTestMixin, TransactionTestCase):
+    def test_worker_thread_processes_committed_upload(self):
+        with override_settings(MEDIA_PROCESSING="thread"):
+            item = models.ProductMedia.objects.create(product=self.product, image=photo())
+        media.executor().submit(lambda: None).result()  # pool is FIFO per worker; wait for the queue to drain
+        media.executor().shutdown(wait=True)
+        media._executor = None
+        item.refresh_from_db()
+        self.assertEqual(item.processing_status, "ready")
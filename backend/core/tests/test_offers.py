@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.db import connection
+from rest_framework.test import APITestCase
+from core import models, offers
+from . import make_restaurant, make_supplier
+
+class BestOfferTest(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+        self.supplier = make_supplier()
+        self.orders = [models.Order.objects.create(restaurant=self.resto, delivery_date=date.today()) for _ in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def offer(self, order, price, eta_days=1):
+        return models.Offer.objects.create(order=order, supplier=self.supplier, price=Decimal(price),
+                                           delivery_eta=date.today() + timedelta(days=eta_days))
+
+    def test_best_n_per_order_in_one_query(self):
+        a, b, c = self.orders
+        self.offer(a, "30"); a2 = self.offer(a, "10", 3); a1 = self.offer(a, "10", 1)
+        b1 = self.offer(b, "5")
+        ids = ",".join(str(o.id) for o in self.orders)
+        with self.assertNumQueries(2):  # caller's profile, then all offers at once
+            body = self.client.get("/api/offers/best/", {"orders": ids, "n": 2}).json()
+        got = {row["order"]: [(o["id"], o["rank"]) for o in row["offers"]] for row in body["results"]}
+        self.assertEqual(got, {a.id: [(a1.id, 1), (a2.id, 2)], b.id: [(b1.id, 1)], c.id: []})
+
+    def test_subquery_fallback_matches_window(self):
+        a, b, _ = self.orders
+        for price in ("7", "3", "9", "3"): self.offer(a, price)
+        self.offer(b, "1")
+        expected = {k: [o.id for o in v] for k, v in offers.best_offers([a.id, b.id], 2).items()}
+        with mock.patch.object(connection.features, "supports_over_clause", False):
+            fallback = offers.best_offers([a.id, b.id], 2)
+        self.assertEqual({k: [o.id for o in v] for k, v in fallback.items()}, expected)
+        self.assertEqual([o.rank for o in fallback[a.id]], [1, 2])
+
+    def test_best_offer_is_kept_current(self):
+        order = self.orders[0]
+        high = self.offer(order, "20")
+        order.refresh_from_db(); self.assertEqual(order.best_offer_id, high.id)
+        low = self.offer(order, "12")
+        order.refresh_from_db(); self.assertEqual(order.best_offer_id, low.id)
+        low.delete()
+        order.refresh_from_db(); self.assertEqual(order.best_offer_id, high.id)
+        high.price = Decimal("25"); high.save()
+        self.offer(order, "24")
+        order.refresh_from_db(); self.assertNotEqual(order.best_offer_id, high.id)
+        order.delete()
+        self.assertFalse(models.Offer.objects.filter(order_id=order.id).exists())
+
+    def test_moving_an_offer_refreshes_both_orders(self):
+        a, b, _ = self.orders
+        offer = self.offer(a, "10")
+        offer.order = b
+        offer.save()
+        a.refresh_from_db(); b.refresh_from_db()
+        self.assertEqual((a.best_offer_id, b.best_offer_id), (None, offer.id))
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get("/api/offers/best/").status_code, 400)
+        self.assertEqual(self.client.get("/api/offers/best/", {"orders": "x"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/offers/best/", {"orders": "1", "n": 50}).status_code, 400)
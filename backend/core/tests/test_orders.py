@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from core import models
+from . import make_product, make_restaurant, make_supplier
+
+class OrderTestBase(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+        self.supplier = make_supplier()
+        self.product = make_product(self.supplier, "Лосось", "10.00", category="Рыба")
+        self.client.force_authenticate(self.user)
+
+    def make_order(self, lines):
+        order = models.Order.objects.create(restaurant=self.resto, delivery_date=date.today() + timedelta(days=1))
+        for qty, price in lines:
+            models.OrderItem.objects.create(order=order, product=self.product,
+                quantity=Decimal(qty), unit_price_snapshot=Decimal(price))
+        return order
+
+class OrderListTest(OrderTestBase):
+    def test_totals_are_aggregated(self):
+        order = self.make_order([("2", "10.00"), ("1.5", "4.20")])
+        empty = self.make_order([])
+        data = {o["id"]: o for o in self.client.get("/api/orders/").json()["results"]}
+        self.assertEqual(Decimal(data[order.id]["total"]), Decimal("26.30"))
+        self.assertEqual(data[order.id]["line_count"], 2)
+        self.assertEqual(Decimal(data[order.id]["total_quantity"]), Decimal("3.50"))
+        self.assertEqual(Decimal(data[empty.id]["total"]), Decimal("0"))
+        self.assertEqual(data[empty.id]["line_count"], 0)
+
+    def test_list_query_count_is_constant(self):
+        for _ in range(3): self.make_order([("1", "10.00")] * 5)
+        with self.assertNumQueries(3):  # caller's profile, orders page, items
+            self.assertEqual(len(self.client.get("/api/orders/").json()["results"]), 3)
+        for _ in range(10): self.make_order([("1", "10.00")] * 5)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(self.client.get("/api/orders/").json()["results"]), 13)
+
+    def test_create_returns_totals(self):
+        resp = self.client.post("/api/orders/", {
+            "restaurant": self.resto.id, "delivery_date": str(date.today()),
+            "items": [{"product": self.product.id, "quantity": "3", "unit_price_snapshot": "10.00"}],
+        }, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Decimal(resp.json()["total"]), Decimal("30.00"))
+
+class OrderBulkTest(OrderTestBase):
+    def payload(self, **overrides):
+        data = {"restaurant": self.resto.id, "delivery_date": str(date.today() + timedelta(days=2)),
+                "items": [{"product": self.product.id, "quantity": "4"}]}
+        data.update(overrides)
+        return data
+
+    def test_bulk_creates_orders_items_and_events(self):
+        resp = self.client.post("/api/orders/bulk/", {"orders": [self.payload() for _ in range(5)]}, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()["created"], 5)
+        self.assertEqual(models.Order.objects.count(), 5)
+        item = models.OrderItem.objects.first()
+        self.assertEqual(item.unit_price_snapshot, Decimal("10.00"))
+        self.assertEqual(models.CalendarEvent.objects.filter(supplier=self.supplier, event_type="order").count(), 5)
+
+    def test_bulk_query_count_does_not_grow(self):
+        # validation (2) + savepoint/transaction + capacity ledger read + three bulk inserts
+        # + an insert and an update per analytics rollup
+        with self.assertNumQueries(12):
+            self.client.post("/api/orders/bulk/", [self.payload() for _ in range(3)], format="json")
+        with self.assertNumQueries(12):
+            self.client.post("/api/orders/bulk/", [self.payload() for _ in range(30)], format="json")
+
+    def test_bulk_reports_per_order_errors(self):
+        resp = self.client.post("/api/orders/bulk/", [
+            self.payload(),
+            self.payload(items=[{"product": 999999, "quantity": "1"}]),
+            self.payload(restaurant=999999),
+            self.payload(delivery_date="not-a-date"),
+        ], format="json")
+        self.assertEqual(resp.status_code, 207)
+        statuses = [r["status"] for r in resp.json()["results"]]
+        self.assertEqual(statuses, ["created", "error", "error", "error"])
+        self.assertIn("items", resp.json()["results"][1]["errors"])
+        self.assertEqual(models.Order.objects.count(), 1)
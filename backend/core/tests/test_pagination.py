@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from core import models
+from . import make_restaurant, make_supplier
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.resto = make_restaurant()
+        self.user = self.resto.user
+        self.supplier = make_supplier()
+        models.Product.objects.bulk_create([
+            models.Product(name=f"P{i}", category="Рыба", price_per_unit=Decimal(i % 4), available_from=date.today(),
+                           supplier=self.supplier)
+            for i in range(23)
+        ])
+        # many events on the same date: ties must be broken by id, not an offset
+        models.CalendarEvent.objects.bulk_create([
+            models.CalendarEvent(date=date.today() + timedelta(days=i % 2), restaurant=self.resto, event_type="order")
+            for i in range(17)
+        ])
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, key="id"):
+        seen, pages = [], 0
+        while url:
+            body = self.client.get(url).json()
+            seen += [row[key] for row in body["results"]]
+            url, pages = body["next"], pages + 1
+        return seen, pages
+
+    def test_products_cover_every_row_once(self):
+        ids, pages = self.walk("/api/products/?page_size=5")
+        self.assertEqual(pages, 5)
+        self.assertEqual(ids, list(models.Product.objects.order_by("-created_at", "-id").values_list("id", flat=True)))
+
+    def test_ordering_filter_keeps_keyset_tie_breaker(self):
+        ids, _ = self.walk("/api/products/?page_size=4&ordering=price_per_unit")
+        self.assertEqual(ids, list(models.Product.objects.order_by("price_per_unit", "id").values_list("id", flat=True)))
+
+    def test_calendar_pages_by_date_then_id(self):
+        ids, _ = self.walk("/api/calendar/?page_size=3")
+        self.assertEqual(ids, list(models.CalendarEvent.objects.order_by("date", "id").values_list("id", flat=True)))
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get("/api/products/?page_size=5").json()
+        second = self.client.get(first["next"]).json()
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual([p["id"] for p in back["results"]], [p["id"] for p in first["results"]])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get("/api/products/?cursor=bm9wZQ").status_code, 404)
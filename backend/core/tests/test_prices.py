@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from core import imports, models, prices
+from . import make_product, make_supplier
+
+def at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+
+class PriceHistoryTest(APITestCase):
+    def setUp(self):
+        self.supplier = make_supplier(company_name="Farm")
+        self.supplier_u = self.supplier.user
+        self.products = [make_product(self.supplier, f"P{i}", "10.00", available_from=date(2025, 1, 1)) for i in range(3)]
+        # rewrite the opening rows to known dates, then add later changes
+        models.ProductPrice.objects.update(effective_from=at(date(2025, 1, 1)))
+        self.first = self.products[0]
+        for day, price in ((date(2025, 3, 1), "12.00"), (date(2025, 6, 1), "11.00")):
+            models.ProductPrice.objects.create(product=self.first, price_per_unit=Decimal(price), effective_from=at(day))
+
+    def history(self, product):
+        return list(product.price_history.order_by("effective_from", "id").values_list("price_per_unit", flat=True))
+
+    def test_only_real_changes_are_stored(self):
+        product = self.products[1]
+        product.name = "Renamed"
+        product.save()
+        product.price_per_unit = Decimal("10.00")
+        product.save()
+        self.assertEqual(self.history(product), [Decimal("10.00")])
+        product.price_per_unit = Decimal("9.50")
+        product.save()
+        models.Product.objects.only("id", "name").get(pk=product.pk).save()  # price not loaded, not written
+        rebuilt = models.Product(pk=product.pk, name=product.name, category="C", price_per_unit=Decimal("9.50"),
+                                 currency="EUR", available_from=date(2025, 1, 1), supplier=self.supplier,
+                                 created_at=product.created_at)
+        rebuilt.save()  # no snapshot: compared with the stored history
+        self.assertEqual(self.history(product), [Decimal("10.00"), Decimal("9.50")])
+
+    def test_bulk_point_in_time_lookup(self):
+        ids = [p.id for p in self.products]
+        with self.assertNumQueries(1):
+            found = prices.prices_at(ids, date(2025, 3, 1))
+        self.assertEqual({pk: row.price_per_unit for pk, row in found.items()},
+                         {ids[0]: Decimal("12.00"), ids[1]: Decimal("10.00"), ids[2]: Decimal("10.00")})
+        self.assertEqual(prices.prices_at(ids, at(date(2025, 3, 1), hour=6))[ids[0]].price_per_unit, Decimal("10.00"))
+        self.assertEqual(prices.prices_at(ids, date(2024, 12, 31)), {})
+        self.assertEqual(prices.prices_at([ids[0]], date.today())[ids[0]].price_per_unit, Decimal("11.00"))
+
+    def test_import_records_changes_in_bulk(self):
+        lines = "name,unit,price\n" + "".join(f"P{i},kg,{price}\n" for i, price in enumerate(["10.00", "8.00", "10.00"]))
+        lines += "New,kg,3.00\n"
+        imports.import_price_list(self.supplier, imports.read_csv(lines.encode("utf-8").splitlines(keepends=True)))
+        self.assertEqual(self.history(self.products[1]), [Decimal("10.00"), Decimal("8.00")])
+        self.assertEqual(self.history(self.products[2]), [Decimal("10.00")])
+        self.assertEqual(self.history(models.Product.objects.get(name="New")), [Decimal("3.00")])
+
+    def test_history_and_prices_endpoints(self):
+        body = self.client.get(f"/api/products/{self.first.id}/history/",
+                               {"since": "2025-02-01", "until": "2025-06-30", "points": 5}).json()
+        self.assertEqual([c["price_per_unit"] for c in body["changes"]], ["10.00", "12.00", "11.00"])
+        self.assertEqual([p["price_per_unit"] for p in body["sparkline"]], ["10.00", "12.00", "12.00", "12.00", "11.00"])
+        self.assertEqual(self.client.get(f"/api/products/{self.first.id}/history/", {"points": 0}).status_code, 400)
+        ids = ",".join(str(p.id) for p in self.products)
+        rows = self.client.get("/api/products/prices/", {"products": ids, "at": "2025-04-15"}).json()["results"]
+        self.assertEqual([(r["product"], r["price_per_unit"]) for r in rows],
+                         [(self.products[0].id, "12.00"), (self.products[1].id, "10.00"), (self.products[2].id, "10.00")])
+        self.assertEqual(self.client.get("/api/products/prices/", {"products": "x"}).status_code, 400)
@@ -0,0 +1,48 @@
+from io import StringIO
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from core import models
+from . import User, make_product, make_supplier
+
+class RatingCountersTest(APITestCase):
+    def setUp(self):
+        self.resto_u = User.objects.create_user(username="resto", password="x", is_restaurant=True)
+        self.prof_a, self.prof_b = make_supplier("a", "A"), make_supplier("b", "B")
+        self.sup_a, self.sup_b = self.prof_a.user, self.prof_b.user
+
+    def counters(self, user):
+        user.refresh_from_db()
+        return user.rating_count, user.rating_sum, user.rating_avg
+
+    def test_create_edit_move_delete(self):
+        r1 = models.Review.objects.create(reviewer=self.resto_u, target=self.sup_a, rating=5)
+        models.Review.objects.create(reviewer=self.resto_u, target=self.sup_a, rating=2)
+        self.assertEqual(self.counters(self.sup_a), (2, 7, 3.5))
+        r1.rating = 3; r1.save()
+        self.assertEqual(self.counters(self.sup_a), (2, 5, 2.5))
+        reloaded = models.Review.objects.get(pk=r1.pk)
+        reloaded.target = self.sup_b; reloaded.save()
+        self.assertEqual(self.counters(self.sup_a), (1, 2, 2.0))
+        self.assertEqual(self.counters(self.sup_b), (1, 3, 3.0))
+        models.Review.objects.get(pk=r1.pk).delete()
+        self.assertEqual(self.counters(self.sup_b), (0, 0, 0.0))
+
+    def test_rebuild_command(self):
+        models.Review.objects.bulk_create([models.Review(reviewer=self.resto_u, target=self.sup_b, rating=r)
+                                           for r in (4, 5, 3)])
+        self.assertEqual(self.counters(self.sup_b), (0, 0, 0.0))
+        call_command("rebuild_ratings", stdout=StringIO())
+        self.assertEqual(self.counters(self.sup_b), (3, 12, 4.0))
+
+    def test_ordering_by_rating(self):
+        models.Review.objects.create(reviewer=self.resto_u, target=self.sup_a, rating=2)
+        models.Review.objects.create(reviewer=self.resto_u, target=self.sup_b, rating=5)
+        names = [s["company_name"] for s in self.client.get("/api/suppliers/").json()["results"]]
+        self.assertEqual(names, ["B", "A"])
+        for prof in (self.prof_a, self.prof_b):
+            make_product(prof, prof.company_name)
+        rows = self.client.get("/api/products/", {"ordering": "-rating"}).json()["results"]
+        self.assertEqual([p["name"] for p in rows], ["B", "A"])
+        rows = self.client.get("/api/products/", {"ordering": "rating", "page_size": 1}).json()
+        self.assertEqual(rows["results"][0]["name"], "A")
+        self.assertEqual(self.client.get(rows["next"]).json()["results"][0]["name"], "B")
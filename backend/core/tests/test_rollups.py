@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from core import models, rollups
+from . import make_product, make_restaurant, make_supplier
+
+def snapshot():
+    spend = sorted((r.restaurant_id, r.month, r.category, r.amount, r.delivered_amount, r.quantity, r.lines)
+                   for r in models.RestaurantSpend.objects.all())
+    sales = sorted((r.supplier_id, r.week, r.product_id, r.amount, r.delivered_amount, r.quantity, r.lines)
+                   for r in models.SupplierSales.objects.all())
+    return spend, sales
+
+class RollupBase:
+    def make_catalog(self):
+        self.resto, self.supplier = make_restaurant(), make_supplier(company_name="Farm")
+        self.user, self.supplier_u = self.resto.user, self.supplier.user
+        make = lambda name, category: make_product(self.supplier, name, "2.00", category=category)
+        self.tomato, self.milk = make("Томаты", "Овощи"), make("Молоко", "Молочка")
+        self.day = date.today() + timedelta(days=3)
+
+    def order(self, *lines, day=None):
+        payload = {"restaurant": self.resto.id, "delivery_date": day or self.day,
+                   "items": [{"product": p.id, "quantity": q, "unit_price_snapshot": price} for p, q, price in lines]}
+        response = self.client.post("/api/orders/", payload, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["id"]
+
+    def assertMatchesRebuild(self):
+        incremental = snapshot()
+        rollups.rebuild(chunk_size=1)
+        self.assertEqual(snapshot(), incremental)
+        return incremental
+
+class IncrementalTest(RollupBase, APITestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.client.force_authenticate(self.user)
+
+    def test_order_lifecycle_matches_rebuild(self):
+        first = self.order((self.tomato, "3", "2.00"), (self.milk, "1", "1.50"))
+        self.order((self.tomato, "2", "2.50"), day=self.day + timedelta(days=40))
+        spend, sales = self.assertMatchesRebuild()
+        vegetables = next(r for r in spend if r[1] == rollups.month_of(self.day) and r[2] == self.tomato.category_key)
+        self.assertEqual(vegetables[3:], (Decimal("6.0000"), Decimal("0.0000"), Decimal("3.00"), 1))
+
+        item = models.OrderItem.objects.get(order_id=first, product=self.milk)
+        item.quantity = Decimal("4")
+        item.save()
+        models.OrderItem.objects.create(order_id=first, product=self.tomato, quantity=Decimal("1"),
+                                        unit_price_snapshot=Decimal("2.00"))
+        self.assertMatchesRebuild()
+
+        self.client.patch(f"/api/orders/{first}/", {"status": "delivered"}, format="json")
+        spend, _ = self.assertMatchesRebuild()
+        self.assertEqual(sum(r[4] for r in spend), Decimal("14.0000"))  # 3*2 + 4*1.50 + 1*2
+
+        self.client.patch(f"/api/orders/{first}/", {"status": "cancelled"}, format="json")
+        spend, _ = self.assertMatchesRebuild()
+        self.assertEqual(len(spend), 1)  # only the later order is left
+
+        models.OrderItem.objects.filter(order__delivery_date__gt=self.day).delete()
+        self.assertEqual(self.assertMatchesRebuild(), ([], []))
+
+    def test_moving_and_deleting_an_order(self):
+        order_id = self.order((self.tomato, "3", "2.00"))
+        self.client.patch(f"/api/orders/{order_id}/", {"delivery_date": self.day + timedelta(days=60)}, format="json")
+        spend, _ = self.assertMatchesRebuild()
+        self.assertEqual([r[1] for r in spend], [rollups.month_of(self.day + timedelta(days=60))])
+        models.Order.objects.get(pk=order_id).delete()
+        self.assertEqual(snapshot(), ([], []))
+
+    def test_bulk_orders_update_the_rollups_once(self):
+        lines = lambda q: {"restaurant": self.resto.id, "delivery_date": self.day,
+                           "items": [{"product": self.tomato.id, "quantity": q}, {"product": self.milk.id, "quantity": q}]}
+        self.client.post("/api/orders/bulk/", [lines("1"), lines("2")], format="json")
+        spend, sales = self.assertMatchesRebuild()
+        self.assertEqual([r[-1] for r in sales], [2, 2])
+        self.assertEqual(sum(r[3] for r in spend), Decimal("12.0000"))
+
+class AnalyticsApiTest(RollupBase, APITestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.client.force_authenticate(self.user)
+        self.order((self.tomato, "3", "2.00"), (self.milk, "1", "1.50"))
+        other = make_restaurant("other", "Other")
+        models.OrderItem.objects.create(order=models.Order.objects.create(restaurant=other, delivery_date=self.day),
+                                        product=self.tomato, quantity=Decimal("9"), unit_price_snapshot=Decimal("2.00"))
+
+    def test_spend_is_scoped_and_reads_only_the_rollup(self):
+        with self.assertNumQueries(2):  # caller's profiles, one page of RestaurantSpend
+            body = self.client.get("/api/analytics/spend/", {"month_after": rollups.month_of(self.day)}).json()
+        self.assertEqual(sorted(r["category"] for r in body["results"]), sorted([self.tomato.category_key, self.milk.category_key]))
+        self.assertTrue(all(r["restaurant"] == self.resto.id for r in body["results"]))
+
+    def test_sales_are_for_the_supplier_only(self):
+        self.assertEqual(self.client.get("/api/analytics/sales/").json()["results"], [])
+        self.client.force_authenticate(self.supplier_u)
+        rows = self.client.get("/api/analytics/sales/", {"product": self.tomato.id}).json()["results"]
+        self.assertEqual([(r["quantity"], r["lines"]) for r in rows], [("12.00", 2)])
+
+class ConcurrencyAndCatalogTest(RollupBase, APITestCase):
+    def setUp(self):
+        self.make_catalog()
+        self.client.force_authenticate(self.user)
+
+    def test_stale_instances_do_not_apply_a_transition_twice(self):
+        order_id = self.order((self.tomato, "3", "2.00"))
+        self.order((self.tomato, "1", "2.00"))  # shares every rollup row with the first order
+        first, second = models.Order.objects.get(pk=order_id), models.Order.objects.get(pk=order_id)
+        first.status = second.status = "delivered"
+        first.save()
+        second.save()  # loaded while still pending; the stored row says it is already delivered
+        spend, _ = self.assertMatchesRebuild()
+        self.assertEqual(spend[0][4], Decimal("6.0000"))
+        first.delete()
+        second.delete()  # already gone
+        spend, _ = self.assertMatchesRebuild()
+        self.assertEqual(spend[0][3:], (Decimal("2.0000"), Decimal("0.0000"), Decimal("1.00"), 1))
+
+    def test_category_and_supplier_edits_move_past_lines(self):
+        self.order((self.tomato, "3", "2.00"), (self.milk, "1", "1.50"))
+        self.tomato.category = "Фрукты"
+        self.tomato.save()
+        spend, _ = self.assertMatchesRebuild()
+        self.assertEqual(sorted(r[2] for r in spend), sorted([self.tomato.category_key, self.milk.category_key]))
+        other = make_supplier("sup2", "Orchard")
+        self.client.force_authenticate(self.supplier_u)
+        response = self.client.patch(f"/api/products/{self.milk.id}/", {"supplier": other.id}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        _, sales = self.assertMatchesRebuild()
+        self.assertEqual(sorted(r[0] for r in sales), [self.supplier.id, other.id])
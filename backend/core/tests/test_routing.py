@@ -0,0 +1,82 @@
+import os
+import tempfile
+from datetime import date
+from django.core.cache import cache
+from django.db import connections
+from django.test import override_settings
+from rest_framework.test import APITransactionTestCase
+from core import caching, models, routing
+from . import make_product, make_supplier
+
+@override_settings(DATABASE_REPLICAS=["replica"], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTest(APITransactionTestCase):
+    """Two SQLite databases: the test database is the primary, a temporary file the replica."""
+    databases = "__all__"  # resolved in setUpClass, once the replica alias exists
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        replica = {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(cls.tmp.name, "replica.sqlite3")}
+        connections.settings["replica"] = connections.configure_settings({"default": {}, "replica": replica})["replica"]
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        routing._down_until.clear()
+        self.supplier = make_supplier(company_name="Farm")
+        self.user = self.supplier.user
+        routing.copy_sqlite("default", "replica")
+        # a change the replica has not caught up with yet
+        models.SupplierProfile.objects.filter(pk=self.supplier.pk).update(company_name="Farm (renamed)")
+        self.client.force_authenticate(self.user)
+
+    def names(self):
+        return [s["company_name"] for s in self.client.get("/api/suppliers/").json()["results"]]
+
+    def test_safe_requests_read_the_replica(self):
+        self.assertEqual(self.names(), ["Farm"])
+        self.assertEqual(models.SupplierProfile.objects.get().company_name, "Farm (renamed)")  # outside a request
+
+    def test_writer_sticks_to_the_primary(self):
+        created = self.client.post("/api/products/", {"name": "Лосось", "category": "Рыба", "price_per_unit": "10",
+                                                      "available_from": date.today(), "supplier": self.supplier.pk}, format="json")
+        self.assertEqual(created.status_code, 201)
+        self.assertIn(routing.STICKY_COOKIE, created.cookies)
+        self.assertFalse(models.Product.objects.using("replica").exists())
+        self.assertEqual(self.names(), ["Farm (renamed)"])
+        # the cache key keeps the user on the primary from another client without the cookie
+        self.client.cookies.clear()
+        self.assertEqual(self.names(), ["Farm (renamed)"])
+        cache.clear()
+        self.assertEqual(self.names(), ["Farm"])
+
+    def test_catalog_cache_is_filled_from_the_primary(self):
+        product = make_product(self.supplier, "Лосось", 10, category="Рыба")
+        routing.copy_sqlite("default", "replica")
+        models.Product.objects.filter(pk=product.pk).update(name="Лосось (новый)")
+        caching.bump_catalog_version()
+        self.client.force_authenticate(None)
+        names = lambda: [p["name"] for p in self.client.get("/api/products/").json()["results"]]
+        self.assertEqual(names(), ["Лосось (новый)"])
+        self.assertEqual(names(), ["Лосось (новый)"])  # served from the cache
+
+    def test_missing_replica_falls_back_to_the_primary(self):
+        connections["replica"].close()
+        os.remove(connections.settings["replica"]["NAME"])
+        with self.assertLogs("core.routing", "WARNING"):
+            self.assertEqual(self.names(), ["Farm (renamed)"])
+        self.assertFalse(os.path.exists(connections.settings["replica"]["NAME"]))
+        with self.assertNoLogs("core.routing", "WARNING"):  # not retried until REPLICA_RETRY_SECONDS pass
+            self.names()
+
+    def test_replicas_are_not_migrated(self):
+        router = routing.ReplicaRouter()
+        self.assertEqual((router.allow_migrate("default", "core"), router.allow_migrate("replica", "core")), (True, False))
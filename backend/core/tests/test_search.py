@@ -0,0 +1,61 @@
+from datetime import date
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from core import models, search
+from . import make_product, make_supplier
+
+class ProductSearchTest(APITestCase):
+    def setUp(self):
+        self.supplier = make_supplier(company_name="FreshSea Ltd")
+        self.salmon = self.product("Лосось свежий", "Рыба")
+        self.trout = self.product("Форель", "Рыба")
+        self.tree = self.product("Ёлочные шишки", "Специи")
+
+    def product(self, name, category):
+        return make_product(self.supplier, name, category=category)
+
+    def search(self, **params):
+        return [p["id"] for p in self.client.get("/api/products/", params).json()["results"]]
+
+    def test_cyrillic_match_is_case_insensitive(self):
+        self.assertEqual(self.search(search="ЛОСОСЬ"), [self.salmon.id])
+
+    def test_yo_matches_ye(self):
+        self.assertEqual(self.search(search="елочные"), [self.tree.id])
+
+    def test_name_ranks_above_category(self):
+        rybnyi = self.product("Рыба копчёная", "Деликатесы")
+        self.assertEqual(self.search(search="рыба")[0], rybnyi.id)
+
+    def test_prefix_mode(self):
+        self.assertEqual(self.search(search="лос"), [])
+        self.assertEqual(self.search(search="лос", search_mode="prefix"), [self.salmon.id])
+        names = [p["name"] for p in self.client.get("/api/products/autocomplete/", {"q": "фор"}).json()]
+        self.assertEqual(names, ["Форель"])
+
+    def test_index_follows_product_and_supplier_saves(self):
+        self.salmon.name = "Сёмга"
+        self.salmon.save()
+        self.assertEqual(self.search(search="семга"), [self.salmon.id])
+        self.supplier.company_name = "Nordic Catch"
+        self.supplier.save()
+        self.assertEqual(len(self.search(search="nordic")), 3)
+        self.trout.delete()
+        self.assertEqual(len(self.search(search="nordic")), 2)
+
+    def test_rebuild_picks_up_bulk_created_rows(self):
+        models.Product.objects.bulk_create([models.Product(name="Устрицы", category="Морепродукты",
+            price_per_unit=Decimal("2.00"), available_from=date.today(), supplier=self.supplier)])
+        self.assertEqual(self.search(search="устрицы"), [])
+        search.rebuild_index()
+        self.assertEqual(len(self.search(search="устрицы")), 1)
+
+    def test_ranked_results_paginate(self):
+        for i in range(4): self.product(f"Рыба {i}", "Рыба")
+        body = self.client.get("/api/products/", {"search": "рыба", "page_size": 2}).json()
+        seen = [p["id"] for p in body["results"]]
+        while body["next"]:
+            body = self.client.get(body["next"]).json()
+            seen += [p["id"] for p in body["results"]]
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from core import models
+from . import make_product, make_restaurant, make_supplier
+
+class SparseFieldsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.resto, self.supplier = make_restaurant(), make_supplier(country="NO")
+        self.user, self.supplier_u = self.resto.user, self.supplier.user
+        self.products = [make_product(self.supplier, f"P{i}", i % 3 + 1, category="Рыба") for i in range(7)]
+        order = models.Order.objects.create(restaurant=self.resto, delivery_date=date.today() + timedelta(days=2))
+        models.OrderItem.objects.create(order=order, product=self.products[0], quantity=3, unit_price_snapshot=Decimal("1.50"))
+        models.Offer.objects.create(order=order, supplier=self.supplier, price=Decimal("9.90"),
+                                    delivery_eta=date.today() + timedelta(days=1))
+        models.CalendarEvent.objects.create(date=order.delivery_date, restaurant=self.resto, order=order, event_type="order")
+        models.PreOrder.objects.create(restaurant=self.resto, supplier=self.supplier, product=self.products[1],
+                                       quantity=Decimal("2"), delivery_date=date.today() + timedelta(days=9))
+        models.Review.objects.create(reviewer=self.user, target=self.supplier_u, rating=4, comment="ok")
+        models.ProductWaitlist.objects.create(product=self.products[2], restaurant=self.resto, desired_quantity=5)
+        models.FavoritePartner.objects.create(restaurant=self.resto, partner_user=self.supplier_u)
+        self.client.force_authenticate(self.user)
+
+    def queries(self, url, params=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [q["sql"] for q in captured.captured_queries]
+
+    def test_fields_limit_keys_columns_and_prefetches(self):
+        body, sql = self.queries("/api/products/", {"fields": "id,name,price_per_unit,is_available"})
+        self.assertEqual(set(body["results"][0]), {"id", "name", "price_per_unit", "is_available"})
+        self.assertFalse(any("core_productmedia" in q for q in sql))
+        product_sql = next(q for q in sql if 'FROM "core_product"' in q)
+        self.assertNotIn('"core_product"."category"', product_sql)
+        _, full_sql = self.queries("/api/products/")
+        self.assertLess(len(sql), len(full_sql))
+
+    def test_computed_fields_load_their_columns(self):
+        body, _ = self.queries("/api/products/", {"fields": "id,display_price,price", "currency": "USD"})
+        full, _ = self.queries("/api/products/", {"currency": "USD"})
+        self.assertEqual(body["results"], [{k: row[k] for k in ("id", "display_price", "price")} for row in full["results"]])
+
+    def test_expand_nests_object_without_per_row_queries(self):
+        body, sql = self.queries("/api/products/", {"expand": "supplier"})
+        self.assertEqual(body["results"][0]["supplier"]["company_name"], "Sup")
+        self.assertEqual(body["results"][0]["supplier"]["country"], "NO")
+        make_product(make_supplier("sup2", "Two"), "more")
+        _, more_sql = self.queries("/api/products/", {"expand": "supplier"})
+        self.assertEqual(len(more_sql), len(sql))
+
+    def test_expand_with_fields_and_unknown_names(self):
+        body, _ = self.queries("/api/preorders/", {"fields": "id,product", "expand": "product,bogus"})
+        row = body["results"][0]
+        self.assertEqual(set(row), {"id", "product"})
+        self.assertEqual(row["product"]["name"], "P1")
+        # only the top-level serializer is trimmed: order items keep all their fields
+        body, _ = self.queries("/api/orders/", {"fields": "id,items"})
+        self.assertEqual(set(body["results"][0]["items"][0]), {"id", "product", "quantity", "unit_price_snapshot"})
+
+    def test_keyset_pages_with_sparse_fields(self):
+        url, names = "/api/products/?page_size=3&ordering=price_per_unit&fields=name", []
+        while url:
+            body = self.client.get(url).json()
+            names += [row["name"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(names, list(models.Product.objects.order_by("price_per_unit", "id").values_list("name", flat=True)))
+
+    def test_writes_return_every_field(self):
+        response = self.client.post("/api/waitlist/?fields=id", {"product": self.products[3].id, "restaurant": self.resto.id,
+                                                                  "desired_quantity": 1}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("desired_quantity", response.json())
+
+    def test_fast_list_output_matches_drf(self):
+        for url in ["/api/products/", "/api/suppliers/", "/api/orders/", "/api/offers/", "/api/preorders/", "/api/calendar/",
+                    "/api/reviews/", "/api/waitlist/", "/api/favorites/", "/api/products/?expand=supplier&currency=USD"]:
+            fast, _ = self.queries(url)
+            with override_settings(FAST_LIST_SERIALIZER=False):
+                drf, _ = self.queries(url)
+            self.assertTrue(fast["results"], url)
+            self.assertEqual(fast, drf, url)
@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from core import models
+from . import User, make_product, make_restaurant, make_supplier
+
+class TenantScopingTest(APITestCase):
+    def setUp(self):
+        day = date.today() + timedelta(days=3)
+
+        def supplier(name):
+            profile = make_supplier(name, name)
+            return profile, make_product(profile, f"{name} product", "2", category="Овощи")
+
+        self.resto_a, self.resto_b = make_restaurant("resto_a", "resto_a"), make_restaurant("resto_b", "resto_b")
+        (self.sup_a, self.product_a), (self.sup_b, self.product_b) = supplier("sup_a"), supplier("sup_b")
+        self.order_a = self.order(self.resto_a, self.product_a)
+        self.order_b = self.order(self.resto_b, self.product_b)
+        self.offer_b = models.Offer.objects.create(order=self.order_b, supplier=self.sup_b, price=Decimal("5"), delivery_eta=day)
+        # sup_a also bids on resto_b's order, which holds none of its products
+        self.offer_a = models.Offer.objects.create(order=self.order_b, supplier=self.sup_a, price=Decimal("4"), delivery_eta=day)
+        self.preorder_a = models.PreOrder.objects.create(restaurant=self.resto_a, supplier=self.sup_b, product=self.product_b,
+                                                         quantity=Decimal("3"), delivery_date=day)
+        self.wait_a = models.ProductWaitlist.objects.create(product=self.product_a, restaurant=self.resto_a, desired_quantity=1)
+        self.wait_b = models.ProductWaitlist.objects.create(product=self.product_b, restaurant=self.resto_b, desired_quantity=1)
+        self.fav_a = models.FavoritePartner.objects.create(restaurant=self.resto_a, partner_user=self.sup_b.user)
+        self.fav_b = models.FavoritePartner.objects.create(restaurant=self.resto_b, partner_user=self.sup_a.user)
+
+    def order(self, resto, product):
+        order = models.Order.objects.create(restaurant=resto, delivery_date=date.today() + timedelta(days=3))
+        models.OrderItem.objects.create(order=order, product=product, quantity=1, unit_price_snapshot=Decimal("2"))
+        return order
+
+    def ids(self, user, path):
+        self.client.force_authenticate(user)
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["id"] for row in response.json()["results"])
+
+    def test_restaurant_sees_only_its_rows(self):
+        user = self.resto_a.user
+        self.assertEqual(self.ids(user, "/api/orders/"), [self.order_a.id])
+        self.assertEqual(self.ids(user, "/api/offers/"), [])
+        self.assertEqual(self.ids(user, "/api/preorders/"), [self.preorder_a.id])
+        self.assertEqual(self.ids(user, "/api/waitlist/"), [self.wait_a.id])
+        self.assertEqual(self.ids(user, "/api/favorites/"), [self.fav_a.id])
+        self.assertEqual(self.client.get(f"/api/orders/{self.order_b.id}/").status_code, 404)
+        self.assertEqual(self.client.patch(f"/api/favorites/{self.fav_b.id}/", {}).status_code, 404)
+
+    def test_supplier_sees_orders_it_serves_or_bid_on(self):
+        user = self.sup_a.user
+        self.assertEqual(self.ids(user, "/api/orders/"), sorted([self.order_a.id, self.order_b.id]))
+        self.assertEqual(self.ids(user, "/api/offers/"), [self.offer_a.id])
+        self.assertEqual(self.ids(user, "/api/preorders/"), [])
+        self.assertEqual(self.ids(user, "/api/waitlist/"), [self.wait_a.id])
+        self.assertEqual(self.ids(user, "/api/favorites/"), [])
+        self.assertEqual(self.ids(self.sup_b.user, "/api/preorders/"), [self.preorder_a.id])
+
+    def test_best_offers_only_for_own_orders(self):
+        self.client.force_authenticate(self.sup_a.user)
+        body = self.client.get("/api/offers/best/", {"orders": self.order_b.id}).json()
+        self.assertEqual(body["results"], [{"order": self.order_b.id, "offers": []}])
+        self.client.force_authenticate(self.resto_b.user)
+        body = self.client.get("/api/offers/best/", {"orders": self.order_b.id}).json()
+        self.assertEqual([o["id"] for o in body["results"][0]["offers"]], [self.offer_a.id])
+
+    def test_staff_see_everything_and_users_without_profile_nothing(self):
+        staff = User.objects.create_user(username="staff", password="x", is_staff=True)
+        self.assertEqual(len(self.ids(staff, "/api/orders/")), 2)
+        nobody = User.objects.create_user(username="nobody", password="x")
+        with self.assertNumQueries(1):  # the profile lookup; no query for the empty list
+            self.assertEqual(self.ids(nobody, "/api/offers/"), [])
+
+    def queries(self, user, path):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return len(captured)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        cases = [(user, path) for user in (self.resto_a.user, self.sup_a.user)
+                 for path in ("/api/orders/", "/api/offers/", "/api/preorders/", "/api/waitlist/", "/api/favorites/")]
+        before = [self.queries(user, path) for user, path in cases]
+        day = date.today() + timedelta(days=4)
+        for resto, product, supplier in ((self.resto_a, self.product_a, self.sup_a), (self.resto_b, self.product_b, self.sup_b)):
+            for _ in range(5):
+                order = self.order(resto, product)
+                models.Offer.objects.create(order=order, supplier=supplier, price=Decimal("3"), delivery_eta=day)
+                models.PreOrder.objects.create(restaurant=resto, supplier=supplier, product=product,
+                                               quantity=Decimal("1"), delivery_date=day)
+                models.ProductWaitlist.objects.create(product=product, restaurant=resto, desired_quantity=1)
+                models.FavoritePartner.objects.create(restaurant=resto, partner_user=supplier.user)
+        self.assertEqual([self.queries(user, path) for user, path in cases], before)
+
+    def test_only_the_restaurant_changes_its_orders(self):
+        self.client.force_authenticate(self.sup_a.user)  # bid on order_b, so it can read it
+        self.assertEqual(self.client.get(f"/api/orders/{self.order_b.id}/").status_code, 200)
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_b.id}/", {"status": "cancelled"}, format="json").status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/orders/{self.order_b.id}/").status_code, 404)
+        self.client.force_authenticate(self.sup_b.user)
+        self.assertEqual(self.client.delete(f"/api/waitlist/{self.wait_b.id}/").status_code, 404)
+        self.order_b.refresh_from_db()
+        self.assertEqual(self.order_b.status, "pending")
+        self.client.force_authenticate(self.resto_b.user)
+        self.assertEqual(self.client.patch(f"/api/orders/{self.order_b.id}/", {"status": "cancelled"}, format="json").status_code, 200)
+        response = self.client.patch(f"/api/orders/{self.order_b.id}/", {"restaurant": self.resto_a.id}, format="json")
+        self.assertEqual(response.status_code, 403)
+
+    def test_orders_are_created_only_for_the_own_restaurant(self):
+        payload = lambda resto: {"restaurant": resto.id, "delivery_date": date.today() + timedelta(days=3),
+                                 "items": [{"product": self.product_a.id, "quantity": "1", "unit_price_snapshot": "2"}]}
+        self.client.force_authenticate(self.resto_a.user)
+        self.assertEqual(self.client.post("/api/orders/", payload(self.resto_b), format="json").status_code, 403)
+        response = self.client.post("/api/orders/bulk/", [payload(self.resto_a), payload(self.resto_b)], format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r["status"] for r in response.json()["results"]], ["created", "error"])
+        self.assertIn("restaurant", response.json()["results"][1]["errors"])
+        self.client.force_authenticate(self.sup_a.user)  # no restaurant profile at all
+        self.assertEqual(self.client.post("/api/orders/bulk/", [payload(self.resto_a)], format="json").status_code, 400)
+        self.assertEqual(models.Order.objects.filter(restaurant=self.resto_b).count(), 1)
+
+    def test_only_the_bidding_supplier_changes_its_offers(self):
+        day = date.today() + timedelta(days=3)
+        self.client.force_authenticate(self.resto_b.user)  # sees offer_a, on its own order
+        self.assertEqual(self.client.patch(f"/api/offers/{self.offer_a.id}/", {"price": "0.01"}, format="json").status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/offers/{self.offer_a.id}/").status_code, 404)
+        self.client.force_authenticate(self.sup_a.user)
+        bid = lambda supplier, order: {"order": order.id, "supplier": supplier.id, "price": "3", "delivery_eta": day}
+        self.assertEqual(self.client.post("/api/offers/", bid(self.sup_b, self.order_a), format="json").status_code, 403)
+        self.assertEqual(self.client.post("/api/offers/", bid(self.sup_a, self.order_a), format="json").status_code, 201)
+        self.client.force_authenticate(self.sup_b.user)  # order_a holds none of sup_b's products
+        self.assertEqual(self.client.post("/api/offers/", bid(self.sup_b, self.order_a), format="json").status_code, 403)
+        self.assertEqual(self.client.patch(f"/api/offers/{self.offer_b.id}/", {"order": self.order_a.id}, format="json").status_code, 403)
+        self.assertEqual(self.client.patch(f"/api/offers/{self.offer_b.id}/", {"price": "4.50"}, format="json").status_code, 200)
+        self.offer_a.refresh_from_db()
+        self.assertEqual(self.offer_a.price, Decimal("4"))
+
+    def test_restaurant_rows_are_created_only_for_the_own_restaurant(self):
+        day = date.today() + timedelta(days=3)
+        cases = [("/api/preorders/", {"supplier": self.sup_a.id, "product": self.product_a.id, "quantity": "1", "delivery_date": day}),
+                 ("/api/waitlist/", {"product": self.product_a.id, "desired_quantity": 1}),
+                 ("/api/favorites/", {"partner_user": self.sup_a.user.id})]
+        self.client.force_authenticate(self.resto_b.user)
+        for path, payload in cases:
+            self.assertEqual(self.client.post(path, {**payload, "restaurant": self.resto_a.id}, format="json").status_code, 403, path)
+            self.assertEqual(self.client.post(path, {**payload, "restaurant": self.resto_b.id}, format="json").status_code, 201, path)
+        self.client.force_authenticate(self.resto_a.user)
+        self.assertEqual(self.client.patch(f"/api/preorders/{self.preorder_a.id}/", {"restaurant": self.resto_b.id},
+                                           format="json").status_code, 403)
+        self.assertEqual(self.client.patch(f"/api/waitlist/{self.wait_a.id}/", {"restaurant": self.resto_b.id},
+                                           format="json").status_code, 403)
+        self.assertEqual(models.PreOrder.objects.filter(restaurant=self.resto_a).count(), 1)
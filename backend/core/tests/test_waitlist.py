@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from core import models, waitlist
+from . import make_product, make_restaurant, make_supplier
+
+class RecordingSender:
+    def __init__(self): self.batches = []
+    def send(self, notifications): self.batches.append(notifications)
+
+class WaitlistEngineTest(TestCase):
+    def setUp(self):
+        self.supplier = make_supplier()
+        self.restos = [make_restaurant(f"r{i}", f"R{i}", email=f"r{i}@example.com") for i in range(3)]
+        later = date.today() + timedelta(days=10)
+        self.products = [make_product(self.supplier, f"P{i}", available_from=later) for i in range(2)]
+        for resto in self.restos:
+            for product in self.products:
+                models.ProductWaitlist.objects.create(product=product, restaurant=resto, desired_quantity=5)
+        # duplicate entry: notified once
+        models.ProductWaitlist.objects.create(product=self.products[0], restaurant=self.restos[0], desired_quantity=2)
+
+    def make_available(self):
+        models.Product.objects.update(available_from=date.today())
+
+    def test_unavailable_products_are_not_notified(self):
+        sender = RecordingSender()
+        self.assertEqual(waitlist.notify([p.id for p in self.products], sender=sender), 0)
+        self.assertEqual(sender.batches, [])
+
+    def test_set_based_match_and_single_update(self):
+        self.make_available()
+        sender = RecordingSender()
+        # select + bulk update, however many products and restaurants
+        with self.assertNumQueries(2):
+            marked = waitlist.notify([p.id for p in self.products] * 3, sender=sender)
+        self.assertEqual(marked, 7)
+        notifications = sender.batches[0]
+        self.assertEqual(len(notifications), 3)
+        self.assertEqual([len(n["items"]) for n in notifications], [2, 2, 2])
+        self.assertFalse(models.ProductWaitlist.objects.filter(notified=False).exists())
+        self.assertEqual(waitlist.notify([p.id for p in self.products], sender=sender), 0)
+
+    def test_batches(self):
+        self.make_available()
+        sender = RecordingSender()
+        waitlist.notify([p.id for p in self.products], sender=sender, batch_size=1)
+        self.assertEqual(len(sender.batches), 2)
+
+    def test_management_command(self):
+        self.make_available()
+        out = StringIO()
+        with self.settings(WAITLIST_NOTIFICATION_SENDER="core.waitlist.ConsoleSender"):
+            with self.assertLogs("core.waitlist", "INFO"):
+                call_command("notify_waitlist", stdout=out)
+        self.assertIn("Notified 7", out.getvalue())
+
+class WaitlistSignalTest(TransactionTestCase):
+    def setUp(self):
+        self.supplier = make_supplier()
+        self.calls = []
+        self.original, waitlist.notify = waitlist.notify, lambda ids, **kw: self.calls.append(set(ids)) or 0
+
+    def tearDown(self):
+        waitlist.notify = self.original
+
+    def product(self):
+        return models.Product(name="P", category="C", price_per_unit=Decimal("1"), available_from=date.today(),
+                              supplier=self.supplier)
+
+    def test_saves_in_one_transaction_share_a_run(self):
+        with transaction.atomic():
+            products = [self.product() for _ in range(3)]
+            for p in products: p.save()
+            products[0].save()
+        self.assertEqual(self.calls, [{p.id for p in products}])
+
+    def test_rolled_back_saves_are_dropped(self):
+        try:
+            with transaction.atomic():
+                self.product().save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with transaction.atomic():
+            kept = self.product(); kept.save()
+        self.assertEqual(self.calls, [{kept.id}])
+
+    def test_rolled_back_savepoint_starts_a_new_batch(self):
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.product().save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            kept = self.product(); kept.save()
+            also = self.product(); also.save()
+        self.assertEqual(self.calls, [{kept.id, also.id}])
+
+    def test_saves_outside_a_transaction_run_one_by_one(self):
+        first = self.product(); first.save()
+        second = self.product(); second.save()
+        self.assertEqual(self.calls, [{first.id}, {second.id}])
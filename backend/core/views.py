@@ -1,45 +1,372 @@
-from rest_framework import viewsets, permissions, filters
+import secrets
+from datetime import date, timedelta
+from django.contrib.auth import get_user_model
+from django.db.models import F, Prefetch
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import mixins, viewsets, permissions, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from . import models, serializers
+from . import caching, filters as core_filters, fx, ical, imports, matching, models, serializers, offers, orders, pagination, prices, search
+from .exports import ExportMixin
+from .routing import ReplicaReadMixin
+from .sparse import SparseQuerysetMixin
+from .tenancy import TenantScopedMixin, order_filter, profile_ids
 
 class IsAuthenticatedOrReadOnly(permissions.IsAuthenticatedOrReadOnly):
     pass
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, SparseQuerysetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = models.Product.objects.all().select_related("supplier").prefetch_related("media")
     serializer_class = serializers.ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ["category","supplier__verified","supplier__is_farmer"]
-    search_fields = ["name","category","supplier__company_name"]
-    ordering_fields = ["price_per_unit","available_from"]
+    filter_backends = [DjangoFilterBackend, search.ProductSearchFilter, core_filters.AliasedOrderingFilter]
+    filterset_class = core_filters.ProductFilter
+    ordering_fields = ["price_per_unit","price","available_from","rating"]
+    # converting to any one currency keeps the order of price_eur, so ?ordering=price walks its index
+    ordering_aliases = {"price": "price_eur"}
+    autocomplete_limit = 10
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = models.Order.objects.all().select_related("restaurant")
+    def get_queryset(self):
+        # availability is relative to today, so it is annotated per request;
+        # rating reads the supplier's stored counters; price is converted in SQL
+        currency = fx.request_currency(self.request)
+        return super().get_queryset().with_availability().annotate(rating=F("supplier__user__rating_avg")) \
+            .with_price_in(currency, fx.rate(currency) if currency != fx.BASE else 1)
+
+    def cache_variant(self, request):
+        return fx.request_currency(request)
+
+    def list(self, request, *args, **kwargs):
+        # conditional GET + response cache keyed on the catalog version (core.caching)
+        return caching.cached_list(self, request, *args, **kwargs)
+
+    def list_uncached(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    export_fields = ["id","name","category","unit","price_per_unit","currency","available_from","available_to",
+                     "verified","supplier_id","supplier__company_name"]
+
+    @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser, FormParser],
+            permission_classes=[permissions.IsAuthenticated])
+    def import_price_list(self, request):
+        # suppliers import into their own catalog; admins pass ?supplier=<id>
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"detail": "Upload the price list as 'file' (CSV or XLSX)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        supplier = getattr(request.user, "supplier_profile", None)
+        if supplier is None:
+            if not (request.user.is_staff or request.user.is_admin):
+                raise PermissionDenied("Only suppliers can import price lists.")
+            supplier = models.SupplierProfile.objects.filter(pk=request.data.get("supplier")).first()
+            if supplier is None:
+                return Response({"detail": "Pass a valid 'supplier' id."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = imports.import_price_list(supplier, imports.read_rows(upload, upload.name),
+                                               dry_run=request.data.get("dry_run") in ("1", "true", "True"))
+        except imports.PriceListError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        query = request.query_params.get("q", "")
+        if not search.terms(query): return Response([])
+        queryset = search.search_products(models.Product.objects.all(), query, prefix=True)
+        rows = queryset.order_by("-search_rank", "id").values("id", "name", "category")[:self.autocomplete_limit]
+        return Response(list(rows))
+
+    prices_max_products = 1000
+    history_max_points = 365
+
+    @action(detail=False, methods=["get"], url_path="prices", url_name="prices")
+    def prices_at(self, request):
+        # ?products=1,2,3&at=2025-06-01 -> the price each product had at the end of that day, one query
+        try:
+            product_ids = [int(v) for v in request.query_params.get("products", "").split(",") if v.strip()]
+            at = date.fromisoformat(request.query_params["at"]) if request.query_params.get("at") else timezone.localdate()
+        except ValueError:
+            return Response({"detail": "products must be a comma-separated list of ids and at a YYYY-MM-DD date."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not product_ids or len(product_ids) > self.prices_max_products:
+            return Response({"detail": f"Pass 1-{self.prices_max_products} product ids."}, status=status.HTTP_400_BAD_REQUEST)
+        found = prices.prices_at(product_ids, at)
+        return Response({"at": at, "results": serializers.ProductPriceSerializer(
+            [found[pk] for pk in dict.fromkeys(product_ids) if pk in found], many=True).data})
+
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        # ?since=&until= (default: the past year) -> every price change in the range plus ?points= sparkline samples
+        try:
+            until = date.fromisoformat(request.query_params["until"]) if request.query_params.get("until") else timezone.localdate()
+            since = date.fromisoformat(request.query_params["since"]) if request.query_params.get("since") else until - timedelta(days=365)
+            points = int(request.query_params.get("points", 30))
+        except ValueError:
+            return Response({"detail": "since / until must be YYYY-MM-DD dates and points an integer."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if since > until or not 1 <= points <= self.history_max_points:
+            return Response({"detail": f"since must not be after until; points between 1 and {self.history_max_points}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        product = get_object_or_404(models.Product.objects.only("id"), pk=pk)
+        rows = prices.history(product.pk, since, until)
+        return Response({"product": product.pk, "since": since, "until": until,
+                         "changes": serializers.ProductPriceSerializer(rows, many=True).data,
+                         "sparkline": prices.sparkline(rows, since, until, points)})
+
+class SupplierProfileViewSet(ReplicaReadMixin, SparseQuerysetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = models.SupplierProfile.objects.all().select_related("user").annotate(rating=F("user__rating_avg"))
+    serializer_class = serializers.SupplierProfileSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ["verified","is_farmer","country"]
+    ordering_fields = ["rating","company_name"]
+    ordering = ["-rating"]
+
+class OrderViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = models.Order.objects.with_totals().select_related("restaurant").prefetch_related("items")
     serializer_class = serializers.OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    tenant_restaurant = "restaurant_id"
+    # suppliers read the orders they supply or bid on, only the restaurant changes them
+    tenant_owner = "restaurant"
+    bulk_max_orders = 1000
+
+    def perform_create(self, serializer):
+        self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
 
-class OfferViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        if "restaurant" in serializer.validated_data:
+            self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+    def tenant_filter(self, restaurant_id, supplier_id):
+        # suppliers see the orders that contain their products or that they made an offer on
+        return order_filter(restaurant_id, supplier_id)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        payloads = request.data.get("orders") if isinstance(request.data, dict) else request.data
+        if not isinstance(payloads, list) or not payloads:
+            return Response({"detail": "Expected a non-empty list of orders."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(payloads) > self.bulk_max_orders:
+            return Response({"detail": f"At most {self.bulk_max_orders} orders per request."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # every order has to be for the caller's restaurant (staff: any)
+        restaurant_id = None if request.user.is_staff else profile_ids(request)[0] or 0
+        results = orders.create_orders_in_bulk(payloads, restaurant_id=restaurant_id)
+        created = sum(r["status"] == "created" for r in results)
+        if created == len(results): code = status.HTTP_201_CREATED
+        elif created: code = status.HTTP_207_MULTI_STATUS
+        else: code = status.HTTP_400_BAD_REQUEST
+        return Response({"created": created, "failed": len(results) - created, "results": results}, status=code)
+
+    candidates_max_n = 100
+
+    @action(detail=True, methods=["get"])
+    def candidates(self, request, pk=None):
+        # suppliers to invite for this order, ranked by core.matching; ?country= favours local suppliers
+        try:
+            n = int(request.query_params.get("n", matching.CANDIDATES))
+        except ValueError:
+            n = 0
+        if not 1 <= n <= self.candidates_max_n:
+            return Response({"detail": f"n must be between 1 and {self.candidates_max_n}."}, status=status.HTTP_400_BAD_REQUEST)
+        order = self.get_object()
+        suppliers = matching.candidates(order, country=request.query_params.get("country"), limit=n)
+        return Response({"order": order.pk, "results": serializers.CandidateSupplierSerializer(suppliers, many=True).data})
+
+    # one CSV row per order line; NDJSON keeps items nested under their order
+    export_order_fields = ["order_id","restaurant_id","restaurant","delivery_date","status","created_at","order_total"]
+    export_item_fields = ["item_id","product_id","product_name","quantity","unit_price_snapshot","line_total"]
+    export_fields = export_order_fields + export_item_fields
+
+    def export_queryset(self):
+        items = models.OrderItem.objects.select_related("product").only(
+            "id", "order_id", "quantity", "unit_price_snapshot", "product__id", "product__name").order_by("id")
+        # items are fetched per chunk of orders by iterator(chunk_size=...)
+        return super().export_queryset().prefetch_related(None).prefetch_related(Prefetch("items", queryset=items))
+
+    def _export_orders(self, queryset):
+        for order in queryset.iterator(chunk_size=self.export_chunk_size):
+            head = {"order_id": order.id, "restaurant_id": order.restaurant_id, "restaurant": order.restaurant.company_name,
+                    "delivery_date": order.delivery_date, "status": order.status, "created_at": order.created_at,
+                    "order_total": order.total}
+            lines = [{"item_id": i.id, "product_id": i.product_id, "product_name": i.product.name, "quantity": i.quantity,
+                      "unit_price_snapshot": i.unit_price_snapshot, "line_total": i.quantity * i.unit_price_snapshot}
+                     for i in order.items.all()]
+            yield head, lines
+
+    def export_rows(self, queryset):
+        for head, lines in self._export_orders(queryset):
+            for line in lines or [{}]:
+                yield {**head, **line}
+
+    def export_documents(self, queryset):
+        for head, lines in self._export_orders(queryset):
+            yield {**head, "items": lines}
+
+class OfferViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = models.Offer.objects.all().select_related("order","supplier")
     serializer_class = serializers.OfferSerializer
     permission_classes = [permissions.IsAuthenticated]
+    tenant_restaurant = "order__restaurant_id"
+    tenant_supplier = "supplier_id"
+    # restaurants read the offers on their orders, only the bidding supplier changes them
+    tenant_owner = "supplier"
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ["order","supplier"]
+
+    def check_offer(self, data):
+        if "supplier" in data:
+            self.check_tenant(supplier_id=data["supplier"].pk)
+        if "order" in data and not self.request.user.is_staff and not models.Order.objects.filter(
+                order_filter(*profile_ids(self.request)), pk=data["order"].pk).exists():
+            raise PermissionDenied("You can only bid on orders you can see.")
+
+    def perform_create(self, serializer):
+        self.check_offer(serializer.validated_data)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        self.check_offer(serializer.validated_data)
+        serializer.save()
     ordering_fields = ["price","delivery_eta"]
+    best_max_orders = 500
+    best_max_n = 10
 
-class PreOrderViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get"])
+    def best(self, request):
+        # ?orders=1,2,3&n=3 -> the n best offers of each order, one query for all orders
+        try:
+            order_ids = [int(v) for v in request.query_params.get("orders", "").split(",") if v.strip()]
+            n = int(request.query_params.get("n", 1))
+        except ValueError:
+            return Response({"detail": "orders must be a comma-separated list of ids and n an integer."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not order_ids or len(order_ids) > self.best_max_orders or not 1 <= n <= self.best_max_n:
+            return Response({"detail": f"Pass 1-{self.best_max_orders} order ids and n between 1 and {self.best_max_n}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # competing offers are only ranked for the restaurant that placed the order
+        restaurant_id = None if request.user.is_staff else profile_ids(request)[0] or 0
+        grouped = offers.best_offers(order_ids, n, restaurant_id=restaurant_id)
+        return Response({"results": [
+            {"order": order_id, "offers": serializers.RankedOfferSerializer(rows, many=True).data}
+            for order_id, rows in grouped.items()
+        ]})
+
+    export_fields = ["id","order_id","supplier_id","supplier__company_name","price","delivery_eta","created_at"]
+
+class PreOrderViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = models.PreOrder.objects.all().select_related("restaurant","supplier","product")
     serializer_class = serializers.PreOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    tenant_restaurant = "restaurant_id"
+    tenant_supplier = "supplier_id"
+
+    # the restaurant places the preorder; the supplier it names may update it
+    def perform_create(self, serializer):
+        self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        if "restaurant" in serializer.validated_data:
+            self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+class ProductCapacityViewSet(ReplicaReadMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
+    # the capacity ledger (core.capacity); only the product's supplier sets it, reservations draw it down
+    queryset = models.ProductCapacity.objects.all()
+    serializer_class = serializers.ProductCapacitySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = pagination.CapacityPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ["product","delivery_date"]
 
-class CalendarEventViewSet(viewsets.ModelViewSet):
+    def check_owner(self, product):
+        user = self.request.user
+        if not (user.is_staff or product.supplier.user_id == user.id):
+            raise PermissionDenied("Only the product's supplier can change its capacity.")
+
+    def perform_create(self, serializer):
+        self.check_owner(serializer.validated_data["product"])
+        serializer.save()
+
+    def perform_update(self, serializer):
+        self.check_owner(serializer.instance.product)
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        self.check_owner(instance.product)
+        instance.delete()
+
+class CalendarEventViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = models.CalendarEvent.objects.all()
     serializer_class = serializers.CalendarEventSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = pagination.CalendarPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["restaurant","supplier","event_type","status","date"]
+    filterset_class = core_filters.CalendarEventFilter
+    tenant_restaurant = "restaurant_id"
+    tenant_supplier = "supplier_id"
+    feed_chunk_size = 2000
+    feed_status = {"cancelled": "CANCELLED", "scheduled": "CONFIRMED"}
+
+    @action(detail=False, methods=["get"])
+    def feed(self, request):
+        # iCalendar subscription for one of the caller's restaurant (?restaurant=) or supplier (?supplier=)
+        owner = next((side for side in ("restaurant", "supplier") if request.query_params.get(side)), None)
+        if owner is None:
+            return Response({"detail": "Pass ?restaurant=<id> or ?supplier=<id>."}, status=status.HTTP_400_BAD_REQUEST)
+        return self._ics_response(self.filter_queryset(self.get_queryset()), owner, request.query_params[owner])
+
+    def token_feed(self, request, token):
+        # /api/calendar/feed/<token>.ics: the same feed for calendar apps, which cannot log in; the
+        # token (see feed_token) stands for its user and the events are scoped to that user's profiles
+        restaurant_id, supplier_id = get_user_model().objects.filter(calendar_token=token, is_active=True).values_list(
+            "restaurant_profile__id", "supplier_profile__id").first() or (None, None)
+        if not (restaurant_id or supplier_id):
+            raise Http404
+        owner, owner_id = ("restaurant", restaurant_id) if restaurant_id else ("supplier", supplier_id)
+        queryset = models.CalendarEvent.objects.filter(self.tenant_filter(restaurant_id, supplier_id))
+        return self._ics_response(self.filter_queryset(queryset), owner, owner_id)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=["get", "post"], url_path="feed-token")
+    def feed_token(self, request):
+        # GET: the caller's secret feed URL (null until issued); POST: issue a new one, revoking the old URL
+        token = get_user_model().objects.filter(pk=request.user.pk).values_list("calendar_token", flat=True).first()
+        if request.method == "POST":
+            token = secrets.token_urlsafe(32)
+            get_user_model().objects.filter(pk=request.user.pk).update(calendar_token=token)
+        url = request.build_absolute_uri(reverse("calendar-token-feed", args=[token])) if token else None
+        return Response({"url": url})
+
+    def _ics_response(self, queryset, owner, owner_id):
+        # streamed from a chunked iterator so years of history never sit in memory
+        rows = queryset.order_by("date", "id").values("id", "date", "event_type", "status", "order_id", "preorder_id",
+                                                      "restaurant__company_name", "supplier__company_name")
+        response = StreamingHttpResponse(self._ics_lines(rows, owner), content_type="text/calendar; charset=utf-8")
+        response["Content-Disposition"] = f'inline; filename="restockhub-{owner}-{owner_id}.ics"'
+        return response
+
+    def _ics_lines(self, rows, owner):
+        yield ical.calendar_header(f"RestockHub ({owner})")
+        for row in rows.iterator(chunk_size=self.feed_chunk_size):
+            partner = row["supplier__company_name"] if owner == "restaurant" else row["restaurant__company_name"]
+            ref = (f"order #{row['order_id']}, " if row["order_id"] else
+                   f"preorder #{row['preorder_id']}, " if row["preorder_id"] else "")
+            summary = f"{row['event_type'].capitalize()} delivery" + (f" - {partner}" if partner else "")
+            yield ical.event(f"calendar-{row['id']}@restockhub", row["date"], summary, ref + row["status"],
+                             status=self.feed_status.get(row["status"], "TENTATIVE"))
+        yield ical.calendar_footer()
+
+class ReviewViewSet(ReplicaReadMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = models.Review.objects.all().select_related("reviewer","target")
     serializer_class = serializers.ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -47,16 +374,62 @@ class ReviewViewSet(viewsets.ModelViewSet):
     filterset_fields = ["target"]
     ordering_fields = ["created_at"]
 
-class ProductWaitlistViewSet(viewsets.ModelViewSet):
+class ProductWaitlistViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = models.ProductWaitlist.objects.all().select_related("product","restaurant")
     serializer_class = serializers.ProductWaitlistSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # suppliers see who is waiting for their products
+    tenant_restaurant = "restaurant_id"
+    tenant_owner = "restaurant"
+    tenant_supplier = "product__supplier_id"
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["product","restaurant","notified"]
 
-class FavoritePartnerViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        if "restaurant" in serializer.validated_data:
+            self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+class FavoritePartnerViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = models.FavoritePartner.objects.all().select_related("restaurant","partner_user")
     serializer_class = serializers.FavoritePartnerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    tenant_restaurant = "restaurant_id"
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["restaurant","partner_user"]
+
+    def perform_create(self, serializer):
+        self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        if "restaurant" in serializer.validated_data:
+            self.check_tenant(restaurant_id=serializer.validated_data["restaurant"].pk)
+        serializer.save()
+
+# ---------- Analytics: read only the rollup tables kept by core.rollups ----------
+class SpendAnalyticsViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, mixins.ListModelMixin,
+                            viewsets.GenericViewSet):
+    # a restaurant's spend per category and delivery month
+    queryset = models.RestaurantSpend.objects.all()
+    serializer_class = serializers.RestaurantSpendSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = pagination.SpendPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = core_filters.SpendFilter
+    tenant_restaurant = "restaurant_id"
+
+class SalesAnalyticsViewSet(ReplicaReadMixin, TenantScopedMixin, SparseQuerysetMixin, mixins.ListModelMixin,
+                            viewsets.GenericViewSet):
+    # a supplier's revenue per product and delivery week
+    queryset = models.SupplierSales.objects.all()
+    serializer_class = serializers.SupplierSalesSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = pagination.SalesPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = core_filters.SalesFilter
+    tenant_supplier = "supplier_id"
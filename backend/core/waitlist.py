@@ -0,0 +1,110 @@
+import json
+import logging
+import weakref
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from . import models
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# ---------- senders ----------
+class ConsoleSender:
+    """Default stand-in: logs one line per restaurant notification."""
+    def send(self, notifications):
+        for n in notifications:
+            names = ", ".join(i["product_name"] for i in n["items"])
+            logger.info("waitlist: notify %s <%s>: %s", n["company_name"], n["email"], names)
+
+class FileSender:
+    """Appends notifications as JSON lines to settings.WAITLIST_NOTIFICATION_FILE."""
+    def __init__(self, path=None):
+        self.path = path or settings.WAITLIST_NOTIFICATION_FILE
+    def send(self, notifications):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for n in notifications:
+                f.write(json.dumps(n, ensure_ascii=False, default=str) + "\n")
+
+def get_sender():
+    return import_string(settings.WAITLIST_NOTIFICATION_SENDER)()
+
+# ---------- matching ----------
+def pending_entries(product_ids, day=None):
+    """Un-notified waitlist rows for `product_ids` whose product is available on `day`."""
+    day = day or timezone.now().date()
+    return (models.ProductWaitlist.objects
+            .filter(models.available_q(day, prefix="product__"), product_id__in=product_ids, notified=False)
+            .select_related("product", "restaurant__user")
+            .order_by("restaurant_id", "id"))
+
+def build_notifications(entries):
+    """One notification per restaurant, listing each waiting product once."""
+    by_restaurant = {}
+    for e in entries:
+        n = by_restaurant.setdefault(e.restaurant_id, {
+            "restaurant_id": e.restaurant_id, "company_name": e.restaurant.company_name,
+            "email": e.restaurant.user.email, "items": [], "_products": set(),
+        })
+        if e.product_id in n["_products"]:
+            continue
+        n["_products"].add(e.product_id)
+        n["items"].append({"product_id": e.product_id, "product_name": e.product.name,
+                           "desired_quantity": e.desired_quantity})
+    for n in by_restaurant.values(): del n["_products"]
+    return list(by_restaurant.values())
+
+def notify(product_ids, sender=None, batch_size=BATCH_SIZE, day=None):
+    """
+    Match changed products against the waitlist and notify restaurants.
+    Per batch of products: one SELECT for matches, one send, one bulk UPDATE.
+    Returns the number of waitlist rows marked notified.
+    """
+    sender = sender or get_sender()
+    ids = sorted(set(product_ids))
+    marked = 0
+    for start in range(0, len(ids), batch_size):
+        entries = list(pending_entries(ids[start:start + batch_size], day))
+        if not entries:
+            continue
+        sender.send(build_notifications(entries))
+        # only rows still un-notified, so a concurrent run cannot double count
+        marked += models.ProductWaitlist.objects.filter(id__in=[e.id for e in entries], notified=False).update(notified=True)
+    return marked
+
+def notify_all(sender=None, batch_size=BATCH_SIZE, day=None):
+    product_ids = models.ProductWaitlist.objects.filter(notified=False).values_list("product_id", flat=True).distinct()
+    return notify(list(product_ids), sender=sender, batch_size=batch_size, day=day)
+
+# ---------- post_save hook ----------
+class _Batch:
+    def __init__(self, connection):
+        self.connection, self.ids = connection, set()
+    def __call__(self):
+        self.connection._waitlist_batch = None
+        try:
+            notify(self.ids)
+        except Exception:
+            # never fail the write that triggered it; `manage.py notify_waitlist` retries
+            logger.exception("waitlist: notification run failed for %d products", len(self.ids))
+
+def schedule(product_ids):
+    """
+    Queue products for matching once the surrounding transaction commits.
+    Saves inside one transaction share a single batch. The connection only holds
+    a weak reference to it: the pending on_commit callback keeps it alive, so a
+    rollback that drops the callback drops the batch too, and the callback clears
+    the reference once it has run.
+    """
+    connection = transaction.get_connection()
+    ref = getattr(connection, "_waitlist_batch", None)
+    batch = ref() if ref is not None and connection.in_atomic_block else None
+    if batch is not None:
+        batch.ids.update(product_ids)
+        return
+    batch = _Batch(connection)
+    batch.ids.update(product_ids)
+    connection._waitlist_batch = weakref.ref(batch)
+    transaction.on_commit(batch)  # runs right away outside a transaction
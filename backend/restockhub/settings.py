@@ -11,9 +11,6 @@ DEBUG = os.getenv("DEBUG", "1") == "1"
 ALLOWED_HOSTS = ["*"]
 
 INSTALLED_APPS = [
-    
-    "rest_framework",
-    "core",   # ← вот это обязательно
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -26,11 +23,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # outermost, so its timing covers the rest of the stack; see core.instrumentation
+    "core.instrumentation.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # per-request replica routing and read-your-writes stickiness; see core.routing
+    "core.routing.ReplicaRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -68,10 +69,91 @@ else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "db.sqlite3",
+            "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
         }
     }
 
+# SQLite profile. "production" (default): WAL so reads never wait for writers, BEGIN IMMEDIATE so a
+# write transaction takes the lock up front and waits busy_timeout for it instead of failing with
+# "database is locked" when it upgrades from a read, synchronous=NORMAL (safe with WAL, no fsync
+# per commit), plus memory-mapped I/O and a larger page cache. "basic": Django's defaults.
+# Compare the two with `manage.py bench_sqlite`.
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_PROFILES = {
+    "basic": {},
+    "production": {
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join([
+            "PRAGMA journal_mode=WAL",
+            f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_MB', '128')) * 2**20}",
+            f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_MB', '32')) * 1024}",  # negative = KiB
+        ]),
+    },
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+if DB_BACKEND != "postgres":
+    DATABASES["default"]["OPTIONS"] = dict(SQLITE_PROFILES[SQLITE_PROFILE])
+
+# Persistent connections: reused for DB_CONN_MAX_AGE seconds (0 = per request, "" = forever) and
+# checked before reuse so a dropped connection is replaced instead of failing the request.
+# POSTGRES_POOL=1 uses psycopg's pool instead, which requires CONN_MAX_AGE=0.
+DB_CONN_MAX_AGE = os.getenv("DB_CONN_MAX_AGE", "60")
+DATABASES["default"]["CONN_MAX_AGE"] = int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1"
+if DB_BACKEND == "postgres" and os.getenv("POSTGRES_POOL", "0") == "1":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {"pool": True}
+
+# Read replicas (core.routing): safe requests of the API viewsets read from one of them, writes
+# and everything else use "default". POSTGRES_REPLICA_HOSTS="h1,h2" adds replica1..n;
+# SQLITE_REPLICA_PATH adds "replica", a file refreshed with `manage.py sync_replica`.
+# After a write the client stays on the primary for REPLICA_STICKY_SECONDS; an unreachable
+# replica is skipped for REPLICA_RETRY_SECONDS.
+def _replica(**overrides):
+    return {**DATABASES["default"], **overrides, "TEST": {"MIRROR": "default"}}
+
+if DB_BACKEND == "postgres":
+    for n, host in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), 1):
+        DATABASES[f"replica{n}"] = _replica(HOST=host.strip())
+elif os.getenv("SQLITE_REPLICA_PATH"):
+    DATABASES["replica"] = _replica(NAME=os.getenv("SQLITE_REPLICA_PATH"))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.routing.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = int(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+# Postgres text search configuration for the product index (catalog is mostly Russian);
+# run `manage.py rebuild_search_index` after changing it
+SEARCH_PG_CONFIG = os.getenv("SEARCH_PG_CONFIG", "russian")
+
+# Waitlist notifications (core.waitlist): ConsoleSender logs, FileSender appends JSON lines
+WAITLIST_NOTIFICATION_SENDER = os.getenv("WAITLIST_NOTIFICATION_SENDER", "core.waitlist.ConsoleSender")
+WAITLIST_NOTIFICATION_FILE = BASE_DIR / "waitlist_notifications.jsonl"
+
+# Cache: local memory by default, CACHE_BACKEND=file for a cache shared by all workers on a host
+if os.getenv("CACHE_BACKEND", "locmem") == "file":
+    CACHES = {"default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+    }}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "restockhub"}}
+# seconds a cached catalog page may live; any catalog change invalidates it sooner
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "300"))
+
+# FX rates (core.fx) are cached in each process for this many seconds
+FX_CACHE_SECONDS = int(os.getenv("FX_CACHE_SECONDS", "60"))
+
+# Request instrumentation: requests slower than this are logged with their worst queries;
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token it is served under DEBUG only
+REQUEST_SLOW_MS = int(os.getenv("REQUEST_SLOW_MS", "500"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# list responses are built by core.sparse.FastListSerializer; "0" falls back to DRF's per-field serialization
+FAST_LIST_SERIALIZER = os.getenv("FAST_LIST_SERIALIZER", "1") == "1"
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -87,6 +169,12 @@ USE_TZ = True
 STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# ProductMedia derivatives (core.media): "thread" = background pool of MEDIA_WORKERS, "inline" = on commit in-process
+MEDIA_PROCESSING = os.getenv("MEDIA_PROCESSING", "thread")
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+# /media/ served by Django (catalog uploads only, see core.media.PUBLIC_PREFIXES); off by default outside DEBUG,
+# where a front proxy serves MEDIA_ROOT/products/ itself
+MEDIA_SERVE = os.getenv("MEDIA_SERVE", "1" if DEBUG else "0") == "1"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "core.CustomUser"
@@ -94,6 +182,9 @@ AUTH_USER_MODEL = "core.CustomUser"
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # keyset pagination on (created_at, id); see core.pagination
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetPagination",
+    "PAGE_SIZE": 50,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -1,14 +1,17 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from core import views as core_views
+from core import async_views, instrumentation, media, views as core_views
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 router = DefaultRouter()
 router.register(r'products', core_views.ProductViewSet, basename='product')
+router.register(r'suppliers', core_views.SupplierProfileViewSet, basename='supplier')
 router.register(r'orders', core_views.OrderViewSet, basename='order')
 router.register(r'offers', core_views.OfferViewSet, basename='offer')
 router.register(r'preorders', core_views.PreOrderViewSet, basename='preorder')
+router.register(r'capacity', core_views.ProductCapacityViewSet, basename='capacity')
 router.register(r'calendar', core_views.CalendarEventViewSet, basename='calendar')
 router.register(r'reviews', core_views.ReviewViewSet, basename='review')
 router.register(r'waitlist', core_views.ProductWaitlistViewSet, basename='waitlist')
@@ -16,8 +19,19 @@ router.register(r'favorites', core_views.FavoritePartnerViewSet, basename='favor
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # secret-token iCalendar feed: no session or password, the token in the URL identifies the user
+    path('api/calendar/feed/<str:token>.ics', core_views.CalendarEventViewSet.as_view(
+        {'get': 'token_feed'}, authentication_classes=[], permission_classes=[]), name='calendar-token-feed'),
     path('api/', include(router.urls)),
+    # reports over the rollup tables (core.rollups); list only, so they stay out of the router
+    path('api/analytics/spend/', core_views.SpendAnalyticsViewSet.as_view({'get': 'list'}), name='analytics-spend'),
+    path('api/analytics/sales/', core_views.SalesAnalyticsViewSet.as_view({'get': 'list'}), name='analytics-sales'),
+    # async ORM read path for the catalog, offers and calendar; serve with an ASGI server (uvicorn restockhub.asgi:application)
+    path('api/async/', include(async_views)),
     path('api-auth/', include('rest_framework.urls')),  # логин/логаут
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('metrics', instrumentation.metrics, name='metrics'),
+    # catalog uploads (MEDIA_SERVE), with Range support for video seeking; a front proxy may serve them instead
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), media.serve, name='media'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
\ No newline at end of file